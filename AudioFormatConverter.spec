@@ -16,6 +16,11 @@ a = Analysis(
         'tkinter.filedialog',
         'tkinter.messagebox',
         'tkinter.scrolledtext',
+        'media_converter.gui',
+        'media_converter.async_engine',
+        'media_converter.distributed',
+        'media_converter.watch',
+        'media_converter.service',
         'threading',
         'queue',
         'concurrent.futures',
@@ -25,7 +30,9 @@ a = Analysis(
         'urllib.request',
         'zipfile',
         'tempfile',
-        'shutil'
+        'shutil',
+        'json',
+        'sqlite3'
     ],
     hookspath=[],
     hooksconfig={},
@@ -19,20 +19,34 @@ from pathlib import Path
 import argparse
 import platform
 import tempfile
-import urllib.request
-import zipfile
 import concurrent.futures
 from threading import Lock
 import time
 import shutil
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
-import queue
+import json
+import signal
+
+from media_converter.ffmpeg_cache import load_ffmpeg_cache, save_ffmpeg_cache, query_ffmpeg_capabilities
+from media_converter.manifest import ConversionManifest, source_signature
+from media_converter.discovery import DiscoveryProgress, iter_source_files, submit_streaming
+from media_converter.concurrency import (AdaptiveConcurrencyController, VIDEO_THREADS_PER_JOB, available_cpus,
+                                         estimate_job_memory, plan_concurrency)
+from media_converter.remux import may_stream_copy, plan_stream_copy
+from media_converter.segmented import DEFAULT_SEGMENT_SECONDS, DEFAULT_SEGMENT_THRESHOLD, encode_segmented
+from media_converter.scheduling import estimate_costs, order_longest_first, makespan_report, format_makespan_report
+from media_converter.progress import BatchProgress, describe_progress, read_progress
+from media_converter.batching import estimate_seconds_from_size, group_small_jobs
+from media_converter.processes import ProcessRegistry
+from media_converter.tiers import DEFAULT_TIER, PERFORMANCE_TIERS, apply_tier, parse_deadline
 
 
 def download_ffmpeg_windows():
     """Download and install FFmpeg on Windows automatically"""
+    # Only needed for the one-off download, so keep them out of the import path
+    import urllib.request
+    import zipfile
+    
     try:
         print("FFmpeg not found. Attempting to download and install...")
         temp_dir = tempfile.mkdtemp()
@@ -189,9 +203,64 @@ def check_ffmpeg_works(ffmpeg_path):
         return False
 
 
-# Find FFmpeg and ffprobe executables
-FFMPEG_PATH = find_ffmpeg()
-FFPROBE_PATH = find_ffprobe(FFMPEG_PATH)
+# FFmpeg and ffprobe executables, resolved lazily on first use by resolve_ffmpeg()
+FFMPEG_PATH = None
+FFPROBE_PATH = None
+FFMPEG_CAPABILITIES = None
+_ffmpeg_resolved = False
+_ffmpeg_lock = Lock()
+
+
+def resolve_ffmpeg(refresh=False):
+    """Find FFmpeg and ffprobe once and return (ffmpeg_path, ffprobe_path)
+    
+    The result and a capability snapshot are persisted to the user cache so later runs can
+    skip the search entirely. Pass refresh=True to ignore both the in-process and on-disk cache.
+    """
+    global FFMPEG_PATH, FFPROBE_PATH, FFMPEG_CAPABILITIES, _ffmpeg_resolved
+    
+    with _ffmpeg_lock:
+        if _ffmpeg_resolved and not refresh:
+            return FFMPEG_PATH, FFPROBE_PATH
+        
+        cached = None if refresh else load_ffmpeg_cache()
+        if cached:
+            FFMPEG_PATH = cached["ffmpeg_path"]
+            FFPROBE_PATH = cached["ffprobe_path"]
+            FFMPEG_CAPABILITIES = cached["capabilities"]
+        else:
+            FFMPEG_PATH = find_ffmpeg()
+            FFPROBE_PATH = find_ffprobe(FFMPEG_PATH)
+            FFMPEG_CAPABILITIES = query_ffmpeg_capabilities(FFMPEG_PATH) if FFMPEG_PATH else None
+            if FFMPEG_CAPABILITIES:
+                save_ffmpeg_cache(FFMPEG_PATH, FFPROBE_PATH, FFMPEG_CAPABILITIES)
+        
+        _ffmpeg_resolved = True
+        return FFMPEG_PATH, FFPROBE_PATH
+
+
+def get_ffmpeg_path():
+    """Return the FFmpeg executable, resolving it on first use"""
+    return resolve_ffmpeg()[0]
+
+
+def get_ffprobe_path():
+    """Return the ffprobe executable, resolving it on first use"""
+    return resolve_ffmpeg()[1]
+
+
+def get_ffmpeg_capabilities():
+    """Return the capability snapshot ({'version', 'encoders', 'muxers'}) or None if FFmpeg is unusable"""
+    resolve_ffmpeg()
+    return FFMPEG_CAPABILITIES
+
+
+def has_ffmpeg_encoder(encoder_name):
+    """Check whether the resolved FFmpeg build provides an encoder (assumes yes if unknown)"""
+    capabilities = get_ffmpeg_capabilities()
+    if not capabilities or not capabilities.get("encoders"):
+        return True
+    return encoder_name in capabilities["encoders"]
 
 # Define supported formats
 AUDIO_FORMATS = ['mp3', 'wav', 'ogg', 'flac', 'm4a', 'aac', 'wma']
@@ -205,10 +274,10 @@ def is_audio_format(format_name):
     """Check if the given format is an audio format"""
     return format_name.lower() in AUDIO_FORMATS
 
-def get_media_info(file_path):
-    """Get media information using ffprobe"""
+def probe_media_file(file_path):
+    """Run ffprobe on a file and return its format and stream information (uncached)"""
     try:
-        cmd = [FFPROBE_PATH, "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams", file_path]
+        cmd = [get_ffprobe_path(), "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams", file_path]
         
         kwargs = {
             "stdout": subprocess.PIPE,
@@ -222,7 +291,6 @@ def get_media_info(file_path):
         stdout, stderr = process.communicate()
         
         if process.returncode == 0:
-            import json
             return json.loads(stdout.decode('utf-8'))
         else:
             return None
@@ -230,125 +298,1021 @@ def get_media_info(file_path):
         return None
 
 
-def convert_media_file(source_path, output_path, source_format=None, target_format=None, media_type=None):
-    """Convert a media file (audio or video) from one format to another using FFmpeg"""
+_media_info_cache = None
+_media_info_cache_lock = Lock()
+
+
+def get_media_info_cache():
+    """Return the shared on-disk media information cache, or None if it cannot be opened"""
+    global _media_info_cache
+    
+    with _media_info_cache_lock:
+        if _media_info_cache is None:
+            # Loads sqlite3, so only on the first probe rather than at import time
+            from media_converter.probe_cache import MediaInfoCache
+            
+            try:
+                _media_info_cache = MediaInfoCache()
+            except Exception as e:
+                print(f"Warning: Media info cache unavailable, probing without it: {e}")
+                _media_info_cache = False
+        return _media_info_cache or None
+
+
+def get_media_info(file_path):
+    """Get media information using ffprobe, served from the on-disk cache when possible"""
+    cache = get_media_info_cache()
+    if cache is None:
+        return probe_media_file(str(file_path))
+    
     try:
-        # Create output directory if it doesn't exist
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        # Define creationflags to hide command windows on Windows
-        CREATE_NO_WINDOW = 0x08000000
-        
-        # Determine if we're dealing with video or audio
-        if media_type is None:
-            if is_video_format(target_format) or is_video_format(source_format):
-                media_type = 'video'
+        return cache.get(file_path, probe_media_file)
+    except Exception:
+        return probe_media_file(str(file_path))
+
+
+def probe_media_files(file_paths, max_workers=None):
+    """Get media information for many files at once
+    
+    Cached entries are returned directly and missing ones are probed with a bounded pool of
+    workers. Returns a dict mapping each successfully probed path to its information.
+    """
+    file_paths = list(file_paths)
+    cache = get_media_info_cache()
+    if cache is not None:
+        try:
+            return cache.get_many(file_paths, probe_media_file, max_workers)
+        except Exception:
+            pass
+    
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or min(32, (os.cpu_count() or 4) * 2)) as executor:
+        for file_path, info in zip(file_paths, executor.map(probe_media_file, map(str, file_paths))):
+            if info is not None:
+                results[file_path] = info
+    return results
+
+
+def get_cached_media_info(file_path):
+    """Return a file's media information if the cache already knows it, without probing"""
+    cache = get_media_info_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.lookup(file_path)
+    except Exception:
+        return None
+
+
+def get_cached_media_duration(file_path):
+    """Return a file's duration if the media info cache already knows it, without probing"""
+    media_info = get_cached_media_info(file_path)
+    return get_media_duration(file_path, media_info) if media_info else None
+
+
+def get_media_duration(file_path, media_info=None):
+    """Return the duration of a media file in seconds, or None if it is unknown"""
+    if media_info is None:
+        media_info = get_media_info(file_path)
+    if not media_info:
+        return None
+    
+    try:
+        return float(media_info["format"]["duration"])
+    except (KeyError, TypeError, ValueError):
+        pass
+    
+    # Some containers only report durations on their streams
+    durations = []
+    for stream in media_info.get("streams", []):
+        try:
+            durations.append(float(stream["duration"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return max(durations) if durations else None
+
+
+def get_media_type(source_format=None, target_format=None):
+    """Return 'video' if either format is a video format, otherwise 'audio'"""
+    if (target_format and is_video_format(target_format)) or (source_format and is_video_format(source_format)):
+        return 'video'
+    return 'audio'
+
+
+def build_video_codec_options(target_format):
+    """Return the FFmpeg video encoder options for a target format (empty to use FFmpeg's defaults)"""
+    target_format = target_format.lower()
+    
+    if target_format == 'mp4':
+        # Optimized settings for MP4 (especially good for MPEG to MP4)
+        return ["-c:v", "libx264", "-crf", "23", "-preset", "medium"]
+    elif target_format == 'avi':
+        return ["-c:v", "libx264"]
+    elif target_format == 'webm':
+        return ["-c:v", "libvpx-vp9"]
+    elif target_format == 'mkv':
+        return ["-c:v", "libx264"]
+    # For other formats, let FFmpeg choose defaults
+    return []
+
+
+def build_audio_codec_options(target_format, media_type):
+    """Return the FFmpeg audio encoder options for a target format (empty to use FFmpeg's defaults)"""
+    target_format = target_format.lower()
+    
+    if media_type == 'video':
+        # Audio tracks of video conversions
+        if target_format == 'mp4':
+            return ["-c:a", "aac"]
+        elif target_format == 'avi':
+            return ["-c:a", "mp3"]
+        elif target_format == 'webm':
+            return ["-c:a", "libopus"]
+        elif target_format == 'mkv':
+            return ["-c:a", "ac3"]
+    else:
+        # Audio conversion options (keep existing audio logic)
+        if target_format == 'mp3':
+            return ["-c:a", "libmp3lame", "-b:a", "320k"]
+        elif target_format == 'flac':
+            return ["-c:a", "flac"]
+        elif target_format == 'ogg':
+            return ["-c:a", "libvorbis"]
+    return []
+
+
+def build_ffmpeg_options(target_format, media_type, copy_streams=(), tier=None):
+    """Build the format-specific FFmpeg codec options for a conversion
+    
+    Stream types listed in copy_streams ("video", "audio") are copied unchanged instead of
+    being re-encoded. A performance tier (see media_converter.tiers) sets how hard the encoders
+    work; without one the codec options are returned as they are recorded in the manifests.
+    """
+    options = []
+    
+    if media_type == 'video':
+        if "video" in copy_streams:
+            options.extend(["-c:v", "copy"])
+        else:
+            options.extend(build_video_codec_options(target_format))
+    
+    if "audio" in copy_streams:
+        options.extend(["-c:a", "copy"])
+    else:
+        options.extend(build_audio_codec_options(target_format, media_type))
+    
+    return apply_tier(options, tier)
+
+
+def partial_output_path(output_path):
+    """Return the temporary path FFmpeg writes to before the output is renamed into place
+
+    The original extension is kept last so FFmpeg still picks the right muxer.
+    """
+    directory, file_name = os.path.split(output_path)
+    stem, ext = os.path.splitext(file_name)
+    return os.path.join(directory, f".{stem}.{os.getpid()}.{threading.get_ident()}.part{ext}")
+
+
+def remove_file_quietly(path):
+    """Remove a file, ignoring errors if it does not exist"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Serializes updates of usage dicts shared by concurrent FFmpeg runs (e.g. parallel segments)
+_usage_lock = Lock()
+
+# Every running FFmpeg process, so Stop, Ctrl+C and job cancellation end them right away
+PROCESS_REGISTRY = ProcessRegistry()
+
+
+def wait_for_process(process):
+    """Wait for a child process and return its resource usage, or None where os.wait4 is unavailable"""
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return None
+    
+    while True:
+        try:
+            _, status, rusage = os.wait4(process.pid, 0)
+            break
+        except InterruptedError:
+            continue
+        except ChildProcessError:
+            # Already reaped elsewhere
+            process.wait()
+            return None
+    process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    return rusage
+
+
+def run_ffmpeg_command(cmd, progress_callback=None, usage=None, job=None):
+    """Run an FFmpeg command silently and return (returncode, error_text)
+    
+    With a progress_callback, FFmpeg writes its machine-readable progress to stdout
+    (`-progress pipe:1`) and progress_callback(seconds_done, speed) is called as it encodes.
+    If a usage dict is given, the process's wall time, CPU time and peak memory are added to it
+    (see media_converter.tracing.add_process_usage). The process is registered in
+    PROCESS_REGISTRY under job while it runs, so it can be cancelled, paused or pre-empted.
+    """
+    # Configure process for silent operation
+    kwargs = {
+        "stdout": subprocess.PIPE if progress_callback else subprocess.DEVNULL,
+        "stderr": subprocess.PIPE
+    }
+    
+    # Add creationflags on Windows to hide console windows
+    if platform.system() == "Windows":
+        kwargs["creationflags"] = 0x08000000  # CREATE_NO_WINDOW
+    
+    if progress_callback is not None:
+        cmd = cmd[:1] + ["-progress", "pipe:1", "-nostats"] + cmd[1:]
+    
+    started = time.monotonic()
+    process = subprocess.Popen(cmd, **kwargs)
+    PROCESS_REGISTRY.register(process, job)
+    try:
+        if progress_callback is None:
+            stderr = process.stderr.read()
+            process.stderr.close()
+        else:
+            # Drain stderr in the background so FFmpeg never blocks on a full pipe
+            stderr_chunks = []
+            stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+            stderr_reader.start()
+            try:
+                read_progress(process.stdout, progress_callback)
+            finally:
+                process.stdout.close()
+                stderr_reader.join()
+                process.stderr.close()
+            stderr = b"".join(stderr_chunks)
+        
+        # Reap the process ourselves so its resource usage can be collected
+        rusage = wait_for_process(process)
+    finally:
+        PROCESS_REGISTRY.unregister(process)
+    if usage is not None:
+        from media_converter.tracing import add_process_usage
+        
+        with _usage_lock:
+            add_process_usage(usage, time.monotonic() - started, rusage)
+    return process.returncode, stderr.decode('utf-8', errors='replace').strip()
+
+
+def segment_workers_for(threads=None, concurrent_jobs=1):
+    """Return (concurrent segment encodes, FFmpeg threads per segment) for segmented encoding
+    
+    The cores are shared with the other files of the pool (concurrent_jobs conversions at once),
+    so a pool that already keeps every core busy gets no extra segment encoders.
+    """
+    cpus = available_cpus()
+    threads_per_segment = threads or min(VIDEO_THREADS_PER_JOB, cpus)
+    return max(1, cpus // threads_per_segment // max(1, concurrent_jobs)), threads_per_segment
+
+
+def build_output_options(source_path, target_format, media_type, threads=None, remux=True, tier=DEFAULT_TIER, probe=True):
+    """Return (FFmpeg options for one output of source_path, stream types copied instead of encoded)
+    
+    With probe=False, stream copy is only planned from media information already in the cache.
+    """
+    copy_streams = set()
+    if remux and may_stream_copy(source_path, target_format, media_type):
+        media_info = get_media_info(source_path) if probe else get_cached_media_info(source_path)
+        copy_streams = plan_stream_copy(media_info, target_format, media_type)
+    options = build_ffmpeg_options(target_format, media_type, copy_streams, tier)
+    if threads:
+        options.extend(["-threads", str(threads)])
+    return options, copy_streams
+
+
+def plan_media_conversion(source_path, output_path, source_format=None, target_format=None, media_type=None,
+                          threads=None, remux=True, details=None, segment_threshold=None,
+                          segment_seconds=DEFAULT_SEGMENT_SECONDS, extra_outputs=None, tier=DEFAULT_TIER,
+                          concurrent_jobs=1):
+    """Work out how convert_media_file converts a file, without running FFmpeg
+    
+    Creates the output directories and returns a dict with "cmd" (the FFmpeg command),
+    "outputs" (the (temporary path, final path) pairs it writes) and "segmented" (the keyword
+    arguments for encode_segmented when the file is encoded in parallel segments, else None;
+    "cmd" then only names the input). See convert_media_file for the arguments.
+    """
+    # Create output directory if it doesn't exist
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    
+    # Determine if we're dealing with video or audio
+    if media_type is None:
+        media_type = get_media_type(source_format, target_format)
+    
+    if target_format is None:
+        target_format = os.path.splitext(output_path)[1].lstrip('.')
+    
+    # Build FFmpeg command based on media type and formats
+    temp_output_path = partial_output_path(output_path)
+    plan = {"cmd": [get_ffmpeg_path(), "-hide_banner", "-loglevel", "error", "-i", source_path],
+            "outputs": [(temp_output_path, output_path)], "segmented": None}
+    cmd = plan["cmd"]
+    
+    # Copy streams whose codecs already fit the target container
+    output_options, copy_streams = build_output_options(source_path, target_format, media_type, threads, remux, tier)
+    if details is not None:
+        details["stream_copy"] = sorted(copy_streams)
+        details["tier"] = tier
+    
+    # Long videos can be encoded in parallel segments; only worth it when the video is re-encoded
+    video_options = apply_tier(build_video_codec_options(target_format), tier)
+    if (segment_threshold is not None and not extra_outputs and media_type == 'video'
+            and "video" not in copy_streams and video_options):
+        duration = get_media_duration(source_path)
+        segment_workers, threads_per_segment = segment_workers_for(threads, concurrent_jobs)
+        if duration is not None and duration >= segment_threshold and segment_workers > 1:
+            if "audio" in copy_streams:
+                audio_options = ["-c:a", "copy"]
             else:
-                media_type = 'audio'
-        
-        # Build FFmpeg command based on media type and formats
-        cmd = [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-i", source_path]
-        
-        # Add format-specific options
-        if media_type == 'video':
-            # Video conversion options
-            if target_format.lower() == 'mp4':
-                # Optimized settings for MP4 (especially good for MPEG to MP4)
-                cmd.extend(["-c:v", "libx264", "-c:a", "aac", "-crf", "23", "-preset", "medium"])
-            elif target_format.lower() == 'avi':
-                cmd.extend(["-c:v", "libx264", "-c:a", "mp3"])
-            elif target_format.lower() == 'webm':
-                cmd.extend(["-c:v", "libvpx-vp9", "-c:a", "libopus"])
-            elif target_format.lower() == 'mkv':
-                cmd.extend(["-c:v", "libx264", "-c:a", "ac3"])
-            # For other formats, let FFmpeg choose defaults
+                audio_options = apply_tier(build_audio_codec_options(target_format, media_type), tier)
+            plan["segmented"] = {
+                "ffmpeg_path": get_ffmpeg_path(),
+                "source_path": source_path,
+                "output_path": temp_output_path,
+                "video_options": video_options,
+                "audio_options": audio_options,
+                "segment_seconds": segment_seconds,
+                "workers": segment_workers,
+                "threads_per_segment": threads_per_segment,
+            }
+            return plan
+    
+    cmd.extend(output_options)
+    
+    # Add output file and overwrite flag
+    cmd.extend(["-y", temp_output_path])
+    
+    # Further outputs from the same decode, each with its own options
+    for extra_format, extra_output_path in extra_outputs or []:
+        os.makedirs(os.path.dirname(extra_output_path), exist_ok=True)
+        # An audio output of a video source is an audio conversion, so go by the output's format alone
+        extra_media_type = get_media_type(target_format=extra_format)
+        extra_options, _ = build_output_options(source_path, extra_format, extra_media_type, threads, remux, tier)
+        extra_temp_path = partial_output_path(extra_output_path)
+        plan["outputs"].append((extra_temp_path, extra_output_path))
+        cmd.extend(extra_options)
+        cmd.extend(["-y", extra_temp_path])
+    
+    return plan
+
+
+def plan_batch_conversion(jobs, threads=None, remux=True, tier=DEFAULT_TIER):
+    """Plan one FFmpeg run that converts several files, each input mapped to its own output
+    
+    jobs is a list of (source_path, output_path, source_format, target_format, media_type).
+    Returns a plan like plan_media_conversion (without segmenting) whose outputs are in job
+    order, plus "stream_copy": the stream types copied for each job. Clips are not probed for
+    stream copy (that would cost a process per file again); only cached information is used.
+    """
+    cmd = [get_ffmpeg_path(), "-hide_banner", "-loglevel", "error"]
+    for source_path, _, _, _, _ in jobs:
+        cmd.extend(["-i", str(source_path)])
+    
+    plan = {"cmd": cmd, "outputs": [], "segmented": None, "stream_copy": []}
+    for index, (source_path, output_path, source_format, target_format, media_type) in enumerate(jobs):
+        os.makedirs(os.path.dirname(str(output_path)), exist_ok=True)
+        options, copy_streams = build_output_options(str(source_path), target_format, media_type, threads, remux, tier,
+                                                     probe=False)
+        temp_output_path = partial_output_path(str(output_path))
+        plan["outputs"].append((temp_output_path, str(output_path)))
+        plan["stream_copy"].append(sorted(copy_streams))
+        
+        # Without -map every output would take its streams from the first input
+        if media_type == 'video' and is_video_format(target_format):
+            cmd.extend(["-map", f"{index}:v:0?"])
+        cmd.extend(["-map", f"{index}:a:0?"])
+        cmd.extend(options)
+        cmd.extend(["-y", temp_output_path])
+    return plan
+
+
+def discard_conversion_outputs(plan):
+    """Remove the temporary outputs of a planned conversion"""
+    for temp_path, _ in plan["outputs"]:
+        remove_file_quietly(temp_path)
+
+
+def finish_media_conversion(plan, source_path, success, error_message):
+    """Move the outputs of a finished conversion into place, or clean up and report a failure"""
+    if not success:
+        discard_conversion_outputs(plan)
+        print(f"❌ Error converting {os.path.basename(source_path)}")
+        print(f"   FFmpeg Error: {error_message[:200]}...")
+        print(f"   Command: {' '.join(plan['cmd'][:6])}...")  # Show first part of command
+        return False
+    
+    # Move the finished files into place
+    for temp_path, final_path in plan["outputs"]:
+        os.replace(temp_path, final_path)
+    return True
+
+
+def conversion_cache_key(cache, plan, source_path):
+    """Return the ConversionCache key of a planned conversion
+    
+    The key covers the source's content, the FFmpeg arguments (without paths) and the FFmpeg
+    version, so an upgraded FFmpeg or changed settings never reuse old outputs.
+    """
+    from media_converter.output_cache import command_fingerprint
+    
+    capabilities = get_ffmpeg_capabilities() or {}
+    segmented = None
+    if plan["segmented"]:
+        segmented = {key: value for key, value in plan["segmented"].items()
+                     if key not in ("ffmpeg_path", "source_path", "output_path", "workers")}
+    fingerprint = command_fingerprint(plan["cmd"], source_path, [temp for temp, _ in plan["outputs"]],
+                                      capabilities.get("version"), segmented)
+    return cache.make_key(source_path, fingerprint)
+
+
+def fetch_cached_conversion(cache, plan, source_path, details=None):
+    """Materialize a planned conversion's outputs from the cache
+    
+    Returns (key, hit); key is None when the cache cannot be used, and the output should then
+    simply be converted. details["cache_hit"] is set on a hit.
+    """
+    try:
+        key = conversion_cache_key(cache, plan, source_path)
+        hit = cache.fetch(key, [final_path for _, final_path in plan["outputs"]])
+    except Exception as e:
+        print(f"\n⚠️ Conversion cache unavailable for {os.path.basename(source_path)}: {e}")
+        return None, False
+    if hit and details is not None:
+        details["cache_hit"] = True
+    return key, hit
+
+
+def store_cached_conversion(cache, key, plan):
+    """Add the finished outputs of a conversion to the cache (failures only cost the cache entry)"""
+    try:
+        cache.store(key, [final_path for _, final_path in plan["outputs"]])
+    except Exception as e:
+        print(f"\n⚠️ Could not add {os.path.basename(plan['outputs'][0][1])} to the conversion cache: {e}")
+
+
+def convert_media_file(source_path, output_path, source_format=None, target_format=None, media_type=None,
+                       threads=None, remux=True, details=None, segment_threshold=None,
+                       segment_seconds=DEFAULT_SEGMENT_SECONDS, extra_outputs=None, progress_callback=None, cache=None,
+                       job=None, tier=DEFAULT_TIER, concurrent_jobs=1):
+    """Convert a media file (audio or video) from one format to another using FFmpeg
+    
+    FFmpeg writes to a temporary file that is atomically renamed to output_path on success,
+    so an interrupted conversion never leaves a truncated output behind. threads limits the
+    number of threads FFmpeg uses for the job (FFmpeg's own default when None).
+    
+    With remux enabled, the source streams are probed and those whose codecs already fit the
+    target container are copied (`-c copy`) instead of re-encoded. If a details dict is given,
+    details["stream_copy"] is set to the sorted list of stream types that were copied.
+    
+    Videos at least segment_threshold seconds long (None disables this) whose video stream is
+    re-encoded are split at keyframes into segment_seconds chunks that are encoded in parallel;
+    details["segments"] is then set to the number of segments. concurrent_jobs is the number of
+    files the caller converts at the same time; the segment encoders share the cores with them.
+    
+    extra_outputs is an optional list of (target_format, output_path) written by the same FFmpeg
+    process, so the source is read and decoded only once for all targets. Each extra output gets
+    the options it would get on its own. Segmented encoding is not used with extra outputs.
+    
+    progress_callback(seconds_done, speed) is called with the media time encoded so far and
+    FFmpeg's speed (× realtime, or None) while a single-process conversion runs. The wall time,
+    CPU time and peak memory of the FFmpeg processes are added to details as well.
+    
+    With a ConversionCache, outputs already converted from identical content with identical
+    settings are taken from the cache instead (details["cache_hit"] is set), and new outputs
+    are added to it.
+    
+    job is the key its FFmpeg processes are registered under in PROCESS_REGISTRY. A cancelled
+    conversion returns False without reporting an error; its partial outputs are removed.
+    
+    tier is the performance tier (fast, balanced or archival) of the encoders. Like threads, it
+    is not part of the settings recorded in the manifests.
+    """
+    if PROCESS_REGISTRY.is_cancelled(job):
+        return False
+    
+    plan = None
+    try:
+        plan = plan_media_conversion(source_path, output_path, source_format, target_format, media_type,
+                                     threads, remux, details, segment_threshold, segment_seconds, extra_outputs, tier,
+                                     concurrent_jobs)
+        
+        cache_key = None
+        if cache is not None:
+            cache_key, hit = fetch_cached_conversion(cache, plan, source_path, details)
+            if hit:
+                return True
+        
+        if plan["segmented"]:
+            def run_segment_command(segment_cmd):
+                return run_ffmpeg_command(segment_cmd, usage=details, job=job)
+            
+            success, error_message, segment_count = encode_segmented(run_segment_command, **plan["segmented"])
+            if details is not None:
+                details["segments"] = segment_count
         else:
-            # Audio conversion options (keep existing audio logic)
-            if target_format.lower() == 'mp3':
-                cmd.extend(["-c:a", "libmp3lame", "-b:a", "320k"])
-            elif target_format.lower() == 'flac':
-                cmd.extend(["-c:a", "flac"])
-            elif target_format.lower() == 'ogg':
-                cmd.extend(["-c:a", "libvorbis"])
+            # Run the conversion process
+            returncode, error_message = run_ffmpeg_command(plan["cmd"], progress_callback, usage=details, job=job)
+            success = returncode == 0
         
-        # Add output file and overwrite flag
-        cmd.extend(["-y", output_path])
-        
-        # Configure process for silent operation
-        kwargs = {
-            "stdout": subprocess.PIPE,
-            "stderr": subprocess.PIPE
-        }
-        
-        # Add creationflags on Windows to hide console windows
-        if platform.system() == "Windows":
-            kwargs["creationflags"] = CREATE_NO_WINDOW
-            
-        # Run the conversion process
-        process = subprocess.Popen(cmd, **kwargs)
-        stdout, stderr = process.communicate()
-          # Check if the conversion was successful
-        if process.returncode != 0:
-            error_message = stderr.decode('utf-8', errors='replace').strip()
-            print(f"❌ Error converting {os.path.basename(source_path)}")
-            print(f"   FFmpeg Error: {error_message[:200]}...")
-            print(f"   Command: {' '.join(cmd[:6])}...")  # Show first part of command
+        if not success and PROCESS_REGISTRY.is_cancelled(job):
+            discard_conversion_outputs(plan)
             return False
         
-        return True
-        
+        success = finish_media_conversion(plan, source_path, success, error_message)
+        if success and cache_key is not None:
+            store_cached_conversion(cache, cache_key, plan)
+        return success
+    
     except Exception as e:
+        if plan:
+            discard_conversion_outputs(plan)
         print(f"❌ Exception converting {os.path.basename(source_path)}: {str(e)}")
         return False
 
 
+def convert_media_batch(jobs, threads=None, remux=True, details=None, tier=DEFAULT_TIER):
+    """Convert several (small) files with a single FFmpeg process; returns a list of per-file results
+    
+    jobs is a list of (source_path, output_path, source_format, target_format, media_type). If
+    the batch fails, its outputs are discarded and every file is retried on its own with
+    convert_media_file, so one broken file only fails itself. details, if given, is a list with
+    a dict per job that receives the job's share of the batch's resource usage.
+    """
+    details = details if details is not None else [{} for _ in jobs]
+    
+    def convert_one_by_one():
+        return [
+            convert_media_file(str(source_path), str(output_path), source_format, target_format, media_type,
+                               threads=threads, remux=remux, details=job_details, tier=tier)
+            for (source_path, output_path, source_format, target_format, media_type), job_details in zip(jobs, details)
+        ]
+    
+    if len(jobs) == 1:
+        return convert_one_by_one()
+    
+    plan = None
+    usage = {}
+    try:
+        plan = plan_batch_conversion(jobs, threads, remux, tier)
+        returncode, error_message = run_ffmpeg_command(plan["cmd"], usage=usage)
+        if returncode == 0:
+            for temp_path, final_path in plan["outputs"]:
+                os.replace(temp_path, final_path)
+            
+            # Split the usage of the shared process evenly between its files
+            for job_details, copied in zip(details, plan["stream_copy"]):
+                job_details["batch_size"] = len(jobs)
+                job_details["stream_copy"] = copied
+                for key in ("ffmpeg_seconds", "cpu_user", "cpu_sys"):
+                    if key in usage:
+                        job_details[key] = usage[key] / len(jobs)
+                if "max_rss" in usage:
+                    job_details["max_rss"] = usage["max_rss"]
+                job_details["ffmpeg_runs"] = 1
+            return [True] * len(jobs)
+        reason = error_message[:200]
+    except Exception as e:
+        reason = str(e)
+    
+    if plan:
+        discard_conversion_outputs(plan)
+    if PROCESS_REGISTRY.is_cancelled():
+        return [False] * len(jobs)
+    print(f"\n↻ Batch of {len(jobs)} files failed ({reason}); retrying them one by one")
+    return convert_one_by_one()
+
+
 # Keep the old function name for backward compatibility
 def convert_audio_file(source_path, output_path, source_format=None, target_format=None):
     """Convert an audio file from one format to another using FFmpeg (legacy function)"""
     return convert_media_file(source_path, output_path, source_format, target_format, 'audio')
 
 
-def convert_directory(input_dirs, output_dir, source_format, target_format, max_workers=None):
-    """Convert all media files in the input directories to the target format"""
+# Jobs allowed to wait in the pool per worker while the directory walk continues
+DISCOVERY_QUEUE_FACTOR = 4
+
+# TCP port of the coordinator for distributed batches (--coordinator / --worker)
+DEFAULT_COORDINATOR_PORT = 47300
+
+# Value for max_workers / -t that enables the adaptive concurrency controller
+THREADS_AUTO = "auto"
+
+
+def setup_concurrency(max_workers, media_type, log=print):
+    """Resolve the worker count for a batch
     
-    # Determine media type
-    is_video_conversion = is_video_format(target_format) or is_video_format(source_format)
-    media_type = 'video' if is_video_conversion else 'audio'
-    media_type_display = media_type.upper()
+    Returns (max_workers, ffmpeg_threads_per_job, controller). With max_workers == "auto" the
+    cores are split between concurrent jobs and FFmpeg threads, and an adaptive controller is
+    returned that adjusts concurrency at runtime; otherwise threads and controller are None.
+    """
+    if max_workers == THREADS_AUTO:
+        max_jobs, threads_per_job = plan_concurrency(media_type)
+        controller = AdaptiveConcurrencyController(max_jobs, threads_per_job)
+        log(controller.describe())
+        return max_jobs, threads_per_job, controller
+    
+    if max_workers is None:
+        max_workers = os.cpu_count() or 4
+    return max_workers, None, None
+
+
+def parse_thread_count(value):
+    """argparse type for -t: a positive integer or 'auto'"""
+    if value.lower() == THREADS_AUTO:
+        return THREADS_AUTO
+    try:
+        count = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number or '{THREADS_AUTO}', got {value!r}")
+    if count < 1:
+        raise argparse.ArgumentTypeError("thread count must be at least 1")
+    return count
+
+
+def parse_cache_size(value):
+    """argparse type for --cache-max-size and --staging-budget: bytes, or a number with a K/M/G/T suffix"""
+    from media_converter.output_cache import parse_size
+    
+    try:
+        return parse_size(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a size such as 500M or 20G, got {value!r}")
+
+
+def parse_deadline_argument(value):
+    """argparse type for --deadline: a time of day or a duration from now"""
+    try:
+        return parse_deadline(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a time such as 18:30 or a duration such as 2h30m, got {value!r}")
+
+
+# Job ordering for batch conversions
+SCHEDULE_STREAM = "stream"                # Convert files in the order the walk finds them
+SCHEDULE_LONGEST_FIRST = "longest-first"  # Walk and probe everything first, then start the longest jobs first
+SCHEDULE_MODES = [SCHEDULE_STREAM, SCHEDULE_LONGEST_FIRST]
+
+# How conversions are run
+ENGINE_THREADS = "threads"  # One pool thread per running conversion
+ENGINE_ASYNC = "async"      # An asyncio event loop (media_converter.async_engine); suits many short files
+ENGINE_MODES = [ENGINE_THREADS, ENGINE_ASYNC]
+
+# Results of convert_media_file_incremental
+CONVERSION_CONVERTED = "converted"
+CONVERSION_SKIPPED = "skipped"
+CONVERSION_FAILED = "failed"
+CONVERSION_COPYING = "copying"  # Converted in a staging area; the outputs are still being copied back
+
+
+def conversion_settings(target_format, media_type, remux=True):
+    """Return the settings recorded in the manifest for a conversion"""
+    settings = [target_format.lower()] + build_ffmpeg_options(target_format, media_type)
+    if remux:
+        settings.append("+remux")
+    return settings
+
+
+def stale_conversion_targets(source_path, output_path, source_format, target_format, media_type, manifest, force=False,
+                             extra_targets=None, remux=True):
+    """Return the outputs of a source that need converting as (format, path, manifest, media type, settings)
+    
+    The first target is the one the FFmpeg run is planned around; the rest become extra outputs.
+    """
+    targets = [(target_format, output_path, manifest, media_type)]
+    for extra_format, extra_output_path, extra_manifest in extra_targets or []:
+        targets.append((extra_format, extra_output_path, extra_manifest, get_media_type(target_format=extra_format)))
+    
+    # Only produce the outputs that are out of date
+    stale_targets = []
+    for target in targets:
+        settings = conversion_settings(target[0], target[3], remux)
+        if force or not target[2].is_up_to_date(source_path, target[1], settings):
+            stale_targets.append(target + (settings,))
+    return stale_targets
+
+
+def record_conversion_results(stale_targets, source_path, signature, success):
+    """Record converted outputs in their manifests, or forget them if the conversion failed"""
+    for _, target_output, target_manifest, _, settings in stale_targets:
+        if success:
+            target_manifest.record(source_path, target_output, settings, signature)
+        else:
+            target_manifest.forget(target_output)
+
+
+def convert_media_file_incremental(source_path, output_path, source_format, target_format, media_type, manifest, force=False,
+                                   concurrency=None, extra_targets=None, progress=None, staging=None, on_copied_back=None,
+                                   **convert_options):
+    """Convert a media file unless the manifest shows its output is already up to date
+    
+    extra_targets is an optional list of (target_format, output_path, manifest) for further
+    outputs produced from the same decode; only the outputs that are out of date are written,
+    all in one FFmpeg run. When an AdaptiveConcurrencyController is given, the conversion waits
+    for a slot (and enough memory) before FFmpeg starts. A BatchProgress, if given, is told
+    about the job and its media time as FFmpeg encodes. Extra keyword arguments are passed to
+    convert_media_file. Returns CONVERSION_CONVERTED, CONVERSION_SKIPPED or CONVERSION_FAILED.
+    
+    With a StagingArea (media_converter.staging), FFmpeg reads the staged local copy of the
+    source and writes to scratch. A successful conversion then returns CONVERSION_COPYING: the
+    outputs are copied back in the background, recorded in the manifests once they are in
+    place, and on_copied_back(result) is called with the final result.
+    """
+    try:
+        if PROCESS_REGISTRY.is_cancelled(convert_options.get("job")):
+            return CONVERSION_FAILED
+        
+        stale_targets = stale_conversion_targets(source_path, output_path, source_format, target_format, media_type,
+                                                 manifest, force, extra_targets, convert_options.get("remux", True))
+        if not stale_targets:
+            if progress is not None:
+                progress.job_skipped()
+            return CONVERSION_SKIPPED
+        
+        # Take the signature before converting so changes made during the conversion are noticed next run
+        try:
+            signature = source_signature(source_path)
+        except OSError:
+            signature = None
+        
+        primary_format, primary_output, _, primary_media_type, _ = stale_targets[0]
+        convert_source = str(source_path)
+        output_paths = [str(target[1]) for target in stale_targets]
+        if staging is not None:
+            convert_source = staging.input_path(source_path)
+            output_paths = [staging.output_path(path) for path in output_paths]
+        extra_outputs = [(target[0], path) for target, path in zip(stale_targets[1:], output_paths[1:])]
+        if extra_outputs:
+            convert_options["extra_outputs"] = extra_outputs
+        
+        if concurrency is not None:
+            media_info = get_media_info(source_path) if media_type == 'video' else None
+            memory_estimate = estimate_job_memory(media_type, media_info)
+            slot_wait_started = time.monotonic()
+            acquired = concurrency.acquire(memory_estimate)
+            if convert_options.get("details") is not None:
+                convert_options["details"]["slot_wait"] = time.monotonic() - slot_wait_started
+            if not acquired:
+                if progress is not None:
+                    progress.job_skipped()
+                return CONVERSION_FAILED
+        
+        job_id = object()
+        if progress is not None:
+            progress.job_started(job_id, get_media_duration(source_path))
+            convert_options["progress_callback"] = lambda seconds_done, speed: progress.job_progress(job_id, seconds_done, speed)
+        try:
+            success = convert_media_file(convert_source, output_paths[0], source_format, primary_format,
+                                         primary_media_type, **convert_options)
+        finally:
+            if progress is not None:
+                progress.job_finished(job_id)
+            if concurrency is not None:
+                concurrency.release()
+    finally:
+        # Every exit frees the staged input and its share of the staging budget
+        if staging is not None:
+            staging.release_input(source_path)
+    
+    if staging is not None and success:
+        def copied_back(copied):
+            record_conversion_results(stale_targets, source_path, signature, copied)
+            if on_copied_back is not None:
+                on_copied_back(CONVERSION_CONVERTED if copied else CONVERSION_FAILED)
+        
+        staging.copy_back(list(zip(output_paths, [str(target[1]) for target in stale_targets])), on_done=copied_back)
+        return CONVERSION_COPYING
+    
+    record_conversion_results(stale_targets, source_path, signature, success)
+    return CONVERSION_CONVERTED if success else CONVERSION_FAILED
+
+
+def convert_media_batch_incremental(jobs, progress=None):
+    """Convert the out-of-date files of a batch with one FFmpeg process (see convert_media_batch)
+    
+    jobs is a list of dicts with the arguments of convert_media_file_incremental for a single
+    target (source_path, output_path, source_format, target_format, media_type, manifest, and
+    optionally force, threads, remux, tier and details). Returns the result for every job.
+    """
+    results = [CONVERSION_SKIPPED] * len(jobs)
+    pending = []
+    for index, job in enumerate(jobs):
+        stale_targets = stale_conversion_targets(job["source_path"], job["output_path"], job["source_format"],
+                                                 job["target_format"], job["media_type"], job["manifest"],
+                                                 job.get("force", False), remux=job.get("remux", True))
+        if not stale_targets:
+            if progress is not None:
+                progress.job_skipped()
+            continue
+        try:
+            signature = source_signature(job["source_path"])
+        except OSError:
+            signature = None
+        pending.append((index, stale_targets, signature))
+    
+    if not pending:
+        return results
+    
+    # Durations only come from the cache here; probing every clip would cost a process per file again
+    job_ids = [object() for _ in pending]
+    if progress is not None:
+        for job_id, (index, _, _) in zip(job_ids, pending):
+            progress.job_started(job_id, get_cached_media_duration(jobs[index]["source_path"]))
     
-    # Collect all source files from all input directories
-    all_source_files = []
+    batch_jobs = [(jobs[index]["source_path"], jobs[index]["output_path"], jobs[index]["source_format"],
+                   jobs[index]["target_format"], jobs[index]["media_type"]) for index, _, _ in pending]
+    details = [jobs[index].setdefault("details", {}) for index, _, _ in pending]
+    try:
+        outcomes = convert_media_batch(batch_jobs, jobs[0].get("threads"), jobs[0].get("remux", True), details,
+                                       jobs[0].get("tier", DEFAULT_TIER))
+    finally:
+        if progress is not None:
+            for job_id in job_ids:
+                progress.job_finished(job_id)
+    
+    for (index, stale_targets, signature), success in zip(pending, outcomes):
+        record_conversion_results(stale_targets, jobs[index]["source_path"], signature, success)
+        results[index] = CONVERSION_CONVERTED if success else CONVERSION_FAILED
+    return results
+
+
+def get_output_file_path(source_file_path, input_root_path, output_format_dir, target_format):
+    """Return the output path for a source file, mirroring its folder structure below input_root_path"""
+    rel_path = source_file_path.relative_to(input_root_path)
+    
+    # If the file is in a subdirectory, keep that structure in the output
+    target_file_dir = Path(output_format_dir)
+    if rel_path.parent != Path('.'):
+        target_file_dir = target_file_dir / rel_path.parent
+    
+    # Set the output file path with new extension
+    return target_file_dir / f"{source_file_path.stem}.{target_format}"
+
+
+def get_output_format_dir(output_dir, target_format):
+    """Return the per-format output directory (MP4s, WAVs, etc.)"""
+    return Path(output_dir) / (target_format.upper() + 's')
+
+
+def print_progress(done_files, total_files, finished_discovery, terminal_width, media_progress=None):
+    """Print the CLI progress bar; while files are still being discovered only counts are shown
+    
+    media_progress is an optional BatchProgress snapshot; when it knows the total media time the
+    bar shows media seconds processed (not finished files) and the ETA and speeds are appended.
+    """
+    media_known = media_progress is not None and media_progress["total_seconds"] > 0
+    if not finished_discovery:
+        line = f"Progress: {done_files} converted, {total_files} found so far (scanning...)"
+        if media_known:
+            line += f" {media_progress['throughput']:.1f}x total"
+        print("\r" + line[:terminal_width - 1].ljust(terminal_width - 1), end='')
+        return
+    
+    # Calculate progress percentage
+    if media_known:
+        progress = min(100.0, media_progress["percent"])
+    else:
+        progress = (done_files / total_files) * 100 if total_files else 100.0
+    details = " " + describe_progress(media_progress) if media_known else ""
+    bar_length = max(10, min(50, terminal_width - 30 - len(details)))
+    filled_length = int(bar_length * progress // 100)
+    bar = '█' * filled_length + '░' * (bar_length - filled_length)
+    
+    # Print progress
+    line = f"Progress: [{bar}] {progress:.1f}% ({done_files}/{total_files}){details}"
+    print("\r" + line[:terminal_width - 1].ljust(terminal_width - 1), end='')
+
+
+def schedule_longest_first(source_file_infos, max_workers, skip=None, log=print):
+    """Order (source_file, input_root) jobs by decreasing estimated cost and log a makespan report
+    
+    Costs come from ffprobe durations and frame sizes (through the media info cache), falling
+    back to file size. Jobs for which skip(job) is True are expected to finish instantly, so
+    they are neither probed nor counted.
+    """
+    source_file_infos = list(source_file_infos)
+    
+    file_sizes = {}
+    to_probe = []
+    for source_file_info in source_file_infos:
+        if skip and skip(source_file_info):
+            continue
+        try:
+            file_sizes[source_file_info] = source_file_info[0].stat().st_size
+        except OSError:
+            file_sizes[source_file_info] = 0
+        to_probe.append(source_file_info[0])
+    
+    if to_probe:
+        log(f"Estimating conversion cost of {len(to_probe)} files...")
+    media_infos_by_path = probe_media_files(to_probe)
+    media_infos = {info: media_infos_by_path.get(info[0]) for info in file_sizes}
+    
+    costs = estimate_costs(file_sizes, media_infos)
+    for source_file_info in source_file_infos:
+        costs.setdefault(source_file_info, 0.0)
+    
+    ordered = order_longest_first(source_file_infos, costs)
+    
+    if file_sizes:
+        report = makespan_report(
+            [costs[info] for info in source_file_infos if info in file_sizes],
+            [costs[info] for info in ordered if info in file_sizes],
+            max_workers
+        )
+        for line in format_makespan_report(report):
+            log(line)
+    
+    return ordered
+
+
+def convert_directory(input_dirs, output_dir, source_format, target_format, max_workers=None, force=False,
+                      schedule=SCHEDULE_STREAM, remux=True, segment_threshold=None,
+                      segment_seconds=DEFAULT_SEGMENT_SECONDS, trace_path=None, engine=ENGINE_THREADS,
+                      batch_small_files=False, dedup=False, cache_dir=None, cache_max_bytes=None,
+                      tier=DEFAULT_TIER, deadline=None, staging_dir=None, staging_budget=None, files=None,
+                      should_stop=None, log=print, log_error=None, on_progress=None, on_file=None,
+                      on_job_started=None, on_job_finished=None):
+    """Convert all media files in the input directories to the target format
+    
+    target_format may also be a list of formats; each source is then decoded once and written to
+    every format's own output directory by a single FFmpeg process. With the default "stream"
+    schedule, files are converted as soon as the directory walk finds them, with a bounded
+    number of jobs waiting in the pool. The "longest-first" schedule walks and probes everything
+    first and starts the most expensive jobs first, which shortens batches that mix long and
+    short files. Files whose source and settings are unchanged since the last run (according to
+    the output tree's manifest) are skipped unless force is True. With remux enabled, streams
+    that already fit the target container are copied, not re-encoded. Videos at least
+    segment_threshold seconds long are encoded in parallel segments. With a trace_path, a
+    per-job trace (queue wait, wall and CPU time, peak memory, bytes) is written there as JSON
+    lines and summarized with percentiles at the end. The "async" engine runs the conversions
+    from an asyncio event loop instead of a thread pool. With batch_small_files, short files are
+    grouped so one FFmpeg process converts several of them. With dedup, byte-identical sources
+    are converted once and the other outputs are hardlinked, reflinked or copied from the first
+    one. With a cache_dir, outputs are taken from (and added to) a conversion cache shared with
+    other output trees and processes, capped at cache_max_bytes (default 20 GiB); small batched
+    runs are not cached. tier sets the encoder speed/quality trade-off; with a deadline (a
+    time.time() timestamp) each job instead gets the slowest tier whose measured speed still
+    finishes the batch by then. With a staging_dir, inputs are prefetched to that local scratch
+    directory (using at most staging_budget bytes, 4 GiB by default), encoded there and copied
+    back to the output tree in the background.
+    
+    The GUI runs the same driver through the remaining arguments. files lists the
+    (source_file, input_root) jobs to convert instead of walking input_dirs, and no new jobs are
+    started once should_stop() returns True. Messages go to log(message) and log_error(message),
+    progress to on_progress(done, found, finished_discovery, media_progress_snapshot), every
+    finished file to on_file(source_file_info, result, details), and on_job_started(job) and
+    on_job_finished(job) bracket each conversion; by default all of them print to the terminal.
+    """
+    
+    # Handle one or several target formats
+    target_formats = [target_format] if isinstance(target_format, str) else list(target_format)
+    primary_format = target_formats[0]
+    
+    # Determine media type
+    media_type = get_media_type(source_format, primary_format)
     
     # Handle both single directory (string) and multiple directories (list)
     if isinstance(input_dirs, str):
         input_dirs = [input_dirs]
     
+    valid_dirs = []
     for input_dir in input_dirs:
-        input_path = Path(input_dir)
-        if not input_path.exists():
-            print(f"Warning: Input directory does not exist: {input_dir}")
+        if not Path(input_dir).exists():
+            log(f"Warning: Input directory does not exist: {input_dir}")
             continue
-            
-        # Find all files with the specified source format
-        source_files = list(input_path.rglob(f'*.{source_format}'))
-        all_source_files.extend([(source_file, input_path) for source_file in source_files])
+        valid_dirs.append(input_dir)
     
-    total_files = len(all_source_files)
+    if files is None:
+        log(f"Scanning for {source_format.upper()} files and starting {media_type} conversion...")
+    else:
+        log(f"Starting {media_type} conversion...")
     
-    if total_files == 0:
-        print(f"No {source_format.upper()} files found in the specified directories.")
-        return 0, 0
-
-    print(f"Found {total_files} {source_format.upper()} files. Starting {media_type} conversion...")
+    # Output directory for each format (created on demand by the conversions)
+    output_format_dirs = {fmt: get_output_format_dir(output_dir, fmt) for fmt in target_formats}
     
-    # Create output directory structure
-    output_path = Path(output_dir)
-    output_format_dir = output_path / (target_format.upper() + 's')  # MP4s, WAVs, etc.
-    output_format_dir.mkdir(parents=True, exist_ok=True)
+    # Manifests of previously converted files and the settings used for them
+    manifests = {fmt: ConversionManifest(output_format_dirs[fmt]) for fmt in target_formats}
     
     # Progress tracking
     converted_files = 0
+    skipped_files = 0
+    remuxed_files = 0
+    cached_files = 0
+    batched_files = 0
+    batch_runs = 0
+    duplicates = {}
+    dedup_methods = {}
+    dedup_cpu_saved = 0.0
     counter_lock = Lock()
+    discovery = DiscoveryProgress()
     
     # Get terminal width for progress bar
     try:
@@ -356,599 +1320,451 @@ def convert_directory(input_dirs, output_dir, source_format, target_format, max_
     except:
         terminal_width = 80
     
-    def convert_task(source_file_info):
-        nonlocal converted_files
-        source_file_path, input_root_path = source_file_info
-        
-        # Determine the relative path to maintain folder structure
-        rel_path = source_file_path.relative_to(input_root_path)
-        
-        # Create the output path with target format directory and same structure
-        target_file_dir = output_format_dir
-        
-        # If the file is in a subdirectory, create that structure in the output
-        if rel_path.parent != Path('.'):
-            target_file_dir = output_format_dir / rel_path.parent
-            target_file_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Set the output file path with new extension
-        output_file_path = target_file_dir / f"{source_file_path.stem}.{target_format}"
-        
-        # Convert the file using the new media conversion function
-        success = convert_media_file(
-            str(source_file_path), 
-            str(output_file_path),
-            source_format,
-            target_format,
-            media_type
-        )
-        
-        with counter_lock:
-            if success:
-                converted_files += 1
-                
-                # Calculate progress percentage
-                progress = (converted_files / total_files) * 100
-                bar_length = min(50, terminal_width - 30)
-                filled_length = int(bar_length * converted_files // total_files)
-                bar = '█' * filled_length + '░' * (bar_length - filled_length)
-                
-                # Print progress
-                print(f"\rProgress: [{bar}] {progress:.1f}% ({converted_files}/{total_files})", end='')
+    if log_error is None:
+        def log_error(message):
+            print(f"\n❌ {message}")
     
-    # Use thread pool to convert files in parallel
-    if max_workers is None:
-        max_workers = os.cpu_count() or 4
+    terminal_progress = on_progress is None
+    if terminal_progress:
+        def on_progress(done_files, total_files, finished_discovery, media_progress_snapshot):
+            print_progress(done_files, total_files, finished_discovery, terminal_width, media_progress_snapshot)
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit conversion tasks
-        futures = [executor.submit(convert_task, source_file_info) for source_file_info in all_source_files]
-        
-        # Wait for all tasks to complete
-        concurrent.futures.wait(futures)
+    if on_file is None:
+        def on_file(source_file_info, result, details):
+            """Print the files that took a notable path; the progress bar counts the rest"""
+            if result != CONVERSION_CONVERTED:
+                return
+            source_file_path = source_file_info[0]
+            if details.get("cache_hit"):
+                message = f"♻ From the conversion cache: {source_file_path}"
+                print("\r" + message.ljust(terminal_width - 1))
+            elif details.get("stream_copy"):
+                message = f"⚡ Fast path (stream copy of {', '.join(details['stream_copy'])}): {source_file_path}"
+                print("\r" + message.ljust(terminal_width - 1))
+            if details.get("segments"):
+                message = f"🧩 Encoded in {details['segments']} parallel segments: {source_file_path}"
+                print("\r" + message.ljust(terminal_width - 1))
     
-    # Print final progress
-    print(f"\nCompleted converting {converted_files} out of {total_files} {media_type} files.")
-    print(f"Output directory: {output_format_dir}")
+    def stop_requested():
+        return PROCESS_REGISTRY.is_cancelled() or (should_stop is not None and should_stop())
     
-    return converted_files, total_files
-
-
-class MediaConverterGUI:
-    """GUI application for media format conversion (audio and video)"""
+    def redraw_progress():
+        total_found, finished_discovery = discovery.snapshot()
+        on_progress(converted_files + skipped_files, total_found, finished_discovery, media_progress.snapshot())
     
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Media Format Converter")
-        self.root.geometry("950x750")
-        self.root.minsize(950, 750)
-        
-        # Configure the main grid
-        self.root.columnconfigure(0, weight=1)
-        self.root.rowconfigure(0, weight=1)
-        
-        # Create main frame
-        main_frame = ttk.Frame(root, padding="10")
-        main_frame.grid(row=0, column=0, sticky="nsew")
-        main_frame.columnconfigure(0, weight=1)
-        main_frame.rowconfigure(6, weight=1)  # Make log area expandable
-          # Title
-        title_label = ttk.Label(main_frame, text="Media Format Converter", font=("Arial", 16, "bold"))
-        title_label.grid(row=0, column=0, columnspan=3, pady=(0, 20))
-        
-        # Format selection frame
-        format_frame = ttk.LabelFrame(main_frame, text="Format Selection", padding="10")
-        format_frame.grid(row=1, column=0, columnspan=3, sticky="ew", pady=(0, 10))
-        format_frame.columnconfigure(1, weight=1)
-        format_frame.columnconfigure(3, weight=1)
-        
-        # Media type selection
-        media_type_frame = ttk.Frame(format_frame)
-        media_type_frame.grid(row=0, column=0, columnspan=4, sticky="ew", pady=(0, 10))
-        
-        ttk.Label(media_type_frame, text="Media Type:").pack(side=tk.LEFT, padx=(0, 10))
-        self.media_type = tk.StringVar(value="audio")
-        media_type_audio = ttk.Radiobutton(media_type_frame, text="Audio", variable=self.media_type, value="audio", command=self.update_format_options)
-        media_type_audio.pack(side=tk.LEFT, padx=(0, 15))
-        media_type_video = ttk.Radiobutton(media_type_frame, text="Video", variable=self.media_type, value="video", command=self.update_format_options)
-        media_type_video.pack(side=tk.LEFT)
-        
-        # Source format
-        ttk.Label(format_frame, text="Source Format:").grid(row=1, column=0, sticky="w", padx=(0, 10))
-        self.source_format = tk.StringVar(value="mp3")
-        self.source_combo = ttk.Combobox(format_frame, textvariable=self.source_format, width=12)
-        self.source_combo.grid(row=1, column=1, sticky="ew", padx=5)
-        
-        # Target format
-        ttk.Label(format_frame, text="Target Format:").grid(row=1, column=2, sticky="w", padx=(20, 10))
-        self.target_format = tk.StringVar(value="wav")
-        self.target_combo = ttk.Combobox(format_frame, textvariable=self.target_format, width=12)
-        self.target_combo.grid(row=1, column=3, sticky="ew", padx=5)
-        
-        # Initialize format options
-        self.update_format_options()
-        
-        # Directory selection frame
-        dir_frame = ttk.LabelFrame(main_frame, text="Directory Selection", padding="10")
-        dir_frame.grid(row=2, column=0, columnspan=3, sticky="ew", pady=(0, 10))
-        dir_frame.columnconfigure(1, weight=1)
-        
-        # Input directories section
-        input_label = ttk.Label(dir_frame, text="Input Directories:")
-        input_label.grid(row=0, column=0, sticky="nw", padx=(0, 10), pady=5)
-        
-        # Frame for input directories list and buttons
-        input_dirs_frame = ttk.Frame(dir_frame)
-        input_dirs_frame.grid(row=0, column=1, sticky="ew", padx=(0, 10), pady=5)
-        input_dirs_frame.columnconfigure(0, weight=1)
-        
-        # Listbox for input directories with scrollbar
-        list_frame = ttk.Frame(input_dirs_frame)
-        list_frame.grid(row=0, column=0, sticky="ew", pady=(0, 5))
-        list_frame.columnconfigure(0, weight=1)
-        
-        self.input_dirs_listbox = tk.Listbox(list_frame, height=4, selectmode=tk.SINGLE)
-        self.input_dirs_listbox.grid(row=0, column=0, sticky="ew")
-        
-        input_scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.input_dirs_listbox.yview)
-        input_scrollbar.grid(row=0, column=1, sticky="ns")
-        self.input_dirs_listbox.configure(yscrollcommand=input_scrollbar.set)
-        
-        # Buttons for managing input directories
-        input_buttons_frame = ttk.Frame(input_dirs_frame)
-        input_buttons_frame.grid(row=1, column=0, sticky="ew")
-        
-        ttk.Button(input_buttons_frame, text="Add Folder", command=self.add_input_directory).pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(input_buttons_frame, text="Remove Selected", command=self.remove_input_directory).pack(side=tk.LEFT, padx=5)
-        ttk.Button(input_buttons_frame, text="Clear All", command=self.clear_input_directories).pack(side=tk.LEFT, padx=5)
-        
-        # Check Folder button
-        check_button = ttk.Button(dir_frame, text="Check Folders", command=self.check_folders)
-        check_button.grid(row=0, column=2, pady=5, padx=(5, 0), sticky="n")
-        
-        # Output directory
-        ttk.Label(dir_frame, text="Output Directory:").grid(row=1, column=0, sticky="w", padx=(0, 10), pady=5)
-        self.output_dir = tk.StringVar()
-        output_entry = ttk.Entry(dir_frame, textvariable=self.output_dir)
-        output_entry.grid(row=1, column=1, sticky="ew", padx=(0, 10), pady=5)
-        ttk.Button(dir_frame, text="Browse", command=self.browse_output).grid(row=1, column=2, pady=5)
-        
-        # Options frame
-        options_frame = ttk.LabelFrame(main_frame, text="Options", padding="10")
-        options_frame.grid(row=3, column=0, columnspan=3, sticky="ew", pady=(0, 10))
-        options_frame.columnconfigure(1, weight=1)
-        
-        # Thread count
-        ttk.Label(options_frame, text="Conversion Threads:").grid(row=0, column=0, sticky="w", padx=(0, 10))
-        self.thread_count = tk.IntVar(value=os.cpu_count() or 4)
-        thread_spin = ttk.Spinbox(options_frame, from_=1, to=32, textvariable=self.thread_count, width=5)
-        thread_spin.grid(row=0, column=1, sticky="w", padx=5)
-        
-        # Control buttons frame
-        control_frame = ttk.Frame(main_frame)
-        control_frame.grid(row=4, column=0, columnspan=3, sticky="ew", pady=(0, 10))
-        control_frame.columnconfigure(0, weight=1)
-        control_frame.columnconfigure(1, weight=1)
-        control_frame.columnconfigure(2, weight=1)
-        
-        # Convert button
-        self.convert_button = ttk.Button(control_frame, text="Convert", width=15, command=self.start_conversion)
-        self.convert_button.grid(row=0, column=0, padx=5, sticky="e")
-        
-        # Stop button (initially disabled)
-        self.stop_button = ttk.Button(control_frame, text="Stop", width=15, command=self.stop_conversion, state="disabled")
-        self.stop_button.grid(row=0, column=1, padx=5)
-        
-        # Progress bar
-        self.progress_var = tk.DoubleVar(value=0)
-        self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, maximum=100)
-        self.progress_bar.grid(row=5, column=0, columnspan=3, sticky="ew", pady=(0, 10))
-        
-        # Log area with scrollbar
-        log_frame = ttk.LabelFrame(main_frame, text="Conversion Log", padding="10")
-        log_frame.grid(row=6, column=0, columnspan=3, sticky="nsew", pady=(0, 10))
-        log_frame.columnconfigure(0, weight=1)
-        log_frame.rowconfigure(0, weight=1)
-        
-        self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, height=10)
-        self.log_text.grid(row=0, column=0, sticky="nsew")
-        
-        # Status bar
-        self.status_var = tk.StringVar(value="Ready")
-        status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.grid(row=7, column=0, columnspan=3, sticky="ew")
-        
-        # Initialize other variables
-        self.conversion_thread = None
-        self.conversion_running = False
-        self.message_queue = queue.Queue()
-        self.input_directories = []  # List to store multiple input directories
-        
-        # Set default directories
-        default_music_dir = os.path.join(os.path.expanduser("~"), "Music")
-        if os.path.exists(default_music_dir):
-            self.input_directories.append(default_music_dir)
-            self.input_dirs_listbox.insert(tk.END, default_music_dir)
-            self.output_dir.set(default_music_dir)
-          # Log welcome message
-        self.log("Welcome to Media Format Converter")
-        self.log(f"Using FFmpeg at: {FFMPEG_PATH or 'Not found'}")
-        self.root.after(100, self.check_queue)
-
-    def update_format_options(self):
-        """Update format options based on selected media type"""
-        media_type = self.media_type.get()
-        
-        if media_type == "audio":
-            formats = AUDIO_FORMATS
-            # Set default audio formats
-            if self.source_format.get() not in formats:
-                self.source_format.set("mp3")
-            if self.target_format.get() not in formats:
-                self.target_format.set("wav")
-        else:  # video
-            formats = VIDEO_FORMATS
-            # Set default video formats (highlighting MPEG to MP4)
-            if self.source_format.get() not in formats:
-                self.source_format.set("mpeg")
-            if self.target_format.get() not in formats:
-                self.target_format.set("mp4")
+    def on_media_progress():
+        with counter_lock:
+            redraw_progress()
+    
+    # Media time encoded, for a time-accurate bar and ETA
+    media_progress = BatchProgress(on_update=on_media_progress)
+    
+    def job_arguments(source_file_info):
+        """Return (output paths by format, arguments for convert_media_file_incremental) for a job"""
+        source_file_path, input_root_path = source_file_info
         
-        # Update combobox values
-        self.source_combo['values'] = formats
-        self.target_combo['values'] = formats
-
-    def log(self, message):
-        """Add a message to the log area"""
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-
-    def add_input_directory(self):
-        """Add a new input directory to the list"""
-        directory = filedialog.askdirectory(
-            title="Select Input Directory",
-            initialdir=os.path.expanduser("~")
-        )
-        if directory and directory not in self.input_directories:
-            self.input_directories.append(directory)
-            self.input_dirs_listbox.insert(tk.END, directory)
-            self.log(f"Added input directory: {directory}")
-
-    def remove_input_directory(self):
-        """Remove the selected input directory from the list"""
-        selection = self.input_dirs_listbox.curselection()
-        if selection:
-            index = selection[0]
-            directory = self.input_directories[index]
-            self.input_directories.pop(index)
-            self.input_dirs_listbox.delete(index)
-            self.log(f"Removed input directory: {directory}")
-
-    def clear_input_directories(self):
-        """Clear all input directories"""
-        self.input_directories.clear()
-        self.input_dirs_listbox.delete(0, tk.END)
-        self.log("Cleared all input directories")
-
-    def browse_output(self):
-        """Open dialog to select output directory"""
-        directory = filedialog.askdirectory(
-            title="Select Output Directory",
-            initialdir=self.output_dir.get() or os.path.expanduser("~")
+        # Create the output paths with target format directories and same structure
+        output_file_paths = {
+            fmt: get_output_file_path(source_file_path, input_root_path, output_format_dirs[fmt], fmt)
+            for fmt in target_formats
+        }
+        arguments = dict(
+            source_path=source_file_path,
+            output_path=output_file_paths[primary_format],
+            source_format=source_format,
+            target_format=primary_format,
+            media_type=media_type,
+            manifest=manifests[primary_format],
+            force=force,
+            extra_targets=[(fmt, output_file_paths[fmt], manifests[fmt]) for fmt in target_formats[1:]],
+            progress=media_progress,
+            threads=ffmpeg_threads,
+            remux=remux,
+            details={},
+            segment_threshold=segment_threshold,
+            segment_seconds=segment_seconds,
+            tier=tier,
+            concurrent_jobs=max_workers
         )
-        if directory:
-            self.output_dir.set(directory)
-
-    def start_conversion(self):
-        """Start the conversion process in a separate thread"""
-        # Validate inputs
-        if not self.input_directories:
-            messagebox.showerror("Error", "Please add at least one input directory.")
+        if conversion_cache is not None:
+            arguments["cache"] = conversion_cache
+        if staging is not None:
+            arguments["staging"] = staging
+        return output_file_paths, arguments
+    
+    def choose_tier(source_file_infos, arguments_list):
+        """In deadline mode, pick the tier of a job (or batch) that is about to be converted"""
+        if tier_selector is None or all(is_up_to_date(source_file_info) for source_file_info in source_file_infos):
+            return None
+        job_tier = tier_selector.start_job(sum(file_size(source_file_info[0]) for source_file_info in source_file_infos))
+        for arguments in arguments_list:
+            arguments["tier"] = job_tier
+        return job_tier
+    
+    def jobs_started(source_file_infos):
+        if on_job_started:
+            for source_file_info in source_file_infos:
+                on_job_started(source_file_info)
+    
+    def jobs_finished(source_file_infos):
+        if on_job_finished:
+            for source_file_info in source_file_infos:
+                on_job_finished(source_file_info)
+    
+    def convert_task(source_file_info):
+        # Jobs still queued when a stop is requested are dropped
+        if stop_requested():
             return
-            
-        output_dir_str = self.output_dir.get().strip()
-        source_format = self.source_format.get()
-        target_format = self.target_format.get()
         
-        if not output_dir_str:
-            messagebox.showerror("Error", "Please select an output directory.")
+        # Convert the file unless the manifest says it is already up to date
+        output_file_paths, arguments = job_arguments(source_file_info)
+        jobs_started([source_file_info])
+        try:
+            job_tier = choose_tier([source_file_info], [arguments])
+            trace_record = tracer.job_started(source_file_info) if tracer else None
+            if staging is not None:
+                # A staged file only counts as converted once its outputs have been copied back
+                arguments["on_copied_back"] = lambda copied_result: report_result(
+                    source_file_info, output_file_paths, copied_result, arguments["details"], trace_record)
+            result = convert_media_file_incremental(concurrency=concurrency, **arguments)
+            if job_tier and result in (CONVERSION_CONVERTED, CONVERSION_COPYING):
+                tier_selector.job_finished(job_tier, file_size(source_file_info[0]), arguments["details"])
+            if result != CONVERSION_COPYING:
+                report_result(source_file_info, output_file_paths, result, arguments["details"], trace_record)
+        finally:
+            jobs_finished([source_file_info])
+    
+    async def convert_task_async(async_engine, source_file_info):
+        if stop_requested():
             return
-            
-        # Validate input directories exist
-        valid_dirs = []
-        for input_dir in self.input_directories:
-            if os.path.isdir(input_dir):
-                valid_dirs.append(input_dir)
-            else:
-                self.log(f"Warning: Input directory does not exist: {input_dir}")
         
-        if not valid_dirs:
-            messagebox.showerror("Error", "No valid input directories found.")
+        output_file_paths, arguments = job_arguments(source_file_info)
+        jobs_started([source_file_info])
+        try:
+            job_tier = choose_tier([source_file_info], [arguments])
+            trace_record = tracer.job_started(source_file_info) if tracer else None
+            result = await async_engine.convert_incremental(**arguments)
+            if job_tier and result == CONVERSION_CONVERTED:
+                tier_selector.job_finished(job_tier, file_size(source_file_info[0]), arguments["details"])
+            report_result(source_file_info, output_file_paths, result, arguments["details"], trace_record)
+        finally:
+            jobs_finished([source_file_info])
+    
+    def convert_batch_task(batch):
+        if stop_requested():
             return
-        
-        # Create output directory if it doesn't exist
-        os.makedirs(output_dir_str, exist_ok=True)
-        
-        # Disable conversion button and enable stop button
-        self.convert_button.config(state="disabled")
-        self.stop_button.config(state="normal")
-        self.status_var.set("Converting...")
-        self.progress_var.set(0)
-        self.conversion_running = True
-        
-        # Log start of conversion
-        self.log(f"Starting conversion from {source_format.upper()} to {target_format.upper()}")
-        self.log(f"Input directories: {len(valid_dirs)} folders")
-        for i, dir_path in enumerate(valid_dirs, 1):
-            self.log(f"  {i}. {dir_path}")
-        self.log(f"Output directory: {output_dir_str}")
-        
-        # Start conversion thread
-        thread_count = self.thread_count.get()
-        self.conversion_thread = threading.Thread(
-            target=self.conversion_worker,
-            args=(valid_dirs, output_dir_str, source_format, target_format, thread_count)
-        )
-        self.conversion_thread.daemon = True
-        self.conversion_thread.start()
-
-    def stop_conversion(self):
-        """Stop the conversion process"""
-        if self.conversion_running:
-            self.conversion_running = False
-            self.status_var.set("Stopping conversion...")
-            self.log("Stopping conversion. Please wait for current tasks to finish...")
-
-    def check_queue(self):
-        """Process messages from the conversion thread"""
+        jobs_started(batch)
         try:
-            while True:
-                message = self.message_queue.get_nowait()
-                
-                if message[0] == "log":
-                    self.log(message[1])
-                elif message[0] == "progress":
-                    progress_value, total = message[1], message[2]
-                    if total > 0:
-                        self.progress_var.set((progress_value / total) * 100)
-                        self.status_var.set(f"Converting: {progress_value}/{total} files ({progress_value/total:.1%})")
-                elif message[0] == "complete":
-                    self.conversion_complete(message[1], message[2])
-                elif message[0] == "error":
-                    self.conversion_error(message[1])
-                
-                self.message_queue.task_done()
-        except queue.Empty:
-            pass
-        
-        # Schedule next check
-        self.root.after(100, self.check_queue)
-
-    def conversion_worker(self, input_dirs, output_dir_str, source_format, target_format, max_workers):
-        """Worker thread for conversion process"""
+            convert_batch(batch)
+        finally:
+            jobs_finished(batch)
+    
+    def convert_batch(batch):
+        nonlocal batched_files, batch_runs
+        prepared = [job_arguments(source_file_info) for source_file_info in batch]
+        job_tier = choose_tier(batch, [arguments for _, arguments in prepared])
+        trace_records = [tracer.job_started(source_file_info) if tracer else None for source_file_info in batch]
+        
+        # A batch is one FFmpeg process, so it takes one slot of the adaptive controller
+        if concurrency is not None and not concurrency.acquire(estimate_job_memory(media_type, None),
+                                                               should_stop=stop_requested):
+            # Stopped while waiting for a slot: every file of the batch counts as not converted
+            for source_file_info, (output_file_paths, arguments), trace_record in zip(batch, prepared, trace_records):
+                media_progress.job_skipped()
+                report_result(source_file_info, output_file_paths, CONVERSION_FAILED, arguments["details"], trace_record)
+            return
         try:
-            # Collect all source files from all input directories
-            all_source_files = []
-            
-            for input_dir in input_dirs:
-                input_path = Path(input_dir)
-                # Find all files with the specified source format
-                source_files = list(input_path.rglob(f'*.{source_format}'))
-                all_source_files.extend([(source_file, input_path) for source_file in source_files])
-
-            total_files = len(all_source_files)
-
-            if total_files == 0:
-                self.message_queue.put(("log", f"No {source_format.upper()} files found in the specified directories."))
-                self.message_queue.put(("complete", 0, 0))
-                return
-
-            self.message_queue.put(("log", f"Found {total_files} {source_format.upper()} files across all directories. Starting conversion..."))
-            
-            converted_files = 0
-            
-            def gui_convert_task(source_file_info):
-                nonlocal converted_files
-                
-                # Check if stop was requested
-                if not self.conversion_running:
-                    return False
-
-                source_file_path, input_root_path = source_file_info
-                file_name = source_file_path.name
-                
-                try:
-                    # Determine the relative path to maintain folder structure
-                    rel_path = source_file_path.relative_to(input_root_path)
-                    
-                    # Create the output path with target format directory and same structure
-                    output_dir_name = target_format.upper() + 's'  # WAVs, MP3s, etc.
-                    output_file_path = Path(output_dir_str) / output_dir_name
-                    
-                    # Add parent directories if needed
-                    if rel_path.parent and rel_path.parent != Path('.'):
-                        output_file_path = output_file_path / rel_path.parent
-                        
-                    # Add the filename with new extension
-                    output_file_path = output_file_path / f"{source_file_path.stem}.{target_format}"
-
-                    self.message_queue.put(("log", f"Converting: {file_name}"))
-
-                    # Ensure output directory exists
-                    output_file_path.parent.mkdir(parents=True, exist_ok=True)                    # Convert the file using the new media conversion function
-                    success = convert_media_file(
-                        str(source_file_path),
-                        str(output_file_path),
-                        source_format,
-                        target_format
-                    )
-                    
-                    if success:
-                        converted_files += 1
-                        self.message_queue.put(("log", f"✓ Successfully converted: {file_name}"))
-                        self.message_queue.put(("progress", converted_files, total_files))
-                    else:
-                        self.message_queue.put(("log", f"✗ Failed to convert: {file_name}"))
-                    
-                    return success
-                        
-                except Exception as e:
-                    self.message_queue.put(("log", f"Error processing {file_name}: {str(e)}"))
-                    return False
-                    
-            # Use thread pool to convert files
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = []
-                for source_file_info in all_source_files:
-                    if not self.conversion_running:
-                        break
-                    futures.append(executor.submit(gui_convert_task, source_file_info))
-
-                # Wait for completion
-                for future in concurrent.futures.as_completed(futures):
-                    if not self.conversion_running:
-                        # Cancel remaining futures
-                        for f in futures:
-                            if not f.done():
-                                f.cancel()
-                        break
-                    try:
-                        future.result()
-                    except Exception as e:
-                        self.message_queue.put(("log", f"Task error: {e}"))
-            
-            # Send completion message
-            if not self.conversion_running:
-                self.message_queue.put(("log", "Conversion process was stopped by user."))
-            
-            self.message_queue.put(("complete", converted_files, total_files))
-                
-        except Exception as e:
-            self.message_queue.put(("error", str(e)))
-
-    def conversion_complete(self, converted_count, total_files):
-        """Handle completion of conversion process"""
-        self.conversion_running = False
-        self.convert_button.config(state="normal")
-        self.stop_button.config(state="disabled")
-        
-        if converted_count > 0:
-            success_rate = (converted_count / total_files) * 100 if total_files > 0 else 0
-            self.status_var.set(f"Conversion completed: {converted_count}/{total_files} files ({success_rate:.1f}%)")
-            self.log(f"Conversion completed: {converted_count} out of {total_files} files converted successfully.")
-            
-            # Show completion message
-            if converted_count == total_files:
-                messagebox.showinfo("Conversion Complete", f"All {converted_count} files were converted successfully!")
-            else:
-                messagebox.showwarning("Conversion Complete", f"{converted_count} out of {total_files} files were converted successfully.")
+            results = convert_media_batch_incremental([arguments for _, arguments in prepared], progress=media_progress)
+        finally:
+            if concurrency is not None:
+                concurrency.release()
+        
+        batch_size = sum(1 for _, arguments in prepared if arguments["details"].get("batch_size"))
+        if batch_size:
+            with counter_lock:
+                batched_files += batch_size
+                batch_runs += 1
+        if job_tier:
+            # One measurement for the run: its FFmpeg time was shared by the files it encoded
+            encoded = [(source_file_info, arguments["details"]) for source_file_info, (_, arguments), result
+                       in zip(batch, prepared, results)
+                       if result == CONVERSION_CONVERTED and not arguments["details"].get("stream_copy")]
+            if encoded:
+                tier_selector.job_finished(job_tier, sum(file_size(source_file_info[0]) for source_file_info, _ in encoded),
+                                           {"ffmpeg_seconds": sum(details.get("ffmpeg_seconds", 0.0) for _, details in encoded)})
+        for source_file_info, (output_file_paths, arguments), result, trace_record in zip(batch, prepared, results, trace_records):
+            report_result(source_file_info, output_file_paths, result, arguments["details"], trace_record)
+    
+    def estimate_job_seconds(source_file_info):
+        duration = get_cached_media_duration(source_file_info[0])
+        if duration is not None:
+            return duration
+        try:
+            return estimate_seconds_from_size(source_file_info[0].stat().st_size)
+        except OSError:
+            return None
+    
+    def fill_duplicate(original_output_paths, original_result, original_details, source_file_info):
+        """Give a duplicate source the outputs of its identical original"""
+        nonlocal dedup_cpu_saved
+        output_file_paths, arguments = job_arguments(source_file_info)
+        trace_record = tracer.job_started(source_file_info) if tracer else None
+        details = arguments["details"]
+        
+        stale_targets = stale_conversion_targets(source_file_info[0], output_file_paths[primary_format], source_format,
+                                                 primary_format, media_type, manifests[primary_format], force,
+                                                 arguments["extra_targets"], remux)
+        if not stale_targets:
+            result = CONVERSION_SKIPPED
+        elif original_result == CONVERSION_FAILED:
+            result = CONVERSION_FAILED
+            record_conversion_results(stale_targets, source_file_info[0], None, False)
         else:
-            self.status_var.set("Conversion completed with no files converted.")
-            self.log("No files were converted.")
-            
-            if total_files > 0:
-                messagebox.showwarning("Conversion Failed", "No files were converted. Check the log for details.")
-
-    def conversion_error(self, error_message):
-        """Handle conversion error"""
-        self.conversion_running = False
-        self.convert_button.config(state="normal")
-        self.stop_button.config(state="disabled")
-        self.status_var.set("Conversion error")
-        self.log(f"Error during conversion: {error_message}")
-        messagebox.showerror("Conversion Error", f"An error occurred during conversion: {error_message}")
-
-    def check_folders(self):
-        """Check how many files of the selected format are in all input directories"""
-        if not self.input_directories:
-            messagebox.showerror("Error", "Please add at least one input directory.")
-            return
-            
-        source_format = self.source_format.get()
+            try:
+                signature = source_signature(source_file_info[0])
+                for target in stale_targets:
+                    details["deduplicated"] = link_or_copy(original_output_paths[target[0]], target[1])
+                record_conversion_results(stale_targets, source_file_info[0], signature, True)
+                result = CONVERSION_CONVERTED
+            except OSError as e:
+                log_error(f"Could not fill duplicate {source_file_info[0]}: {e}")
+                record_conversion_results(stale_targets, source_file_info[0], None, False)
+                result = CONVERSION_FAILED
+        
+        if result == CONVERSION_CONVERTED:
+            with counter_lock:
+                dedup_methods[details["deduplicated"]] = dedup_methods.get(details["deduplicated"], 0) + 1
+                dedup_cpu_saved += ((original_details.get("cpu_user") or 0.0) + (original_details.get("cpu_sys") or 0.0)
+                                    or original_details.get("ffmpeg_seconds", 0.0))
+        media_progress.job_skipped()
+        report_result(source_file_info, output_file_paths, result, details, trace_record)
+    
+    def report_result(source_file_info, output_file_paths, result, details, trace_record):
+        nonlocal converted_files, skipped_files, remuxed_files, cached_files
+        source_file_path = source_file_info[0]
+        if tracer:
+            tracer.job_finished(trace_record, source_file_path, output_file_paths.values(), result, details)
+        for duplicate in duplicates.get(source_file_info, ()):
+            fill_duplicate(output_file_paths, result, details, duplicate)
         
-        # Update status
-        self.status_var.set(f"Scanning for {source_format.upper()} files...")
-        self.root.update()
+        with counter_lock:
+            if result == CONVERSION_CONVERTED and details.get("cache_hit"):
+                cached_files += 1
+            elif result == CONVERSION_CONVERTED and details.get("stream_copy"):
+                remuxed_files += 1
+            on_file(source_file_info, result, details)
+            if result != CONVERSION_FAILED:
+                if result == CONVERSION_SKIPPED:
+                    skipped_files += 1
+                else:
+                    converted_files += 1
+                redraw_progress()
+    
+    def discovered_files():
+        source_files = iter_source_files(valid_dirs, source_format) if files is None else files
+        for source_file_info in source_files:
+            discovery.found()
+            media_progress.job_discovered()
+            yield source_file_info
+        discovery.finish()
+        if tracer:
+            tracer.discovery_finished()
+        if not terminal_progress and discovery.snapshot()[0]:
+            # Lets the GUI leave its "scanning" status; the terminal bar is redrawn by the next result
+            with counter_lock:
+                redraw_progress()
+    
+    def report_task_error(exception):
+        log_error(f"Task error: {exception}")
+    
+    # Use thread pool to convert files in parallel
+    max_workers, ffmpeg_threads, concurrency = setup_concurrency(max_workers, media_type, log=log)
+    if engine == ENGINE_ASYNC and concurrency is not None:
+        log("The async engine runs the planned number of jobs but does not adjust it to load or memory.")
+        concurrency = None
+    
+    # Optional conversion cache shared with other runs
+    conversion_cache = None
+    if cache_dir:
+        from media_converter.output_cache import DEFAULT_MAX_BYTES, ConversionCache
         
-        try:
-            total_files = 0
-            total_size = 0
-            folder_summaries = []
-            
-            for input_dir in self.input_directories:
-                if not os.path.isdir(input_dir):
-                    folder_summaries.append(f"{os.path.basename(input_dir)}: Directory not found")
-                    continue
-                    
-                # Use Path to find all files with the specified extension
-                input_path = Path(input_dir)
-                files = list(input_path.rglob(f"*.{source_format}"))
-                folder_file_count = len(files)
-                total_files += folder_file_count
-                
-                # Calculate folder size
-                folder_size = 0
-                for file_path in files:
-                    try:
-                        folder_size += file_path.stat().st_size
-                    except:
-                        pass  # Skip files that can't be accessed
-                total_size += folder_size
-                
-                # Create folder summary
-                size_str = self.format_size(folder_size)
-                folder_name = os.path.basename(input_dir) or input_dir
-                folder_summaries.append(f"{folder_name}: {folder_file_count} files ({size_str})")
-            
-            # Convert total size to more readable format
-            total_size_str = self.format_size(total_size)
-            
-            # Log the results
-            self.log(f"Scan Results for {source_format.upper()} files:")
-            for summary in folder_summaries:
-                self.log(f"  {summary}")
-            self.log(f"Total: {total_files} files ({total_size_str})")
-            
-            # Create detailed message for dialog
-            dialog_message = f"Found {total_files} {source_format.upper()} files across {len(self.input_directories)} directories.\n"
-            dialog_message += f"Total size: {total_size_str}\n\n"
-            dialog_message += "Breakdown by directory:\n"
-            for summary in folder_summaries:
-                dialog_message += f"• {summary}\n"
-            
-            if total_files > 0:
-                dialog_message += f"\nClick 'Convert' to process these files."
-                messagebox.showinfo("Folder Analysis", dialog_message)
-            else:
-                dialog_message += f"\nPlease check that you've selected the correct source format and directories."
-                messagebox.showinfo("Folder Analysis", dialog_message)
+        conversion_cache = ConversionCache(cache_dir, cache_max_bytes or DEFAULT_MAX_BYTES)
+    
+    # Optional per-job trace
+    tracer = None
+    if trace_path:
+        from media_converter.tracing import JobTracer, format_trace_summary
+        
+        tracer = JobTracer(trace_path, source_format=source_format, target_formats=target_formats,
+                           schedule=schedule, max_workers=max_workers, ffmpeg_threads=ffmpeg_threads,
+                           input_dirs=[str(d) for d in valid_dirs])
+    
+    jobs = discovered_files()
+    if dedup:
+        from media_converter.dedup import find_duplicates, link_or_copy
+        
+        # Needs the complete file list; duplicates are filled in when their original finishes
+        jobs = list(jobs)
+        log(f"Looking for identical copies among {len(jobs)} files...")
+        duplicates = find_duplicates(jobs, path_of=lambda source_file_info: source_file_info[0])
+        duplicate_jobs = {duplicate for group in duplicates.values() for duplicate in group}
+        if duplicate_jobs:
+            log(f"Found {len(duplicate_jobs)} duplicates of {len(duplicates)} files; each is converted once.")
+        jobs = [source_file_info for source_file_info in jobs if source_file_info not in duplicate_jobs]
+    
+    settings = {fmt: conversion_settings(fmt, media_type if fmt == primary_format else get_media_type(target_format=fmt), remux)
+                for fmt in target_formats}
+    
+    def is_up_to_date(source_file_info):
+        if force:
+            return False
+        for fmt in target_formats:
+            output_file_path = get_output_file_path(source_file_info[0], source_file_info[1], output_format_dirs[fmt], fmt)
+            if not manifests[fmt].is_up_to_date(source_file_info[0], output_file_path, settings[fmt]):
+                return False
+        return True
+    
+    tier_selector = None
+    if deadline is not None:
+        from media_converter.tiers import DeadlineTierSelector
+        from media_converter.tracing import file_size, measured_throughput
+        
+        # Needs the amount of work left, so the folders are walked first
+        jobs = list(jobs)
+        pending_bytes = sum(file_size(source_file_info[0]) for source_file_info in jobs if not is_up_to_date(source_file_info))
+        measured_speeds = {job_tier: measured_throughput(source_format, primary_format, tier=job_tier)
+                           for job_tier in PERFORMANCE_TIERS}
+        tier_selector = DeadlineTierSelector(deadline, pending_bytes, max_workers, measured_speeds)
+        log(f"Deadline {time.strftime('%Y-%m-%d %H:%M', time.localtime(deadline))}: "
+            f"{pending_bytes / 1024 ** 2:.1f} MB to convert; each job gets the slowest tier that still makes it.")
+    
+    if schedule == SCHEDULE_LONGEST_FIRST:
+        jobs = schedule_longest_first(jobs, max_workers, skip=is_up_to_date, log=log)
+    
+    staging = None
+    if staging_dir:
+        if engine == ENGINE_ASYNC or batch_small_files:
+            log("Staging only applies to the thread engine without batching; converting in place.")
+        else:
+            from media_converter.staging import StagingArea, format_staging_stats
             
-            # Update status
-            self.status_var.set(f"Ready - {total_files} {source_format.upper()} files found across {len(self.input_directories)} directories")
+            staging = StagingArea(staging_dir, staging_budget)
+            log(f"Staging inputs and outputs in {staging.directory} (budget {staging.budget_bytes / 1024 ** 2:.0f} MB)")
+            jobs = staging.prefetch(jobs, skip=is_up_to_date, should_stop=stop_requested)
+    
+    task = convert_task
+    enqueue_trace = tracer.job_enqueued if tracer else None
+    if batch_small_files:
+        if engine == ENGINE_ASYNC or len(target_formats) > 1:
+            log("Batching small files only applies to single-format runs on the thread engine; converting files one by one.")
+        else:
+            # Source and temporary output path of every file end up on the command line
+            jobs = group_small_jobs(jobs, estimate_job_seconds, path_length=lambda info: 2 * len(str(info[0])) + 64)
+            task = convert_batch_task
+            if tracer:
+                def enqueue_trace(batch):
+                    for source_file_info in batch:
+                        tracer.job_enqueued(source_file_info)
+    
+    start_time = time.monotonic()
+    try:
+        if engine == ENGINE_ASYNC:
+            from media_converter.async_engine import run_streaming_async
             
-        except Exception as e:
-            self.log(f"Error checking folders: {str(e)}")
-            messagebox.showerror("Error", f"An error occurred while scanning the folders: {str(e)}")
-            self.status_var.set("Ready")
-
-    def format_size(self, size_bytes):
-        """Format file size in bytes to a human-readable string"""
-        if size_bytes < 1024:
-            return f"{size_bytes} bytes"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes / 1024:.1f} KB"
-        elif size_bytes < 1024 * 1024 * 1024:
-            return f"{size_bytes / (1024 * 1024):.1f} MB"
+            run_streaming_async(
+                jobs,
+                convert_task_async,
+                max_jobs=max_workers,
+                max_pending=max_workers * DISCOVERY_QUEUE_FACTOR,
+                should_stop=stop_requested,
+                on_exception=report_task_error,
+                on_submit=tracer.job_enqueued if tracer else None
+            )
         else:
-            return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Submit conversion tasks (while the walk is still running when streaming)
+                submit_streaming(
+                    executor,
+                    jobs,
+                    task,
+                    max_pending=max_workers * DISCOVERY_QUEUE_FACTOR,
+                    should_stop=stop_requested,
+                    on_exception=report_task_error,
+                    on_submit=enqueue_trace
+                )
+    finally:
+        # Outputs still being copied back are recorded in the manifests when they arrive
+        staging_stats = staging.close() if staging else None
+        for manifest in manifests.values():
+            manifest.save()
+        trace_summary = tracer.close() if tracer else None
+        cache_stats = conversion_cache.stats() if conversion_cache else None
+        if conversion_cache:
+            conversion_cache.close()
+    
+    total_files, _ = discovery.snapshot()
+    
+    if total_files == 0:
+        log(f"No {source_format.upper()} files found in the specified directories.")
+        return 0, 0
+    
+    # Print final progress, below the progress bar when it is drawn in the terminal
+    if terminal_progress:
+        print()
+    log(f"Completed converting {converted_files} out of {total_files} {media_type} files.")
+    if remuxed_files:
+        log(f"{remuxed_files} files took the fast path (stream copy instead of re-encoding).")
+    if batch_runs:
+        log(f"{batched_files} small files were converted in {batch_runs} batched FFmpeg runs.")
+    if dedup_methods:
+        methods = ", ".join(f"{count} by {method}" for method, count in sorted(dedup_methods.items()))
+        log(f"Filled {sum(dedup_methods.values())} duplicate files from their originals ({methods}); "
+            f"saved about {dedup_cpu_saved:.1f}s of FFmpeg CPU time.")
+    if cache_stats:
+        log(f"Conversion cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['stores']} stored, {cache_stats['evictions']} evicted; "
+            f"{cache_stats['entries']} outputs, {cache_stats['bytes'] / 1024 ** 2:.1f} of "
+            f"{cache_stats['max_bytes'] / 1024 ** 2:.1f} MB used")
+    if staging_stats and converted_files:
+        log(format_staging_stats(staging_stats))
+    if skipped_files:
+        log(f"Skipped {skipped_files} files that were already up to date.")
+    log(f"Conversion time: {time.monotonic() - start_time:.1f}s")
+    if tier_selector and tier_selector.describe():
+        overrun = time.time() - deadline
+        outcome = f"missed the deadline by {overrun:.0f}s" if overrun > 0 else f"{-overrun:.0f}s before the deadline"
+        log(f"Performance tiers used: {tier_selector.describe()} ({outcome})")
+    final_progress = media_progress.snapshot()
+    if final_progress["processed_seconds"]:
+        log(f"Media encoded: {final_progress['processed_seconds']:.1f}s "
+            f"({final_progress['throughput']:.1f}x realtime overall)")
+    if concurrency is not None and concurrency.held_back:
+        log(f"Adaptive concurrency held back {concurrency.held_back} jobs (final limit: {concurrency.limit} concurrent jobs)")
+    for output_format_dir in output_format_dirs.values():
+        log(f"Output directory: {output_format_dir}")
+    if trace_summary:
+        for line in format_trace_summary(trace_summary):
+            log(line)
+        log(f"Trace written to: {trace_path}")
+    
+    return converted_files + skipped_files, total_files
+
+
+def __getattr__(name):
+    """Load MediaConverterGUI on first access so importing this module does not pull in tkinter"""
+    if name == "MediaConverterGUI":
+        from media_converter.gui import MediaConverterGUI
+        return MediaConverterGUI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def validate_ffmpeg_installation():
     """Validate that FFmpeg is properly installed and working"""
-    global FFMPEG_PATH, FFPROBE_PATH
+    global FFMPEG_PATH, FFPROBE_PATH, FFMPEG_CAPABILITIES
     
-    # Always refresh paths to get the best available version
-    FFMPEG_PATH, FFPROBE_PATH = refresh_ffmpeg_paths()
+    # Use the cached discovery result when it is still valid; it was verified when it was stored
+    resolve_ffmpeg()
+    paths_changed = False
     
     if not FFMPEG_PATH:
         print("❌ FFmpeg not found!")
@@ -957,6 +1773,7 @@ def validate_ffmpeg_installation():
             FFMPEG_PATH = download_ffmpeg_windows()
             if FFMPEG_PATH:
                 FFPROBE_PATH = find_ffprobe(FFMPEG_PATH)
+                paths_changed = True
                 print("✅ FFmpeg successfully downloaded and installed!")
             else:
                 print("❌ Failed to download FFmpeg. Please install it manually.")
@@ -965,15 +1782,19 @@ def validate_ffmpeg_installation():
             print("Please install FFmpeg using your package manager.")
             return False
     
-    # Test if FFmpeg works
-    if not check_ffmpeg_works(FFMPEG_PATH):
+    # Test if FFmpeg works (the capability query runs `ffmpeg -version`)
+    if not FFMPEG_CAPABILITIES:
+        FFMPEG_CAPABILITIES = query_ffmpeg_capabilities(FFMPEG_PATH)
+    if not FFMPEG_CAPABILITIES:
         print(f"❌ FFmpeg found at {FFMPEG_PATH} but not working properly!")
         if platform.system() == "Windows":
             print("🔄 Attempting to download a fresh copy...")
             FFMPEG_PATH = download_ffmpeg_windows()
             if FFMPEG_PATH:
                 FFPROBE_PATH = find_ffprobe(FFMPEG_PATH)
-                if check_ffmpeg_works(FFMPEG_PATH):
+                FFMPEG_CAPABILITIES = query_ffmpeg_capabilities(FFMPEG_PATH)
+                if FFMPEG_CAPABILITIES:
+                    save_ffmpeg_cache(FFMPEG_PATH, FFPROBE_PATH, FFMPEG_CAPABILITIES)
                     print("✅ FFmpeg successfully updated!")
                     return True
         return False
@@ -984,7 +1805,10 @@ def validate_ffmpeg_installation():
         if not FFPROBE_PATH:
             print("Please ensure FFprobe is installed alongside FFmpeg.")
             return False
+        paths_changed = True
     
+    if paths_changed:
+        save_ffmpeg_cache(FFMPEG_PATH, FFPROBE_PATH, FFMPEG_CAPABILITIES)
     print(f"✅ FFmpeg validated: {FFMPEG_PATH}")
     print(f"✅ FFprobe validated: {FFPROBE_PATH}")
     return True
@@ -992,13 +1816,59 @@ def validate_ffmpeg_installation():
 
 def refresh_ffmpeg_paths():
     """Refresh FFmpeg and FFprobe paths to ensure we're using the best available version"""
-    global FFMPEG_PATH, FFPROBE_PATH
+    # Force re-detection of FFmpeg, bypassing the discovery cache
+    return resolve_ffmpeg(refresh=True)
+
+
+def install_shutdown_handlers():
+    """Stop cleanly on SIGINT/SIGTERM
     
-    # Force re-detection of FFmpeg
-    FFMPEG_PATH = find_ffmpeg()
-    FFPROBE_PATH = find_ffprobe(FFMPEG_PATH)
+    Running FFmpeg processes are terminated (and killed after a grace period), no new ones are
+    started, and KeyboardInterrupt unwinds the run so manifests are saved and partial outputs
+    removed. A second signal exits immediately.
+    """
+    def handle_signal(signum, frame):
+        if PROCESS_REGISTRY.is_cancelled():
+            os._exit(130)
+        stopped = PROCESS_REGISTRY.cancel()
+        print(f"\n⏹ {signal.Signals(signum).name} received: stopped {stopped} FFmpeg processes, cleaning up...")
+        raise KeyboardInterrupt
     
-    return FFMPEG_PATH, FFPROBE_PATH
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+
+# Flags (by argparse dest) that only one-off directory conversions use
+BATCH_ONLY_FLAGS = {
+    "schedule": "--schedule",
+    "engine": "--engine",
+    "batch_small_files": "--batch-small-files",
+    "dedup": "--dedup",
+    "cache_dir": "--cache-dir",
+    "cache_max_size": "--cache-max-size",
+    "staging_dir": "--staging-dir",
+    "staging_budget": "--staging-budget",
+    "deadline": "--deadline",
+    "trace": "--trace",
+}
+
+# Flags that jobs of the service and of distributed workers bring along themselves
+JOB_FLAGS = {
+    "force": "--force",
+    "remux": "--no-remux",
+    "segment_threshold": "--segment-threshold",
+    "segment_length": "--segment-length",
+    "tier": "--tier",
+    "watch": "--watch",
+}
+
+
+def reject_unused_flags(parser, args, mode, flags):
+    """Exit with a usage error when a flag that mode ignores was given"""
+    given = [flag for dest, flag in flags.items() if getattr(args, dest) != parser.get_default(dest)]
+    if given:
+        parser.error(f"{', '.join(given)} cannot be used with {mode}")
+
 
 def main():
     """Main function to parse arguments and run the appropriate mode"""
@@ -1006,12 +1876,85 @@ def main():
     parser.add_argument('-i', '--input', nargs='+', help='Input directory(ies) containing media files')
     parser.add_argument('-o', '--output', help='Output directory for converted files')
     parser.add_argument('-sf', '--source-format', default='mp3', help='Source media format (e.g., mp3, wav, mpeg, mp4)')
-    parser.add_argument('-tf', '--target-format', default='wav', help='Target media format (e.g., mp3, wav, mpeg, mp4)')
-    parser.add_argument('-t', '--threads', type=int, help='Number of conversion threads to use')
+    parser.add_argument('-tf', '--target-format', nargs='+', default=['wav'],
+                        help='Target media format(s) (e.g., mp3, wav, mpeg, mp4); several formats are produced from a single decode')
+    parser.add_argument('-t', '--threads', type=parse_thread_count,
+                        help='Number of conversion threads to use, or "auto" to adapt to CPU load and memory')
+    parser.add_argument('--schedule', choices=SCHEDULE_MODES, default=SCHEDULE_STREAM,
+                        help='Job order: "stream" starts converting while scanning, "longest-first" probes all files first and starts the longest jobs first')
+    parser.add_argument('--no-remux', dest='remux', action='store_false',
+                        help='Always re-encode, even when the source streams already fit the target container')
+    parser.add_argument('--segment-threshold', type=float, nargs='?', const=DEFAULT_SEGMENT_THRESHOLD, metavar='SECONDS',
+                        help=f'Encode videos at least this long in parallel segments (default when given without a value: {DEFAULT_SEGMENT_THRESHOLD}s)')
+    parser.add_argument('--segment-length', type=float, default=DEFAULT_SEGMENT_SECONDS, metavar='SECONDS',
+                        help=f'Length of each segment for segmented encoding (default: {DEFAULT_SEGMENT_SECONDS}s)')
+    parser.add_argument('--tier', choices=PERFORMANCE_TIERS, default=DEFAULT_TIER,
+                        help=f'Encoder speed/quality trade-off: fast, balanced or archival (default: {DEFAULT_TIER})')
+    parser.add_argument('--deadline', type=parse_deadline_argument, metavar='WHEN',
+                        help='Finish the batch by WHEN (e.g. 18:30 or 2h30m): each job gets the slowest tier whose measured speed still makes it. '
+                             'Speeds come from the traces of earlier GUI and --deadline runs kept in the cache directory; '
+                             'runs traced with --trace FILE are not read back, and without any history the first jobs use the default tier')
+    parser.add_argument('--force', action='store_true', help='Re-convert all files, even those the manifest lists as up to date')
+    parser.add_argument('--engine', choices=ENGINE_MODES, default=ENGINE_THREADS,
+                        help='Run conversions on a thread pool (default) or an asyncio event loop (suits many short files)')
+    parser.add_argument('--batch-small-files', action='store_true',
+                        help='Convert several short files per FFmpeg process to save process start-up time')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Convert byte-identical source files once and link or copy the other outputs')
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help='Take outputs from, and add them to, a conversion cache shared between output trees and processes')
+    parser.add_argument('--cache-max-size', type=parse_cache_size, metavar='SIZE',
+                        help='Size cap of the conversion cache, e.g. 500M or 50G (default: 20G)')
+    parser.add_argument('--staging-dir', metavar='DIR',
+                        help='Copy inputs to this local scratch directory ahead of time, encode there and copy outputs back (for network storage)')
+    parser.add_argument('--staging-budget', type=parse_cache_size, metavar='SIZE',
+                        help='Scratch space staging may use, e.g. 2G (default: 4G)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and convert new or changed files as soon as they have finished arriving')
+    parser.add_argument('--settle-seconds', type=float, default=2.0, metavar='SECONDS',
+                        help='Watch mode: wait until a file has not changed for this long before converting it (default: 2)')
+    parser.add_argument('--poll', action='store_true',
+                        help='Watch mode: scan the folders periodically instead of using inotify (e.g. for network shares)')
+    parser.add_argument('--poll-interval', type=float, default=5.0, metavar='SECONDS',
+                        help='Watch mode: seconds between scans when polling (default: 5)')
+    parser.add_argument('--service', nargs='?', const=':47301', metavar='HOST:PORT',
+                        help='Run a local HTTP service that queues and converts submitted jobs (default: 127.0.0.1:47301)')
+    parser.add_argument('--queue', metavar='FILE', help='Service mode: job queue database (default: jobs.sqlite3 in the cache directory)')
+    parser.add_argument('--coordinator', nargs='?', const=f':{DEFAULT_COORDINATOR_PORT}', metavar='HOST:PORT',
+                        help=f'Hand the batch out to --worker processes over TCP instead of converting locally (default: 127.0.0.1:{DEFAULT_COORDINATOR_PORT})')
+    parser.add_argument('--worker', metavar='HOST:PORT',
+                        help='Convert jobs from a coordinator; -t sets the number of concurrent jobs')
+    parser.add_argument('--lease-seconds', type=float, default=60.0, metavar='SECONDS',
+                        help='Coordinator: reassign a job when its worker has not renewed its lease for this long (default: 60)')
+    parser.add_argument('--token', help='Shared secret that workers must present to the coordinator, and clients to the service')
+    parser.add_argument('--trace', metavar='FILE', help='Write a per-job trace (JSON lines) to FILE and print a timing summary')
     parser.add_argument('--gui', action='store_true', help='Launch the graphical user interface')
     
     args = parser.parse_args()
     
+    # The coordinator only walks folders and hands out jobs, so it does not need FFmpeg
+    if args.coordinator and args.input and args.output:
+        from media_converter.distributed import parse_address, run_coordinator
+        
+        reject_unused_flags(parser, args, "--coordinator", {**BATCH_ONLY_FLAGS, "watch": "--watch"})
+        converted, total = run_coordinator(
+            args.input,
+            args.output,
+            args.source_format,
+            args.target_format,
+            parse_address(args.coordinator),
+            force=args.force,
+            remux=args.remux,
+            segment_threshold=args.segment_threshold,
+            segment_seconds=args.segment_length,
+            tier=args.tier,
+            lease_seconds=args.lease_seconds,
+            token=args.token
+        )
+        if converted == 0 and total > 0:
+            sys.exit(1)
+        return
+    
     # Validate FFmpeg installation
     if not validate_ffmpeg_installation():
         print("FFmpeg validation failed. Please install or update FFmpeg manually.")
@@ -1024,27 +1967,104 @@ def main():
     
     # Launch GUI if no arguments provided or --gui flag is used
     if len(sys.argv) == 1 or args.gui:
+        # Tkinter is only loaded for the GUI so CLI runs start fast and work without Tk
+        import tkinter as tk
+        from media_converter.gui import MediaConverterGUI
+        
         root = tk.Tk()
         app = MediaConverterGUI(root)
         root.mainloop()
+    elif args.service:
+        from media_converter.distributed import parse_address
+        from media_converter.service import DEFAULT_SERVICE_PORT, run_service
+        
+        reject_unused_flags(parser, args, "--service", {**BATCH_ONLY_FLAGS, **JOB_FLAGS})
+        install_shutdown_handlers()
+        run_service(parse_address(args.service, default_port=DEFAULT_SERVICE_PORT), args.threads, args.queue, args.token)
+    elif args.worker:
+        from media_converter.distributed import parse_address, run_worker
+        
+        # The coordinator decides how each job is converted
+        reject_unused_flags(parser, args, "--worker", {**BATCH_ONLY_FLAGS, **JOB_FLAGS})
+        if isinstance(args.threads, int):
+            max_jobs, ffmpeg_threads = args.threads, None
+        else:
+            # Distributed batches are mostly video, so split the cores as for video jobs
+            max_jobs, ffmpeg_threads = plan_concurrency('video')
+        install_shutdown_handlers()
+        try:
+            run_worker(parse_address(args.worker), max_jobs, ffmpeg_threads, token=args.token)
+        except KeyboardInterrupt:
+            # Leases of the interrupted jobs expire and the coordinator hands them to other workers
+            sys.exit(130)
     else:
         # Command-line mode - supports multiple input directories
         if not args.input or not args.output:
             parser.print_help()
             sys.exit(1)
         
+        install_shutdown_handlers()
+        if args.watch:
+            from media_converter.watch import watch_directories
+            
+            reject_unused_flags(parser, args, "--watch", BATCH_ONLY_FLAGS)
+            watch_directories(
+                args.input,
+                args.output,
+                args.source_format,
+                args.target_format,
+                args.threads,
+                force=args.force,
+                remux=args.remux,
+                segment_threshold=args.segment_threshold,
+                segment_seconds=args.segment_length,
+                tier=args.tier,
+                settle_seconds=args.settle_seconds,
+                poll_interval=args.poll_interval,
+                use_inotify=not args.poll
+            )
+            return
+        
+        # Deadline runs learn encoder speeds from the traces kept in the cache directory
+        trace_path = args.trace
+        if trace_path is None and args.deadline is not None:
+            from media_converter.tracing import default_trace_path
+            
+            trace_path = default_trace_path("cli")
+        
         # Perform conversion
-        converted, total = convert_directory(
-            args.input,  # This can be a list of directories
-            args.output,
-            args.source_format,
-            args.target_format,
-            args.threads
-        )
+        try:
+            converted, total = convert_directory(
+                args.input,  # This can be a list of directories
+                args.output,
+                args.source_format,
+                args.target_format,
+                args.threads,
+                force=args.force,
+                schedule=args.schedule,
+                remux=args.remux,
+                segment_threshold=args.segment_threshold,
+                segment_seconds=args.segment_length,
+                trace_path=trace_path,
+                engine=args.engine,
+                batch_small_files=args.batch_small_files,
+                dedup=args.dedup,
+                cache_dir=args.cache_dir,
+                cache_max_bytes=args.cache_max_size,
+                tier=args.tier,
+                deadline=args.deadline,
+                staging_dir=args.staging_dir,
+                staging_budget=args.staging_budget
+            )
+        except KeyboardInterrupt:
+            print("Conversion stopped. Finished files are kept and recorded, so the next run continues from here.")
+            sys.exit(130)
         
         if converted == 0 and total > 0:
             sys.exit(1)
 
 
 if __name__ == "__main__":
+    # Let modules that import audio_format_converter share this instance instead of loading a second copy
+    sys.modules.setdefault("audio_format_converter", sys.modules[__name__])
     main()
\ No newline at end of file
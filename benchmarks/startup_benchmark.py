@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+
+Measures how long it takes to import audio_format_converter and to run the CLI up to argument
+parsing, and checks that GUI-only modules are not loaded on those paths. Budgets apply to the
+time on top of a bare interpreter start, and the script exits with a non-zero status when one
+is exceeded, so it can guard against import-time regressions.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 15] [--import-budget-ms 100] [--cli-budget-ms 150]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be loaded by a plain import or a CLI run
+FORBIDDEN_MODULES = ["tkinter", "media_converter.gui", "urllib.request"]
+
+IMPORT_SNIPPET = (
+    "import sys, json\n"
+    "import audio_format_converter\n"
+    "print(json.dumps([m for m in {forbidden!r} if m in sys.modules]))\n"
+)
+
+
+def time_command(cmd, runs):
+    """Run a command several times and return the wall times in milliseconds"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings, baseline_ms=0.0):
+    median = statistics.median(timings)
+    return {
+        "median_ms": round(median, 1),
+        "min_ms": round(min(timings), 1),
+        "max_ms": round(max(timings), 1),
+        "overhead_ms": round(median - baseline_ms, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import and CLI startup time.")
+    parser.add_argument("--runs", type=int, default=15, help="Number of runs per measurement")
+    parser.add_argument("--import-budget-ms", type=float, default=100, help="Maximum median import time above interpreter start-up")
+    parser.add_argument("--cli-budget-ms", type=float, default=150, help="Maximum median `--help` time above interpreter start-up")
+    args = parser.parse_args()
+
+    python = sys.executable
+
+    # Baseline: bare interpreter start-up, so budgets can be read relative to it
+    baseline = time_command([python, "-c", "pass"], args.runs)
+    import_times = time_command([python, "-c", "import audio_format_converter"], args.runs)
+    cli_times = time_command([python, "audio_format_converter.py", "--help"], args.runs)
+
+    # Check which forbidden modules the import pulls in
+    check = subprocess.run(
+        [python, "-c", IMPORT_SNIPPET.format(forbidden=FORBIDDEN_MODULES)],
+        cwd=REPO_DIR, capture_output=True, text=True, check=False
+    )
+    try:
+        loaded_forbidden = json.loads(check.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        loaded_forbidden = ["<import failed>"]
+
+    baseline_ms = statistics.median(baseline)
+    results = {
+        "interpreter": summarize(baseline),
+        "import": summarize(import_times, baseline_ms),
+        "cli_help": summarize(cli_times, baseline_ms),
+        "forbidden_modules_loaded": loaded_forbidden,
+    }
+    print(json.dumps(results, indent=2))
+
+    failures = []
+    if results["import"]["overhead_ms"] > args.import_budget_ms:
+        failures.append(f"import took {results['import']['overhead_ms']} ms (budget {args.import_budget_ms} ms)")
+    if results["cli_help"]["overhead_ms"] > args.cli_budget_ms:
+        failures.append(f"CLI --help took {results['cli_help']['overhead_ms']} ms (budget {args.cli_budget_ms} ms)")
+    if loaded_forbidden:
+        failures.append(f"GUI-only modules loaded on import: {', '.join(loaded_forbidden)}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Startup within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
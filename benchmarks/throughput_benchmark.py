@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Throughput Benchmark
+
+Generates synthetic audio and video fixtures with FFmpeg's lavfi sources (no network or sample
+corpus needed), converts them with convert_directory for every supported source -> target pair
+at several worker counts, and reports the realtime factor, files per second, child CPU seconds
+and output size as JSON. Fixtures are deterministic, so results of two runs on the same machine
+and FFmpeg build can be compared with --compare to catch regressions in the codec arguments.
+
+Usage:
+    python benchmarks/throughput_benchmark.py [--sources mp3 ts] [--targets wav mp4] [--workers 1 2 4]
+                                              [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import audio_format_converter as converter  # noqa: E402
+
+SCHEMA_VERSION = 1
+
+# lavfi sources for the fixtures; both are deterministic
+AUDIO_SOURCE = "sine=frequency=440:sample_rate=44100:duration={duration}"
+VIDEO_SOURCE = "testsrc2=size={size}:rate=30:duration={duration}"
+
+
+def supported_pairs(sources=None, targets=None):
+    """Return the (source, target) format pairs the converter supports, optionally filtered"""
+    pairs = []
+    for source_format in converter.AUDIO_FORMATS + converter.VIDEO_FORMATS:
+        # Video can be converted to audio and video, audio only to audio
+        target_formats = converter.AUDIO_FORMATS + (converter.VIDEO_FORMATS if converter.is_video_format(source_format) else [])
+        for target_format in target_formats:
+            if target_format == source_format:
+                continue
+            if sources and source_format not in sources:
+                continue
+            if targets and target_format not in targets:
+                continue
+            pairs.append((source_format, target_format))
+    return pairs
+
+
+def create_fixtures(fixtures_dir, source_format, count, duration, video_size):
+    """Create count fixtures of one source format; returns (directory, error or None)"""
+    format_dir = os.path.join(fixtures_dir, source_format)
+    if os.path.isdir(format_dir) and len(os.listdir(format_dir)) == count:
+        return format_dir, None
+    shutil.rmtree(format_dir, ignore_errors=True)
+    os.makedirs(format_dir)
+
+    for index in range(count):
+        # Vary the tone per file so the fixtures are not byte-identical
+        audio = AUDIO_SOURCE.replace("440", str(440 + 110 * index)).format(duration=duration)
+        cmd = [converter.get_ffmpeg_path(), "-hide_banner", "-loglevel", "error", "-y"]
+        if converter.is_video_format(source_format):
+            cmd += ["-f", "lavfi", "-i", VIDEO_SOURCE.format(size=video_size, duration=duration),
+                    "-f", "lavfi", "-i", audio, "-pix_fmt", "yuv420p", "-shortest"]
+        else:
+            cmd += ["-f", "lavfi", "-i", audio, "-ac", "2"]
+        cmd.append(os.path.join(format_dir, f"fixture_{index:02d}.{source_format}"))
+
+        returncode, error_message = converter.run_ffmpeg_command(cmd)
+        if returncode != 0:
+            shutil.rmtree(format_dir, ignore_errors=True)
+            return None, error_message or f"ffmpeg exited with {returncode}"
+    return format_dir, None
+
+
+def children_cpu_seconds():
+    """Return the user + system CPU time of finished child processes (None where unsupported)"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def directory_size(path):
+    total = 0
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            if file_name.startswith(".conversion_manifest"):
+                continue
+            total += os.path.getsize(os.path.join(dir_path, file_name))
+    return total
+
+
+def run_case(fixture_dir, work_dir, source_format, target_format, workers, remux):
+    """Convert all fixtures of one pair once and return the measurements"""
+    output_dir = os.path.join(work_dir, "out")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    cpu_before = children_cpu_seconds()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        converted, total = converter.convert_directory(
+            [fixture_dir], output_dir, source_format, target_format, max_workers=workers, force=True, remux=remux
+        )
+    wall = time.perf_counter() - start
+    cpu_after = children_cpu_seconds()
+
+    return {
+        "wall_seconds": wall,
+        "cpu_seconds": None if cpu_before is None else cpu_after - cpu_before,
+        "converted": converted,
+        "total": total,
+        "output_bytes": directory_size(output_dir),
+    }
+
+
+def summarize_runs(runs, files, media_seconds):
+    """Combine repeated runs of a case (median wall and CPU time)"""
+    wall = statistics.median(run["wall_seconds"] for run in runs)
+    cpu_times = [run["cpu_seconds"] for run in runs if run["cpu_seconds"] is not None]
+    return {
+        "files": files,
+        "converted": min(run["converted"] for run in runs),
+        "wall_seconds": round(wall, 3),
+        "realtime_factor": round(media_seconds / wall, 2) if wall else None,
+        "files_per_second": round(files / wall, 3) if wall else None,
+        "cpu_seconds": round(statistics.median(cpu_times), 3) if cpu_times else None,
+        "output_bytes": runs[-1]["output_bytes"],
+    }
+
+
+def compare_results(baseline, results, tolerance):
+    """Return regression messages for cases whose realtime factor dropped by more than tolerance"""
+    regressions = []
+    baseline_cases = baseline.get("cases", {})
+    for key, case in results["cases"].items():
+        old = baseline_cases.get(key)
+        if not old or not old.get("realtime_factor") or not case.get("realtime_factor"):
+            continue
+        change = case["realtime_factor"] / old["realtime_factor"] - 1
+        if change < -tolerance:
+            regressions.append(f"{key}: {old['realtime_factor']}x -> {case['realtime_factor']}x ({change:+.0%})")
+        if old.get("output_bytes") and case.get("output_bytes") != old["output_bytes"]:
+            size_change = case["output_bytes"] / old["output_bytes"] - 1
+            if abs(size_change) > tolerance:
+                regressions.append(f"{key}: output size {old['output_bytes']} -> {case['output_bytes']} bytes ({size_change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark conversion throughput for every source/target format pair.")
+    parser.add_argument("--sources", nargs="+", help="Only benchmark these source formats")
+    parser.add_argument("--targets", nargs="+", help="Only benchmark these target formats")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4], help="Worker counts to run each pair with")
+    parser.add_argument("--files", type=int, default=4, help="Fixtures per source format")
+    parser.add_argument("--audio-duration", type=float, default=30, help="Length of the audio fixtures in seconds")
+    parser.add_argument("--video-duration", type=float, default=5, help="Length of the video fixtures in seconds")
+    parser.add_argument("--video-size", default="1280x720", help="Frame size of the video fixtures")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the median is reported")
+    parser.add_argument("--remux", action="store_true", help="Allow the stream-copy fast path (off to measure the encoders)")
+    parser.add_argument("--fixtures-dir", help="Keep fixtures here and reuse them across runs")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown before --compare fails")
+    args = parser.parse_args()
+
+    # Keep stdout for the JSON results
+    with contextlib.redirect_stdout(sys.stderr):
+        if not converter.validate_ffmpeg_installation():
+            return 2
+
+    pairs = supported_pairs(args.sources, args.targets)
+    if not pairs:
+        print("❌ No supported format pairs match --sources/--targets")
+        return 2
+
+    capabilities = converter.get_ffmpeg_capabilities() or {}
+    results = {
+        "schema": SCHEMA_VERSION,
+        "environment": {
+            "ffmpeg_version": capabilities.get("version"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "parameters": {
+            "files": args.files,
+            "audio_duration": args.audio_duration,
+            "video_duration": args.video_duration,
+            "video_size": args.video_size,
+            "repeat": args.repeat,
+            "remux": args.remux,
+        },
+        "cases": {},
+        "errors": {},
+    }
+
+    work_dir = tempfile.mkdtemp(prefix="converter-bench-")
+    fixtures_dir = args.fixtures_dir or os.path.join(work_dir, "fixtures")
+    try:
+        fixture_dirs = {}
+        for source_format in sorted({source for source, _ in pairs}):
+            duration = args.video_duration if converter.is_video_format(source_format) else args.audio_duration
+            print(f"Generating {args.files} {source_format.upper()} fixtures ({duration:g}s each)...", file=sys.stderr)
+            fixture_dir, error = create_fixtures(fixtures_dir, source_format, args.files, duration, args.video_size)
+            if error:
+                results["errors"][source_format] = f"fixture generation failed: {error[:200]}"
+                continue
+            fixture_dirs[source_format] = (fixture_dir, duration)
+
+        for source_format, target_format in pairs:
+            if source_format not in fixture_dirs:
+                continue
+            fixture_dir, duration = fixture_dirs[source_format]
+            media_seconds = duration * args.files
+            for workers in args.workers:
+                key = f"{source_format}->{target_format}@{workers}"
+                runs = [run_case(fixture_dir, work_dir, source_format, target_format, workers, args.remux)
+                        for _ in range(args.repeat)]
+                case = summarize_runs(runs, args.files, media_seconds)
+                results["cases"][key] = case
+                if case["converted"] < args.files:
+                    results["errors"][key] = f"only {case['converted']} of {args.files} files converted"
+                print(f"{key}: {case['realtime_factor']}x realtime, {case['files_per_second']} files/s", file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("parameters") != results["parameters"]:
+            print("⚠️ Baseline was recorded with different parameters; results may not be comparable", file=sys.stderr)
+        regressions = compare_results(baseline, results, args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("✅ No regressions against the baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""
+Media Format Converter - supporting modules
+
+Helpers used by audio_format_converter.py that are large enough to live in their own module.
+"""
@@ -0,0 +1,280 @@
+"""
+Asyncio conversion engine
+
+Runs the FFmpeg commands that convert_media_file plans from an asyncio event loop, so a job
+in flight costs a coroutine instead of a blocked thread. This suits batches of hundreds of
+short audio files. Running FFmpeg processes are bounded by a semaphore, and their stdout
+(progress) and stderr are streamed line by line; only the tail of stderr is kept for error
+messages. The CLI (`--engine async`) and the GUI both drive it through run_streaming_async.
+
+CPU time and peak memory of the processes are not collected here, because the event loop
+reaps them; traces only show their wall time.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import os
+import platform
+import subprocess
+import threading
+import time
+
+from audio_format_converter import (
+    CONVERSION_CONVERTED,
+    CONVERSION_FAILED,
+    CONVERSION_SKIPPED,
+    PROCESS_REGISTRY,
+    discard_conversion_outputs,
+    fetch_cached_conversion,
+    finish_media_conversion,
+    get_media_duration,
+    plan_media_conversion,
+    record_conversion_results,
+    run_ffmpeg_command,
+    stale_conversion_targets,
+    store_cached_conversion,
+)
+from media_converter.manifest import source_signature
+from media_converter.progress import ProgressParser
+from media_converter.segmented import encode_segmented
+from media_converter.tracing import add_process_usage
+
+
+# Lines of FFmpeg's stderr kept for error messages
+STDERR_TAIL_LINES = 200
+
+
+class AsyncConversionEngine:
+    """Runs conversions as coroutines with at most max_jobs FFmpeg processes at a time
+
+    Must be created inside the running event loop. Blocking preparation (ffprobe, creating
+    directories) runs in the loop's default thread pool.
+    """
+
+    def __init__(self, max_jobs):
+        self.process_slots = asyncio.Semaphore(max(1, max_jobs))
+
+    async def run_command(self, cmd, progress_callback=None, usage=None, job=None):
+        """Async counterpart of run_ffmpeg_command; returns (returncode, error_text)"""
+        kwargs = {}
+        if platform.system() == "Windows":
+            kwargs["creationflags"] = 0x08000000  # CREATE_NO_WINDOW
+
+        if progress_callback is not None:
+            cmd = cmd[:1] + ["-progress", "pipe:1", "-nostats"] + cmd[1:]
+
+        slot_wait_started = time.monotonic()
+        async with self.process_slots:
+            started = time.monotonic()
+            if usage is not None:
+                usage["slot_wait"] = usage.get("slot_wait", 0.0) + started - slot_wait_started
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE if progress_callback else subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                **kwargs
+            )
+            PROCESS_REGISTRY.register(process, job)
+            stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+
+            async def read_stderr():
+                while True:
+                    line = await process.stderr.readline()
+                    if not line:
+                        break
+                    stderr_tail.append(line)
+
+            async def read_progress():
+                parser = ProgressParser(progress_callback)
+                while True:
+                    line = await process.stdout.readline()
+                    if not line:
+                        break
+                    parser.feed(line)
+
+            readers = [read_stderr()]
+            if progress_callback is not None:
+                readers.append(read_progress())
+            try:
+                await asyncio.gather(*readers)
+                returncode = await process.wait()
+            except asyncio.CancelledError:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+            finally:
+                PROCESS_REGISTRY.unregister(process)
+
+        if usage is not None:
+            add_process_usage(usage, time.monotonic() - started, None)
+        return returncode, b"".join(stderr_tail).decode("utf-8", errors="replace").strip()
+
+    async def convert(self, source_path, output_path, source_format=None, target_format=None, media_type=None,
+                      progress_callback=None, cache=None, job=None, **convert_options):
+        """Async counterpart of convert_media_file, taking the same keyword arguments"""
+        if PROCESS_REGISTRY.is_cancelled(job):
+            return False
+
+        loop = asyncio.get_event_loop()
+        details = convert_options.get("details")
+        plan = None
+        try:
+            plan = await loop.run_in_executor(None, functools.partial(
+                plan_media_conversion, source_path, output_path, source_format, target_format, media_type,
+                **convert_options
+            ))
+
+            # Hashing the source and linking cached outputs block, so they run in the pool too
+            cache_key = None
+            if cache is not None:
+                cache_key, hit = await loop.run_in_executor(
+                    None, fetch_cached_conversion, cache, plan, source_path, details)
+                if hit:
+                    return True
+
+            if plan["segmented"]:
+                # Segment encodes run several processes of their own; they hold one slot here
+                def run_segment_command(segment_cmd):
+                    return run_ffmpeg_command(segment_cmd, usage=details, job=job)
+
+                async with self.process_slots:
+                    success, error_message, segment_count = await loop.run_in_executor(
+                        None, functools.partial(encode_segmented, run_segment_command, **plan["segmented"]))
+                if details is not None:
+                    details["segments"] = segment_count
+            else:
+                returncode, error_message = await self.run_command(plan["cmd"], progress_callback, usage=details, job=job)
+                success = returncode == 0
+
+            if not success and PROCESS_REGISTRY.is_cancelled(job):
+                discard_conversion_outputs(plan)
+                return False
+
+            success = finish_media_conversion(plan, source_path, success, error_message)
+            if success and cache_key is not None:
+                await loop.run_in_executor(None, store_cached_conversion, cache, cache_key, plan)
+            return success
+
+        except asyncio.CancelledError:
+            if plan:
+                discard_conversion_outputs(plan)
+            raise
+        except Exception as e:
+            if plan:
+                discard_conversion_outputs(plan)
+            print(f"❌ Exception converting {os.path.basename(source_path)}: {str(e)}")
+            return False
+
+    async def convert_incremental(self, source_path, output_path, source_format, target_format, media_type, manifest,
+                                  force=False, extra_targets=None, progress=None, **convert_options):
+        """Async counterpart of convert_media_file_incremental (without adaptive concurrency)"""
+        stale_targets = stale_conversion_targets(source_path, output_path, source_format, target_format, media_type,
+                                                 manifest, force, extra_targets, convert_options.get("remux", True))
+        if not stale_targets:
+            if progress is not None:
+                progress.job_skipped()
+            return CONVERSION_SKIPPED
+
+        # Take the signature before converting so changes made during the conversion are noticed next run
+        try:
+            signature = source_signature(source_path)
+        except OSError:
+            signature = None
+
+        primary_format, primary_output, _, primary_media_type, _ = stale_targets[0]
+        extra_outputs = [(target[0], str(target[1])) for target in stale_targets[1:]]
+        if extra_outputs:
+            convert_options["extra_outputs"] = extra_outputs
+
+        job_id = object()
+        if progress is not None:
+            duration = await asyncio.get_event_loop().run_in_executor(None, get_media_duration, source_path)
+            progress.job_started(job_id, duration)
+            convert_options["progress_callback"] = lambda seconds_done, speed: progress.job_progress(job_id, seconds_done, speed)
+        try:
+            success = await self.convert(str(source_path), str(primary_output), source_format, primary_format,
+                                         primary_media_type, **convert_options)
+        finally:
+            if progress is not None:
+                progress.job_finished(job_id)
+
+        record_conversion_results(stale_targets, source_path, signature, success)
+        return CONVERSION_CONVERTED if success else CONVERSION_FAILED
+
+
+async def _run_streaming(jobs, task, max_jobs, max_pending, should_stop, on_exception, on_submit):
+    loop = asyncio.get_event_loop()
+    engine = AsyncConversionEngine(max_jobs)
+    queue = asyncio.Queue(maxsize=max(1, max_pending))
+    pending = asyncio.Semaphore(max(1, max_pending))
+    finished = object()
+    stopped = threading.Event()  # Set once nothing takes jobs off the queue any more
+
+    def put(item):
+        """Queue an item from the feeder thread; False if the loop cancelled the put while shutting down"""
+        try:
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+            return True
+        except concurrent.futures.CancelledError:
+            return False
+
+    # The iterator may block (directory walk, probing), so it is consumed on a worker thread
+    def feed_jobs():
+        try:
+            for job in jobs:
+                if stopped.is_set() or (should_stop and should_stop()) or not put(job):
+                    break
+        finally:
+            # After a cancel (Ctrl+C) the queue may be full with no consumer left to drain it
+            if not stopped.is_set():
+                put(finished)
+
+    async def run_job(job):
+        try:
+            await task(engine, job)
+        except Exception as e:
+            if on_exception:
+                on_exception(e)
+        finally:
+            pending.release()
+
+    feeder = loop.run_in_executor(None, feed_jobs)
+    running = set()
+    submitted = 0
+    try:
+        while True:
+            job = await queue.get()
+            if job is finished:
+                break
+            if should_stop and should_stop():
+                continue
+            await pending.acquire()
+            if on_submit:
+                on_submit(job)
+            future = asyncio.ensure_future(run_job(job))
+            running.add(future)
+            future.add_done_callback(running.discard)
+            submitted += 1
+
+        await feeder
+        if running:
+            await asyncio.gather(*running)
+    finally:
+        # Unblock a feeder waiting on a full queue, so asyncio.run can shut its executor down
+        stopped.set()
+        while not queue.empty():
+            queue.get_nowait()
+    return submitted
+
+
+def run_streaming_async(jobs, task, max_jobs, max_pending, should_stop=None, on_exception=None, on_submit=None):
+    """Asyncio counterpart of submit_streaming: run `await task(engine, job)` for every job
+
+    Blocks until all jobs are done. At most max_pending jobs are in flight and at most max_jobs
+    FFmpeg processes run at once. Returns the number of jobs started.
+    """
+    return asyncio.run(_run_streaming(jobs, task, max_jobs, max_pending, should_stop, on_exception, on_submit))
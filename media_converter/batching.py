@@ -0,0 +1,61 @@
+"""
+Small-file batching
+
+For libraries of short clips most of the time goes into starting FFmpeg, not into encoding.
+These helpers group short files so that several of them are converted by one FFmpeg process
+(one `-i` per file, each mapped to its own output). Batches are sized by the estimated media
+duration of their files, taken from the media info cache or, without probing, from the file
+size.
+"""
+
+# Files estimated to be longer than this are converted on their own
+SMALL_FILE_MAX_SECONDS = 60
+
+# Media time a batch is filled up to, and hard limits per FFmpeg process
+BATCH_TARGET_SECONDS = 300
+BATCH_MAX_INPUTS = 32
+
+# Command-line length budget for the paths of one batch (Windows allows 32767 characters)
+BATCH_MAX_PATH_CHARS = 24000
+
+# Bitrate assumed when a file's duration is unknown (~192 kbit/s), to estimate it from its size
+ASSUMED_BYTES_PER_SECOND = 24000
+
+
+def estimate_seconds_from_size(size_bytes):
+    return size_bytes / ASSUMED_BYTES_PER_SECOND
+
+
+def group_small_jobs(jobs, estimate_seconds, path_length=None, target_seconds=BATCH_TARGET_SECONDS,
+                     max_inputs=BATCH_MAX_INPUTS, max_path_chars=BATCH_MAX_PATH_CHARS):
+    """Group an iterator of jobs into lists of jobs to convert in one FFmpeg process
+
+    estimate_seconds(job) returns the estimated duration of a job. Jobs longer than
+    SMALL_FILE_MAX_SECONDS come out alone; short jobs are collected until the batch reaches
+    target_seconds of media, max_inputs files or max_path_chars of paths (path_length(job)
+    gives the characters a job adds to the command). Works lazily, so batches are handed out
+    while the iterator is still producing jobs.
+    """
+    batch = []
+    batch_seconds = 0.0
+    batch_chars = 0
+    for job in jobs:
+        seconds = estimate_seconds(job)
+        if seconds is None or seconds > SMALL_FILE_MAX_SECONDS:
+            yield [job]
+            continue
+
+        chars = path_length(job) if path_length else 0
+        if batch and batch_chars + chars > max_path_chars:
+            yield batch
+            batch, batch_seconds, batch_chars = [], 0.0, 0
+
+        batch.append(job)
+        batch_seconds += seconds
+        batch_chars += chars
+        if batch_seconds >= target_seconds or len(batch) >= max_inputs:
+            yield batch
+            batch, batch_seconds, batch_chars = [], 0.0, 0
+
+    if batch:
+        yield batch
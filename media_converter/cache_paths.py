@@ -0,0 +1,26 @@
+"""
+Cache locations
+
+Shared helper for finding the per-user directory where the converter keeps its caches.
+"""
+
+import os
+import platform
+
+
+def user_cache_dir():
+    """Return (and create) the per-user cache directory
+
+    The MEDIA_CONVERTER_CACHE_DIR environment variable overrides the default location.
+    """
+    cache_dir = os.environ.get("MEDIA_CONVERTER_CACHE_DIR")
+    if not cache_dir:
+        if platform.system() == "Windows":
+            base_dir = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+            cache_dir = os.path.join(base_dir, "MediaFormatConverter", "Cache")
+        else:
+            base_dir = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+            cache_dir = os.path.join(base_dir, "media-format-converter")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
@@ -0,0 +1,233 @@
+"""
+Adaptive concurrency
+
+Chooses how many conversions to run at once and how many threads each FFmpeg process may
+use, then keeps adjusting the number of concurrent jobs while the batch runs based on the
+system load average and available memory (including cgroup limits on Linux). Video encoders
+such as libx264 and libvpx-vp9 are multi-threaded themselves, so running one job per core
+oversubscribes the CPU; large sources can also exhaust memory if too many run at once.
+"""
+
+import os
+import threading
+import time
+
+
+# Threads given to each video encode; x264/vp9 scale well up to about this many threads per job
+VIDEO_THREADS_PER_JOB = 4
+
+# Rough memory use of one FFmpeg process
+AUDIO_JOB_MEMORY = 64 * 1024 * 1024
+VIDEO_JOB_BASE_MEMORY = 160 * 1024 * 1024
+VIDEO_FRAMES_IN_FLIGHT = 80        # Lookahead, reference and threading buffers
+BYTES_PER_PIXEL = 1.5               # YUV 4:2:0
+DEFAULT_VIDEO_PIXELS = 1920 * 1080
+
+# Memory kept free for the rest of the system
+MEMORY_RESERVE = 512 * 1024 * 1024
+
+# Seconds after which a started job is assumed to show up in the system's memory figures
+MEMORY_RAMP_SECONDS = 10.0
+
+
+def _read_file(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit():
+    """Return the CPU quota of the current cgroup in cores, or None if unlimited/unknown"""
+    # cgroup v2: "max 100000" or "<quota> <period>"
+    cpu_max = _read_file("/sys/fs/cgroup/cpu.max")
+    if cpu_max:
+        parts = cpu_max.split()
+        if len(parts) == 2 and parts[0] != "max":
+            try:
+                return int(parts[0]) / int(parts[1])
+            except (ValueError, ZeroDivisionError):
+                return None
+        return None
+
+    # cgroup v1
+    quota = _read_file("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+    period = _read_file("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    try:
+        if quota and period and int(quota) > 0:
+            return int(quota) / int(period)
+    except (ValueError, ZeroDivisionError):
+        pass
+    return None
+
+
+def available_cpus():
+    """Return the number of CPUs this process may use (affinity and cgroup quota aware)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 4
+
+    quota = cgroup_cpu_limit()
+    if quota:
+        cpus = min(cpus, max(1, int(quota + 0.5)))
+    return max(1, cpus)
+
+
+def _meminfo_available():
+    """Return MemAvailable from /proc/meminfo in bytes, or None"""
+    meminfo = _read_file("/proc/meminfo")
+    if not meminfo:
+        return None
+    for line in meminfo.splitlines():
+        if line.startswith("MemAvailable:"):
+            try:
+                return int(line.split()[1]) * 1024
+            except (IndexError, ValueError):
+                return None
+    return None
+
+
+def _cgroup_memory_headroom():
+    """Return the memory left before hitting the cgroup limit in bytes, or None if unlimited"""
+    # cgroup v2
+    limit = _read_file("/sys/fs/cgroup/memory.max")
+    usage = _read_file("/sys/fs/cgroup/memory.current")
+    if limit is None:
+        # cgroup v1
+        limit = _read_file("/sys/fs/cgroup/memory/memory.limit_in_bytes")
+        usage = _read_file("/sys/fs/cgroup/memory/memory.usage_in_bytes")
+
+    try:
+        limit_bytes = int(limit)
+        usage_bytes = int(usage)
+    except (TypeError, ValueError):
+        return None
+
+    # cgroup v1 reports "unlimited" as a huge number
+    if limit_bytes >= 1 << 60:
+        return None
+    return max(0, limit_bytes - usage_bytes)
+
+
+def available_memory():
+    """Return the memory available for new jobs in bytes, or None if it cannot be determined"""
+    candidates = [value for value in (_meminfo_available(), _cgroup_memory_headroom()) if value is not None]
+    return min(candidates) if candidates else None
+
+
+def load_average():
+    """Return the 1-minute load average, or None where it is not available (Windows)"""
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+def estimate_job_memory(media_type, media_info=None):
+    """Estimate the peak memory of one FFmpeg conversion in bytes"""
+    if media_type != "video":
+        return AUDIO_JOB_MEMORY
+
+    pixels = DEFAULT_VIDEO_PIXELS
+    for stream in (media_info or {}).get("streams", []):
+        if stream.get("codec_type") == "video" and stream.get("width") and stream.get("height"):
+            pixels = stream["width"] * stream["height"]
+            break
+
+    return int(VIDEO_JOB_BASE_MEMORY + pixels * BYTES_PER_PIXEL * VIDEO_FRAMES_IN_FLIGHT)
+
+
+def plan_concurrency(media_type, cpus=None):
+    """Split the available cores into (concurrent jobs, FFmpeg threads per job)"""
+    cpus = cpus or available_cpus()
+    if media_type != "video":
+        # Audio encoders are effectively single-threaded
+        return cpus, 1
+
+    threads_per_job = min(VIDEO_THREADS_PER_JOB, cpus)
+    return max(1, cpus // threads_per_job), threads_per_job
+
+
+class AdaptiveConcurrencyController:
+    """Limits how many conversions run at once and adapts the limit while the batch runs
+
+    Worker threads call acquire() before starting FFmpeg and release() when it exits. The limit
+    shrinks when the load average exceeds the available cores and grows back when there is
+    headroom. A job is also held back while the memory it is expected to need is not available,
+    unless nothing else is running.
+    """
+
+    def __init__(self, max_jobs, threads_per_job, cpus=None, adjust_interval=5.0):
+        self.max_jobs = max(1, max_jobs)
+        self.threads_per_job = threads_per_job
+        self.cpus = cpus or available_cpus()
+        self.adjust_interval = adjust_interval
+        self.limit = self.max_jobs
+        self.running = 0
+        self.recent_starts = []  # (start time, memory estimate) of jobs that may not have allocated yet
+        self.held_back = 0
+        self.condition = threading.Condition()
+        self.last_adjust = time.monotonic()
+
+    def _adjust(self):
+        """Update the concurrency limit from the load average (condition must be held)"""
+        now = time.monotonic()
+        if now - self.last_adjust < self.adjust_interval:
+            return
+        self.last_adjust = now
+
+        load = load_average()
+        if load is None:
+            return
+
+        if load > self.cpus * 1.25 and self.limit > 1:
+            self.limit -= 1
+        elif load < self.cpus * 0.75 and self.limit < self.max_jobs:
+            self.limit += 1
+
+    def _memory_allows(self, memory_estimate):
+        """Check whether a job needing memory_estimate bytes fits (condition must be held)"""
+        if self.running == 0:
+            return True
+        available = available_memory()
+        if available is None:
+            return True
+
+        # Jobs that just started may not have allocated their memory yet
+        now = time.monotonic()
+        self.recent_starts = [(start, estimate) for start, estimate in self.recent_starts
+                              if now - start < MEMORY_RAMP_SECONDS]
+        pending = sum(estimate for _, estimate in self.recent_starts)
+        return available - pending - memory_estimate >= MEMORY_RESERVE
+
+    def acquire(self, memory_estimate=0, should_stop=None):
+        """Wait until a new job may start; returns False if should_stop() became True"""
+        with self.condition:
+            counted_hold_back = False
+            while True:
+                if should_stop and should_stop():
+                    return False
+                self._adjust()
+                if self.running < self.limit and self._memory_allows(memory_estimate):
+                    break
+                if not counted_hold_back:
+                    self.held_back += 1
+                    counted_hold_back = True
+                self.condition.wait(timeout=1.0)
+
+            self.running += 1
+            self.recent_starts.append((time.monotonic(), memory_estimate))
+            return True
+
+    def release(self):
+        """Mark a job as finished"""
+        with self.condition:
+            self.running -= 1
+            self.condition.notify_all()
+
+    def describe(self):
+        """Return a one-line summary of the plan"""
+        return (f"Adaptive concurrency: up to {self.max_jobs} concurrent jobs × "
+                f"{self.threads_per_job} FFmpeg threads on {self.cpus} CPUs")
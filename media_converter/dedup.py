@@ -0,0 +1,133 @@
+"""
+Source deduplication
+
+Finds byte-identical source files so each is converted only once. Files are grouped by size,
+then by a cheap partial hash of their first and last blocks, and only the remaining candidates
+are fully hashed. Outputs of the duplicates are then filled from the converted original with a
+hardlink, a reflink (copy-on-write clone) or a plain copy, whichever the filesystem supports.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# Bytes hashed at the start and at the end of a file for the partial fingerprint
+PARTIAL_HASH_BYTES = 64 * 1024
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# Linux ioctl that clones a file's extents (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+LINK_HARDLINK = "hardlink"
+LINK_REFLINK = "reflink"
+LINK_COPY = "copy"
+
+
+def partial_hash(path, size):
+    """Hash the first and last PARTIAL_HASH_BYTES of a file"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(PARTIAL_HASH_BYTES))
+        if size > 2 * PARTIAL_HASH_BYTES:
+            f.seek(size - PARTIAL_HASH_BYTES)
+            digest.update(f.read(PARTIAL_HASH_BYTES))
+    return digest.hexdigest()
+
+
+def full_hash(path):
+    """Hash the whole file"""
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _group_by(items, key_func):
+    """Group items by key_func(item), dropping items whose key cannot be computed"""
+    groups = {}
+    for item in items:
+        try:
+            key = key_func(item)
+        except OSError:
+            continue
+        groups.setdefault(key, []).append(item)
+    return groups
+
+
+def find_duplicates(jobs, path_of=lambda job: job):
+    """Find jobs whose files are byte-identical
+
+    Returns {original job: [duplicate jobs]}; the original is the first job of each group in
+    input order. Jobs that cannot be read are treated as unique.
+    """
+    sizes = {}
+    for job in jobs:
+        try:
+            sizes[job] = os.stat(path_of(job)).st_size
+        except OSError:
+            continue
+
+    duplicates = {}
+    for size, same_size in _group_by(sizes, lambda job: sizes[job]).items():
+        if len(same_size) < 2 or size == 0:
+            continue
+        for same_partial in _group_by(same_size, lambda job: partial_hash(path_of(job), size)).values():
+            if len(same_partial) < 2:
+                continue
+            # Small files are covered completely by the partial hash
+            if size <= 2 * PARTIAL_HASH_BYTES:
+                groups = [same_partial]
+            else:
+                groups = _group_by(same_partial, lambda job: full_hash(path_of(job))).values()
+            for group in groups:
+                if len(group) > 1:
+                    duplicates[group[0]] = group[1:]
+    return duplicates
+
+
+def _reflink(source_path, target_path):
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    with open(source_path, "rb") as source, open(target_path, "wb") as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            os.remove(target_path)
+            raise
+
+
+def link_or_copy(source_path, target_path, hardlink=True):
+    """Make target_path a copy of source_path as cheaply as the filesystem allows
+
+    Tries a hardlink, then a reflink, then a plain copy. The target is replaced atomically.
+    Pass hardlink=False when the two files must stay independent (a hardlinked file edited in
+    place changes both). Returns the method used.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(target_path)), exist_ok=True)
+    directory, file_name = os.path.split(os.path.abspath(target_path))
+    temp_path = os.path.join(directory, f".{file_name}.{os.getpid()}.{threading.get_ident()}.link")
+
+    for method, make in ((LINK_HARDLINK, os.link), (LINK_REFLINK, _reflink), (LINK_COPY, shutil.copyfile)):
+        if method == LINK_HARDLINK and not hardlink:
+            continue
+        try:
+            make(source_path, temp_path)
+        except OSError:
+            if method == LINK_COPY:
+                raise
+            continue
+        try:
+            os.replace(temp_path, target_path)
+        except OSError:
+            os.remove(temp_path)
+            raise
+        return method
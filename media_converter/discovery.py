@@ -0,0 +1,112 @@
+"""
+Streaming file discovery
+
+Walks input directories with os.scandir and yields matching files as soon as they are found,
+so conversions can start while the walk is still running and memory use does not grow with the
+size of the library.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+
+def iter_source_files(input_dirs, source_format, on_error=None):
+    """Yield (source_file, input_root) Path pairs for every *.source_format file under input_dirs
+
+    Matching follows the platform's case rules, like Path.rglob. Directory symlinks are followed
+    but each directory is visited only once, so symlink loops cannot make the walk run forever.
+    on_error(path, exception) is called for directories that cannot be read.
+    """
+    if isinstance(input_dirs, (str, Path)):
+        input_dirs = [input_dirs]
+
+    suffix = os.path.normcase(f".{source_format}")
+
+    for input_dir in input_dirs:
+        input_root = Path(input_dir)
+        visited = set()
+        pending_dirs = [str(input_root)]
+
+        while pending_dirs:
+            current_dir = pending_dirs.pop()
+            try:
+                dir_stat = os.stat(current_dir)
+                dir_key = (dir_stat.st_dev, dir_stat.st_ino)
+                if dir_key in visited:
+                    continue
+                visited.add(dir_key)
+
+                with os.scandir(current_dir) as entries:
+                    subdirs = []
+                    for entry in entries:
+                        try:
+                            if entry.is_dir():
+                                subdirs.append(entry.path)
+                            elif os.path.normcase(entry.name).endswith(suffix) and entry.is_file():
+                                yield Path(entry.path), input_root
+                        except OSError:
+                            continue
+            except OSError as e:
+                if on_error:
+                    on_error(current_dir, e)
+                continue
+
+            # Reverse so directories are walked in the order scandir returned them
+            pending_dirs.extend(reversed(subdirs))
+
+
+class DiscoveryProgress:
+    """Thread-safe counters shared between the discovery walk and the conversion workers"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.discovered = 0
+        self.finished = False
+
+    def found(self):
+        with self.lock:
+            self.discovered += 1
+
+    def finish(self):
+        with self.lock:
+            self.finished = True
+
+    def snapshot(self):
+        """Return (discovered, finished)"""
+        with self.lock:
+            return self.discovered, self.finished
+
+
+def submit_streaming(executor, jobs, task, max_pending, should_stop=None, on_exception=None, on_submit=None):
+    """Submit task(job) to executor for every job from an iterator as it arrives
+
+    At most max_pending jobs are queued or running at any time; the iterator is paused until a
+    slot frees up, so memory stays flat however many jobs it yields. Iteration stops early when
+    should_stop() returns True. on_submit(job) is called right before each job is submitted.
+    Returns the number of jobs submitted.
+    """
+    slots = threading.BoundedSemaphore(max(1, max_pending))
+    submitted = 0
+
+    def release(future):
+        slots.release()
+        if on_exception and not future.cancelled() and future.exception() is not None:
+            on_exception(future.exception())
+
+    for job in jobs:
+        if should_stop and should_stop():
+            break
+
+        # Wait for a free slot, checking periodically whether we should stop
+        while not slots.acquire(timeout=0.5):
+            if should_stop and should_stop():
+                return submitted
+
+        if on_submit:
+            on_submit(job)
+        future = executor.submit(task, job)
+        future.add_done_callback(release)
+        submitted += 1
+
+    return submitted
@@ -0,0 +1,399 @@
+"""
+Distributed conversion
+
+Spreads one batch across several machines. A coordinator walks the input folders, works out
+the output paths (the same `<FORMAT>s` layout convert_directory uses) and which files are out
+of date, and hands the jobs to workers over TCP. Workers pull a job, run convert_media_file on
+it and report the result; the coordinator records it in the output manifests. Inputs and
+outputs must be reachable under the same paths on every machine (shared storage).
+
+Each job handed out is leased for a limited time. Workers renew the lease while FFmpeg runs;
+when a worker dies its leases expire and the jobs are handed to another worker, up to a number
+of attempts. The protocol is one JSON object per line and one request per connection.
+"""
+
+import collections
+import hmac
+import json
+import os
+import platform
+import socket
+import socketserver
+import threading
+import time
+
+from audio_format_converter import (
+    DEFAULT_COORDINATOR_PORT,
+    PROCESS_REGISTRY,
+    convert_media_file,
+    get_media_type,
+    get_output_file_path,
+    get_output_format_dir,
+    record_conversion_results,
+    stale_conversion_targets,
+)
+from media_converter.discovery import iter_source_files
+from media_converter.manifest import ConversionManifest, source_signature
+from media_converter.segmented import DEFAULT_SEGMENT_SECONDS
+from media_converter.tiers import DEFAULT_TIER
+
+
+# A lease lasts this long unless the worker renews it; workers renew every third of it
+DEFAULT_LEASE_SECONDS = 60.0
+
+# Times a job is handed out before it counts as failed (dead workers included)
+DEFAULT_MAX_ATTEMPTS = 3
+
+# How long idle workers wait before asking again, and how long the coordinator keeps answering
+# after the last job so waiting workers learn that the batch is finished
+POLL_SECONDS = 2.0
+LINGER_SECONDS = 2 * POLL_SECONDS
+
+MAX_MESSAGE_BYTES = 1024 * 1024
+
+# convert_media_file arguments a coordinator may set in a job; workers refuse anything else
+JOB_KEYS = frozenset([
+    "source_path", "output_path", "source_format", "target_format", "media_type", "extra_outputs",
+    "remux", "segment_threshold", "segment_seconds", "tier",
+])
+
+
+def parse_address(value, default_host="127.0.0.1", default_port=DEFAULT_COORDINATOR_PORT):
+    """Parse "host:port", ":port" or "port" into (host, port)"""
+    host, _, port = str(value).rpartition(":")
+    return host or default_host, int(port or default_port)
+
+
+def send_request(address, message, timeout=30.0):
+    """Send one request to the coordinator and return its reply"""
+    with socket.create_connection(address, timeout=timeout) as connection:
+        connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with connection.makefile("rb") as reader:
+            line = reader.readline(MAX_MESSAGE_BYTES)
+    if not line:
+        raise ConnectionError("coordinator closed the connection")
+    return json.loads(line)
+
+
+class Coordinator:
+    """Hands out jobs under leases and collects their results
+
+    jobs maps a job id to a JSON-serializable dict of convert_media_file arguments.
+    on_result(job_id, success, details, worker) is called once per job when it finishes or
+    runs out of attempts.
+    """
+
+    def __init__(self, jobs, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS, token=None,
+                 on_result=None):
+        self.jobs = dict(jobs)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.token = token
+        self.on_result = on_result
+        self.lock = threading.Lock()
+        self.pending = collections.deque(self.jobs)
+        self.leases = {}  # job id -> (worker, deadline)
+        self.attempts = collections.Counter()
+        self.finished = {}  # job id -> success
+        self.reassigned = 0
+        self.workers = set()
+        self.all_finished = threading.Event()
+        if not self.jobs:
+            self.all_finished.set()
+
+    def expire_leases(self):
+        """Put the jobs of expired leases back in the queue (or fail them after max_attempts)"""
+        now = time.monotonic()
+        expired = []
+        with self.lock:
+            for job_id, (worker, deadline) in list(self.leases.items()):
+                if deadline > now:
+                    continue
+                del self.leases[job_id]
+                if self.attempts[job_id] >= self.max_attempts:
+                    expired.append((job_id, worker))
+                else:
+                    self.reassigned += 1
+                    self.pending.appendleft(job_id)
+        for job_id, worker in expired:
+            self._finish(job_id, False, {"error": "lease expired too often"}, worker)
+
+    def _finish(self, job_id, success, details, worker):
+        with self.lock:
+            if job_id in self.finished:
+                return False
+            self.finished[job_id] = success
+            self.leases.pop(job_id, None)
+            try:
+                self.pending.remove(job_id)
+            except ValueError:
+                pass
+            done = len(self.finished) == len(self.jobs)
+        if self.on_result:
+            self.on_result(job_id, success, details, worker)
+        if done:
+            self.all_finished.set()
+        return True
+
+    def handle(self, message):
+        """Answer one request from a worker"""
+        if self.token is not None and not hmac.compare_digest(str(message.get("token") or "").encode("utf-8"),
+                                                              self.token.encode("utf-8")):
+            return {"error": "invalid token"}
+
+        operation = message.get("op")
+        worker = str(message.get("worker", "?"))
+        if operation == "lease":
+            self.expire_leases()
+            with self.lock:
+                self.workers.add(worker)
+                while self.pending:
+                    job_id = self.pending.popleft()
+                    if job_id in self.finished:
+                        continue
+                    self.attempts[job_id] += 1
+                    self.leases[job_id] = (worker, time.monotonic() + self.lease_seconds)
+                    return {"job_id": job_id, "job": self.jobs[job_id], "lease_seconds": self.lease_seconds}
+                if len(self.finished) == len(self.jobs):
+                    return {"finished": True}
+            return {"wait": POLL_SECONDS}
+
+        if operation == "renew":
+            job_id = message.get("job_id")
+            with self.lock:
+                lease = self.leases.get(job_id)
+                if lease is None or lease[0] != worker:
+                    return {"ok": False}
+                self.leases[job_id] = (worker, time.monotonic() + self.lease_seconds)
+            return {"ok": True}
+
+        if operation == "report":
+            job_id = message.get("job_id")
+            if job_id not in self.jobs:
+                return {"error": "unknown job"}
+            success = bool(message.get("success"))
+            if not success:
+                # Another attempt may succeed on a different machine
+                with self.lock:
+                    lease = self.leases.get(job_id)
+                    if lease is None or lease[0] != worker:
+                        # The lease expired and the job was already requeued (or reassigned), so that
+                        # attempt decides the outcome; requeuing it here would hand it out twice
+                        return {"ok": False}
+                    del self.leases[job_id]
+                    retry = job_id not in self.finished and self.attempts[job_id] < self.max_attempts
+                    if retry:
+                        self.pending.append(job_id)
+                if retry:
+                    return {"ok": True}
+            # The first result wins; late reports of reassigned jobs are ignored
+            return {"ok": self._finish(job_id, success, message.get("details") or {}, worker)}
+
+        return {"error": f"unknown operation {operation!r}"}
+
+    def serve(self, address):
+        """Serve workers at address until every job is finished; returns the number of successes"""
+        coordinator = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    message = json.loads(self.rfile.readline(MAX_MESSAGE_BYTES))
+                    reply = coordinator.handle(message)
+                except (ValueError, AttributeError) as e:
+                    reply = {"error": f"bad request: {e}"}
+                self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        with Server(address, RequestHandler) as server:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                while not self.all_finished.wait(min(1.0, self.lease_seconds / 4)):
+                    self.expire_leases()
+                # Keep answering briefly so polling workers are told the batch is finished
+                time.sleep(LINGER_SECONDS)
+            finally:
+                server.shutdown()
+        return sum(1 for success in self.finished.values() if success)
+
+
+def run_coordinator(input_dirs, output_dir, source_format, target_format, address, force=False, remux=True,
+                    segment_threshold=None, segment_seconds=DEFAULT_SEGMENT_SECONDS, tier=DEFAULT_TIER,
+                    lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS, token=None):
+    """Convert a batch like convert_directory, but on remote workers; returns (done, total)"""
+    target_formats = [target_format] if isinstance(target_format, str) else list(target_format)
+    primary_format = target_formats[0]
+    media_type = get_media_type(source_format, primary_format)
+    if isinstance(input_dirs, str):
+        input_dirs = [input_dirs]
+
+    output_format_dirs = {fmt: get_output_format_dir(output_dir, fmt) for fmt in target_formats}
+    manifests = {fmt: ConversionManifest(output_format_dirs[fmt]) for fmt in target_formats}
+
+    print(f"Scanning for {source_format.upper()} files...")
+    jobs = {}
+    pending_targets = {}
+    total_files = 0
+    skipped_files = 0
+    for source_file_path, input_root_path in iter_source_files(input_dirs, source_format):
+        total_files += 1
+        output_file_paths = {
+            fmt: get_output_file_path(source_file_path, input_root_path, output_format_dirs[fmt], fmt)
+            for fmt in target_formats
+        }
+        stale_targets = stale_conversion_targets(
+            source_file_path, output_file_paths[primary_format], source_format, primary_format, media_type,
+            manifests[primary_format], force,
+            [(fmt, output_file_paths[fmt], manifests[fmt]) for fmt in target_formats[1:]], remux)
+        if not stale_targets:
+            skipped_files += 1
+            continue
+
+        # Take the signature now so changes made during the conversion are noticed next run
+        try:
+            signature = source_signature(source_file_path)
+        except OSError:
+            signature = None
+        job_id = len(jobs)
+        pending_targets[job_id] = (source_file_path, stale_targets, signature)
+        jobs[job_id] = {
+            "source_path": str(source_file_path),
+            "output_path": str(stale_targets[0][1]),
+            "source_format": source_format,
+            "target_format": stale_targets[0][0],
+            "media_type": stale_targets[0][3],
+            "extra_outputs": [(target[0], str(target[1])) for target in stale_targets[1:]],
+            "remux": remux,
+            "segment_threshold": segment_threshold,
+            "segment_seconds": segment_seconds,
+            "tier": tier,
+        }
+
+    if total_files == 0:
+        print(f"No {source_format.upper()} files found in the specified directories.")
+        return 0, 0
+
+    results_lock = threading.Lock()
+    workers_seen = collections.Counter()
+
+    def on_result(job_id, success, details, worker):
+        source_file_path, stale_targets, signature = pending_targets[job_id]
+        with results_lock:
+            record_conversion_results(stale_targets, source_file_path, signature, success)
+            workers_seen[worker] += success
+            done = len(coordinator.finished)
+            if success:
+                print(f"✅ [{done}/{len(jobs)}] {source_file_path} ({worker})")
+            else:
+                print(f"❌ [{done}/{len(jobs)}] {source_file_path} ({worker}): {details.get('error', 'conversion failed')}")
+
+    coordinator = Coordinator(jobs, lease_seconds, max_attempts, token, on_result)
+    print(f"{len(jobs)} of {total_files} files need converting; skipped {skipped_files} that were already up to date.")
+    if not jobs:
+        return skipped_files, total_files
+    print(f"Coordinator listening on {address[0]}:{address[1]}; start workers with --worker {address[0]}:{address[1]}")
+
+    start_time = time.monotonic()
+    try:
+        converted_files = coordinator.serve(address)
+    finally:
+        for manifest in manifests.values():
+            manifest.save()
+
+    print(f"\nCompleted converting {converted_files} out of {len(jobs)} {media_type} files "
+          f"on {len(coordinator.workers)} workers.")
+    if coordinator.reassigned:
+        print(f"{coordinator.reassigned} jobs were reassigned after their lease expired.")
+    for worker, count in sorted(workers_seen.items()):
+        print(f"   {worker}: {count} files")
+    print(f"Conversion time: {time.monotonic() - start_time:.1f}s")
+    for output_format_dir in output_format_dirs.values():
+        print(f"Output directory: {output_format_dir}")
+    return converted_files + skipped_files, total_files
+
+
+def run_worker(address, max_jobs=1, threads=None, token=None, name=None):
+    """Pull jobs from a coordinator and convert them until the batch is finished
+
+    Runs max_jobs conversions at a time, each using at most threads FFmpeg threads. Returns the
+    number of jobs converted successfully.
+    """
+    name = name or f"{platform.node()}-{os.getpid()}"
+    converted = collections.Counter()
+
+    def request(message):
+        message.update(worker=name, token=token)
+        return send_request(address, message)
+
+    def renew_lease(job_id, lease_seconds, stop):
+        while not stop.wait(lease_seconds / 3):
+            try:
+                if not request({"op": "renew", "job_id": job_id}).get("ok"):
+                    # Reassigned; finishing anyway is harmless because outputs are replaced atomically
+                    return
+            except OSError:
+                continue
+
+    def report(job_id, success, details):
+        message = {"op": "report", "job_id": job_id, "success": success,
+                   "details": json.loads(json.dumps(details, default=str))}
+        for attempt in range(3):
+            try:
+                request(message)
+                return
+            except OSError:
+                time.sleep(POLL_SECONDS)
+
+    def work_loop():
+        while not PROCESS_REGISTRY.is_cancelled():
+            try:
+                reply = request({"op": "lease"})
+            except OSError as e:
+                print(f"❌ Lost the coordinator at {address[0]}:{address[1]}: {e}")
+                return
+            if reply.get("finished"):
+                return
+            if "error" in reply:
+                print(f"❌ Coordinator refused the request: {reply['error']}")
+                return
+            if "job_id" not in reply:
+                time.sleep(reply.get("wait", POLL_SECONDS))
+                continue
+
+            job = reply["job"]
+            if not isinstance(job, dict) or not set(job) <= JOB_KEYS:
+                unexpected = sorted(set(job) - JOB_KEYS) if isinstance(job, dict) else ["(not an object)"]
+                print(f"❌ Refused job {reply['job_id']} with unexpected arguments: {', '.join(map(str, unexpected))}")
+                report(reply["job_id"], False, {"error": "job has unexpected arguments"})
+                continue
+
+            details = {}
+            stop_renewing = threading.Event()
+            renewer = threading.Thread(target=renew_lease, args=(reply["job_id"], reply["lease_seconds"], stop_renewing),
+                                       daemon=True)
+            renewer.start()
+            try:
+                success = convert_media_file(threads=threads, details=details, concurrent_jobs=max_jobs, **job)
+            finally:
+                stop_renewing.set()
+            if PROCESS_REGISTRY.is_cancelled():
+                # Shutting down; the lease expires and the job goes to another worker
+                return
+            if success:
+                converted["jobs"] += 1
+                print(f"✅ {job['source_path']}")
+
+            report(reply["job_id"], success, details)
+
+    print(f"Worker {name} converting for {address[0]}:{address[1]} with {max_jobs} concurrent jobs")
+    loops = [threading.Thread(target=work_loop) for _ in range(max(1, max_jobs))]
+    for loop in loops:
+        loop.start()
+    for loop in loops:
+        loop.join()
+    print(f"Worker {name} finished: {converted['jobs']} files converted.")
+    return converted["jobs"]
@@ -0,0 +1,116 @@
+"""
+FFmpeg discovery cache
+
+Persists the resolved FFmpeg/ffprobe binaries together with a snapshot of their capabilities
+(version, encoders and muxers), so later runs can skip searching for and probing the binaries.
+A cached entry is only trusted while both binaries still exist with the same modification time.
+"""
+
+import json
+import os
+import platform
+import subprocess
+
+from media_converter.cache_paths import user_cache_dir
+
+
+FFMPEG_CACHE_FILENAME = "ffmpeg.json"
+FFMPEG_CACHE_VERSION = 1
+
+
+def _cache_path():
+    return os.path.join(user_cache_dir(), FFMPEG_CACHE_FILENAME)
+
+
+def _binary_mtime_ns(path):
+    """Return the modification time of a binary, or None if it does not exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except (OSError, TypeError):
+        return None
+
+
+def _run_ffmpeg(ffmpeg_path, *args):
+    """Run FFmpeg with the given arguments and return its stdout, or None on failure"""
+    kwargs = {"capture_output": True, "text": True, "timeout": 10}
+    if platform.system() == "Windows":
+        kwargs["creationflags"] = 0x08000000  # CREATE_NO_WINDOW
+    try:
+        result = subprocess.run([ffmpeg_path, "-hide_banner", *args], **kwargs)
+    except Exception:
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _parse_listing(output):
+    """Parse the names from an `ffmpeg -encoders` or `ffmpeg -muxers` listing"""
+    names = []
+    in_body = False
+    for line in (output or "").splitlines():
+        stripped = line.strip()
+        if not in_body:
+            # The table starts after a separator line (" ------" for encoders, " --" for muxers)
+            in_body = stripped.startswith("--")
+            continue
+        parts = stripped.split()
+        if len(parts) >= 2:
+            names.append(parts[1])
+    return sorted(set(names))
+
+
+def query_ffmpeg_capabilities(ffmpeg_path):
+    """Query version, encoders and muxers from an FFmpeg binary
+
+    Returns None if the binary does not run.
+    """
+    version_output = _run_ffmpeg(ffmpeg_path, "-version")
+    if version_output is None:
+        return None
+
+    first_line = version_output.splitlines()[0] if version_output else ""
+    return {
+        "version": first_line.strip(),
+        "encoders": _parse_listing(_run_ffmpeg(ffmpeg_path, "-encoders")),
+        "muxers": _parse_listing(_run_ffmpeg(ffmpeg_path, "-muxers")),
+    }
+
+
+def load_ffmpeg_cache():
+    """Return the cached discovery result if it is still valid, otherwise None"""
+    try:
+        with open(_cache_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if data.get("version") != FFMPEG_CACHE_VERSION:
+        return None
+
+    # Invalidate the entry if either binary was replaced or removed
+    if _binary_mtime_ns(data.get("ffmpeg_path")) != data.get("ffmpeg_mtime_ns"):
+        return None
+    if data.get("ffprobe_path") and _binary_mtime_ns(data.get("ffprobe_path")) != data.get("ffprobe_mtime_ns"):
+        return None
+
+    return data
+
+
+def save_ffmpeg_cache(ffmpeg_path, ffprobe_path, capabilities):
+    """Persist the discovery result for later runs"""
+    data = {
+        "version": FFMPEG_CACHE_VERSION,
+        "ffmpeg_path": ffmpeg_path,
+        "ffmpeg_mtime_ns": _binary_mtime_ns(ffmpeg_path),
+        "ffprobe_path": ffprobe_path,
+        "ffprobe_mtime_ns": _binary_mtime_ns(ffprobe_path),
+        "capabilities": capabilities,
+    }
+
+    try:
+        path = _cache_path()
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
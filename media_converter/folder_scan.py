@@ -0,0 +1,139 @@
+"""
+Folder analysis
+
+Counts the files a conversion would pick up, with their total size and optionally their total
+media duration. The scan reports its progress as it walks the folders, can be stopped at any
+time, and keeps the file list so a conversion started right after it does not have to walk the
+folders again.
+"""
+
+import os
+import time
+from pathlib import Path
+
+from media_converter.discovery import iter_source_files
+
+
+# Seconds between progress reports
+PROGRESS_INTERVAL = 0.25
+
+# Files probed at a time when durations are included
+PROBE_BATCH_SIZE = 200
+
+# A scan older than this is not reused by a conversion; the folders are walked again
+SCAN_REUSE_SECONDS = 600
+
+
+class FolderScan:
+    """Files found under a set of input folders (partial if the scan was stopped)"""
+
+    def __init__(self, input_dirs, source_format, include_durations=False):
+        self.input_dirs = [str(input_dir) for input_dir in input_dirs]
+        self.source_format = source_format
+        self.include_durations = include_durations
+        self.files = []  # (source_file, input_root) Path pairs, as from iter_source_files
+        self.folders = {input_dir: {"files": 0, "bytes": 0, "found": os.path.isdir(input_dir)}
+                        for input_dir in self.input_dirs}
+        self.total_bytes = 0
+        self.duration_seconds = 0.0
+        self.files_with_duration = 0
+        self.complete = False
+        self.finished_at = None
+
+    def snapshot(self):
+        """Return the running totals as a dict (safe to hand to another thread)"""
+        return {
+            "files": len(self.files),
+            "bytes": self.total_bytes,
+            "duration_seconds": self.duration_seconds,
+            "files_with_duration": self.files_with_duration,
+        }
+
+    def estimated_duration(self):
+        """Total media duration, extrapolated for files whose duration is unknown (None if no file has one)"""
+        if not self.files_with_duration:
+            return None
+        return self.duration_seconds * len(self.files) / self.files_with_duration
+
+    def matches(self, input_dirs, source_format, max_age=SCAN_REUSE_SECONDS):
+        """Whether this finished scan is recent enough to stand in for walking input_dirs again"""
+        return (self.complete
+                and self.source_format == source_format
+                and self.input_dirs == [str(input_dir) for input_dir in input_dirs]
+                and time.time() - self.finished_at <= max_age)
+
+    def fresh_files(self):
+        """Yield the scanned files that still exist"""
+        for source_file_info in self.files:
+            if source_file_info[0].is_file():
+                yield source_file_info
+
+
+def scan_folders(scan, should_stop=None, on_progress=None, get_durations=None):
+    """Fill a FolderScan by walking its folders; returns it, with complete=False if stopped
+
+    on_progress(snapshot, current_folder) is called at most every PROGRESS_INTERVAL seconds.
+    With scan.include_durations, get_durations(paths) must return a dict of path -> duration
+    in seconds (for example from the media info cache, probing only files it does not know).
+    """
+    last_report = 0.0
+    pending_probes = []
+
+    def probe_pending():
+        durations = get_durations(pending_probes)
+        for duration in durations.values():
+            if duration:
+                scan.duration_seconds += duration
+                scan.files_with_duration += 1
+        pending_probes.clear()
+
+    for input_dir in scan.input_dirs:
+        folder = scan.folders[input_dir]
+        if not folder["found"]:
+            continue
+
+        for source_file_info in iter_source_files([input_dir], scan.source_format):
+            if should_stop and should_stop():
+                return scan
+            try:
+                size = source_file_info[0].stat().st_size
+            except OSError:
+                continue
+            scan.files.append(source_file_info)
+            scan.total_bytes += size
+            folder["files"] += 1
+            folder["bytes"] += size
+
+            if scan.include_durations:
+                pending_probes.append(source_file_info[0])
+                if len(pending_probes) >= PROBE_BATCH_SIZE:
+                    probe_pending()
+
+            now = time.monotonic()
+            if on_progress and now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                on_progress(scan.snapshot(), input_dir)
+
+        if pending_probes and not (should_stop and should_stop()):
+            probe_pending()
+
+    scan.complete = not (should_stop and should_stop())
+    scan.finished_at = time.time()
+    if on_progress:
+        on_progress(scan.snapshot(), None)
+    return scan
+
+
+def estimate_conversion_seconds(total_bytes, bytes_per_second, parallel_jobs):
+    """Estimate the wall time of converting total_bytes of input (None without a measured speed)
+
+    bytes_per_second is the input bytes one FFmpeg job gets through per second, as measured
+    by earlier runs while they ran alongside each other.
+    """
+    if not bytes_per_second or total_bytes <= 0:
+        return None
+    return total_bytes / (bytes_per_second * max(1, parallel_jobs))
+
+
+def folder_label(input_dir):
+    return os.path.basename(os.path.normpath(input_dir)) or str(Path(input_dir))
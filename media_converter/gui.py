@@ -0,0 +1,781 @@
+"""
+Media Format Converter - GUI
+
+Tkinter front end for the converter. It is kept in its own module so command-line runs and
+library imports of audio_format_converter never have to load tkinter.
+"""
+
+import os
+import threading
+import queue
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox, scrolledtext
+
+from audio_format_converter import (
+    AUDIO_FORMATS,
+    VIDEO_FORMATS,
+    PROCESS_REGISTRY,
+    CONVERSION_SKIPPED,
+    CONVERSION_FAILED,
+    SCHEDULE_STREAM,
+    THREADS_AUTO,
+    ENGINE_ASYNC,
+    ENGINE_THREADS,
+    SCHEDULE_LONGEST_FIRST,
+    convert_directory,
+    get_ffmpeg_path,
+    get_media_duration,
+    probe_media_files,
+)
+from media_converter.folder_scan import FolderScan, estimate_conversion_seconds, folder_label, scan_folders
+from media_converter.log_buffer import (
+    DEFAULT_LOG_LINES,
+    LEVEL_ERROR,
+    LEVEL_INFO,
+    VIEW_ALL,
+    VIEW_CURRENT_JOBS,
+    VIEW_ERRORS,
+    LogBuffer,
+)
+from media_converter.processes import CAN_PAUSE
+from media_converter.progress import describe_progress, format_duration
+from media_converter.tiers import DEFAULT_TIER, PERFORMANCE_TIERS
+from media_converter.tracing import default_trace_path, measured_throughput
+
+
+# Most queued messages handled per GUI tick; the rest wait for the next tick
+MAX_MESSAGES_PER_TICK = 2000
+
+LOG_VIEW_LABELS = {
+    VIEW_ALL: "All messages",
+    VIEW_ERRORS: "Errors only",
+    VIEW_CURRENT_JOBS: "Current jobs",
+}
+
+
+class MediaConverterGUI:
+    """GUI application for media format conversion (audio and video)"""
+    
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Media Format Converter")
+        self.root.geometry("950x750")
+        self.root.minsize(950, 750)
+        
+        # Configure the main grid
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        
+        # Create main frame
+        main_frame = ttk.Frame(root, padding="10")
+        main_frame.grid(row=0, column=0, sticky="nsew")
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(6, weight=1)  # Make log area expandable
+          # Title
+        title_label = ttk.Label(main_frame, text="Media Format Converter", font=("Arial", 16, "bold"))
+        title_label.grid(row=0, column=0, columnspan=3, pady=(0, 20))
+        
+        # Format selection frame
+        format_frame = ttk.LabelFrame(main_frame, text="Format Selection", padding="10")
+        format_frame.grid(row=1, column=0, columnspan=3, sticky="ew", pady=(0, 10))
+        format_frame.columnconfigure(1, weight=1)
+        format_frame.columnconfigure(3, weight=1)
+        
+        # Media type selection
+        media_type_frame = ttk.Frame(format_frame)
+        media_type_frame.grid(row=0, column=0, columnspan=4, sticky="ew", pady=(0, 10))
+        
+        ttk.Label(media_type_frame, text="Media Type:").pack(side=tk.LEFT, padx=(0, 10))
+        self.media_type = tk.StringVar(value="audio")
+        media_type_audio = ttk.Radiobutton(media_type_frame, text="Audio", variable=self.media_type, value="audio", command=self.update_format_options)
+        media_type_audio.pack(side=tk.LEFT, padx=(0, 15))
+        media_type_video = ttk.Radiobutton(media_type_frame, text="Video", variable=self.media_type, value="video", command=self.update_format_options)
+        media_type_video.pack(side=tk.LEFT)
+        
+        # Source format
+        ttk.Label(format_frame, text="Source Format:").grid(row=1, column=0, sticky="w", padx=(0, 10))
+        self.source_format = tk.StringVar(value="mp3")
+        self.source_combo = ttk.Combobox(format_frame, textvariable=self.source_format, width=12)
+        self.source_combo.grid(row=1, column=1, sticky="ew", padx=5)
+        
+        # Target format
+        ttk.Label(format_frame, text="Target Format:").grid(row=1, column=2, sticky="w", padx=(20, 10))
+        self.target_format = tk.StringVar(value="wav")
+        self.target_combo = ttk.Combobox(format_frame, textvariable=self.target_format, width=12)
+        self.target_combo.grid(row=1, column=3, sticky="ew", padx=5)
+        
+        # Initialize format options
+        self.update_format_options()
+        
+        # Directory selection frame
+        dir_frame = ttk.LabelFrame(main_frame, text="Directory Selection", padding="10")
+        dir_frame.grid(row=2, column=0, columnspan=3, sticky="ew", pady=(0, 10))
+        dir_frame.columnconfigure(1, weight=1)
+        
+        # Input directories section
+        input_label = ttk.Label(dir_frame, text="Input Directories:")
+        input_label.grid(row=0, column=0, sticky="nw", padx=(0, 10), pady=5)
+        
+        # Frame for input directories list and buttons
+        input_dirs_frame = ttk.Frame(dir_frame)
+        input_dirs_frame.grid(row=0, column=1, sticky="ew", padx=(0, 10), pady=5)
+        input_dirs_frame.columnconfigure(0, weight=1)
+        
+        # Listbox for input directories with scrollbar
+        list_frame = ttk.Frame(input_dirs_frame)
+        list_frame.grid(row=0, column=0, sticky="ew", pady=(0, 5))
+        list_frame.columnconfigure(0, weight=1)
+        
+        self.input_dirs_listbox = tk.Listbox(list_frame, height=4, selectmode=tk.SINGLE)
+        self.input_dirs_listbox.grid(row=0, column=0, sticky="ew")
+        
+        input_scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.input_dirs_listbox.yview)
+        input_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.input_dirs_listbox.configure(yscrollcommand=input_scrollbar.set)
+        
+        # Buttons for managing input directories
+        input_buttons_frame = ttk.Frame(input_dirs_frame)
+        input_buttons_frame.grid(row=1, column=0, sticky="ew")
+        
+        ttk.Button(input_buttons_frame, text="Add Folder", command=self.add_input_directory).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(input_buttons_frame, text="Remove Selected", command=self.remove_input_directory).pack(side=tk.LEFT, padx=5)
+        ttk.Button(input_buttons_frame, text="Clear All", command=self.clear_input_directories).pack(side=tk.LEFT, padx=5)
+        
+        # Check Folder button (runs in the background; pressing it again cancels the scan)
+        check_frame = ttk.Frame(dir_frame)
+        check_frame.grid(row=0, column=2, pady=5, padx=(5, 0), sticky="n")
+        self.check_button = ttk.Button(check_frame, text="Check Folders", command=self.check_folders)
+        self.check_button.pack(fill=tk.X)
+        
+        # Also total the media durations (from the media info cache, probing files it does not know)
+        self.scan_durations = tk.BooleanVar(value=False)
+        ttk.Checkbutton(check_frame, text="With durations", variable=self.scan_durations).pack(anchor="w", pady=(5, 0))
+        
+        # Output directory
+        ttk.Label(dir_frame, text="Output Directory:").grid(row=1, column=0, sticky="w", padx=(0, 10), pady=5)
+        self.output_dir = tk.StringVar()
+        output_entry = ttk.Entry(dir_frame, textvariable=self.output_dir)
+        output_entry.grid(row=1, column=1, sticky="ew", padx=(0, 10), pady=5)
+        ttk.Button(dir_frame, text="Browse", command=self.browse_output).grid(row=1, column=2, pady=5)
+        
+        # Options frame
+        options_frame = ttk.LabelFrame(main_frame, text="Options", padding="10")
+        options_frame.grid(row=3, column=0, columnspan=3, sticky="ew", pady=(0, 10))
+        options_frame.columnconfigure(5, weight=1)
+        
+        # Thread count
+        ttk.Label(options_frame, text="Conversion Threads:").grid(row=0, column=0, sticky="w", padx=(0, 10))
+        self.thread_count = tk.IntVar(value=os.cpu_count() or 4)
+        thread_spin = ttk.Spinbox(options_frame, from_=1, to=256, textvariable=self.thread_count, width=5)
+        thread_spin.grid(row=0, column=1, sticky="w", padx=5)
+        
+        # Adaptive concurrency (splits cores between jobs and FFmpeg threads, watches load and memory)
+        self.adaptive_threads = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Auto", variable=self.adaptive_threads,
+                        command=lambda: thread_spin.config(state="disabled" if self.adaptive_threads.get() else "normal")
+                        ).grid(row=0, column=2, sticky="w", padx=(5, 0))
+        
+        # Skip files that are unchanged since the last conversion
+        self.skip_unchanged = tk.BooleanVar(value=True)
+        ttk.Checkbutton(options_frame, text="Skip unchanged files", variable=self.skip_unchanged).grid(row=0, column=3, sticky="w", padx=(20, 0))
+        
+        # Start the longest jobs first (probes all files before converting)
+        self.longest_first = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Longest jobs first", variable=self.longest_first).grid(row=0, column=4, sticky="w", padx=(20, 0))
+        
+        # Encoder speed/quality trade-off
+        ttk.Label(options_frame, text="Speed/Quality:").grid(row=1, column=0, sticky="w", padx=(0, 10), pady=(5, 0))
+        self.tier = tk.StringVar(value=DEFAULT_TIER)
+        ttk.Combobox(options_frame, textvariable=self.tier, values=PERFORMANCE_TIERS, width=10, state="readonly"
+                     ).grid(row=1, column=1, columnspan=2, sticky="w", padx=5, pady=(5, 0))
+        
+        # Copy streams that already fit the target container instead of re-encoding them
+        self.remux = tk.BooleanVar(value=True)
+        ttk.Checkbutton(options_frame, text="Remux when possible", variable=self.remux).grid(row=1, column=3, sticky="w", padx=(20, 0), pady=(5, 0))
+        
+        # Run conversions from an asyncio event loop (many short files in flight)
+        self.async_engine = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Async engine", variable=self.async_engine).grid(row=1, column=4, sticky="w", padx=(20, 0), pady=(5, 0))
+        
+        # Control buttons frame
+        control_frame = ttk.Frame(main_frame)
+        control_frame.grid(row=4, column=0, columnspan=3, sticky="ew", pady=(0, 10))
+        control_frame.columnconfigure(0, weight=1)
+        control_frame.columnconfigure(1, weight=1)
+        control_frame.columnconfigure(2, weight=1)
+        
+        # Convert button
+        self.convert_button = ttk.Button(control_frame, text="Convert", width=15, command=self.start_conversion)
+        self.convert_button.grid(row=0, column=0, padx=5, sticky="e")
+        
+        # Stop button (initially disabled)
+        self.stop_button = ttk.Button(control_frame, text="Stop", width=15, command=self.stop_conversion, state="disabled")
+        self.stop_button.grid(row=0, column=1, padx=5)
+        
+        # Pause button (SIGSTOP/SIGCONT of the running FFmpeg processes; not available on Windows)
+        self.pause_button = ttk.Button(control_frame, text="Pause", width=15, command=self.toggle_pause, state="disabled")
+        self.pause_button.grid(row=0, column=2, padx=5, sticky="w")
+        self.paused = False
+        
+        # Progress bar
+        self.progress_var = tk.DoubleVar(value=0)
+        self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, maximum=100)
+        self.progress_bar.grid(row=5, column=0, columnspan=3, sticky="ew", pady=(0, 10))
+        
+        # Log area with scrollbar
+        log_frame = ttk.LabelFrame(main_frame, text="Conversion Log", padding="10")
+        log_frame.grid(row=6, column=0, columnspan=3, sticky="nsew", pady=(0, 10))
+        log_frame.columnconfigure(0, weight=1)
+        log_frame.rowconfigure(1, weight=1)
+        
+        # Log view options: what to show and how many lines to keep
+        log_options_frame = ttk.Frame(log_frame)
+        log_options_frame.grid(row=0, column=0, sticky="ew", pady=(0, 5))
+        
+        ttk.Label(log_options_frame, text="Show:").pack(side=tk.LEFT)
+        self.log_view = tk.StringVar(value=LOG_VIEW_LABELS[VIEW_ALL])
+        log_view_combo = ttk.Combobox(log_options_frame, textvariable=self.log_view, width=14, state="readonly",
+                                      values=list(LOG_VIEW_LABELS.values()))
+        log_view_combo.pack(side=tk.LEFT, padx=(5, 15))
+        log_view_combo.bind("<<ComboboxSelected>>", lambda event: self.render_log())
+        
+        ttk.Label(log_options_frame, text="Keep last").pack(side=tk.LEFT)
+        self.log_lines = tk.StringVar(value=str(DEFAULT_LOG_LINES))
+        log_lines_spinbox = ttk.Spinbox(log_options_frame, from_=100, to=1000000, increment=1000, width=8,
+                                        textvariable=self.log_lines, command=self.update_log_lines)
+        log_lines_spinbox.pack(side=tk.LEFT, padx=5)
+        log_lines_spinbox.bind("<Return>", lambda event: self.update_log_lines())
+        log_lines_spinbox.bind("<FocusOut>", lambda event: self.update_log_lines())
+        ttk.Label(log_options_frame, text="lines").pack(side=tk.LEFT)
+        
+        self.log_dropped_var = tk.StringVar(value="")
+        ttk.Label(log_options_frame, textvariable=self.log_dropped_var).pack(side=tk.RIGHT)
+        
+        self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, height=10)
+        self.log_text.grid(row=1, column=0, sticky="nsew")
+        self.log_buffer = LogBuffer(DEFAULT_LOG_LINES)
+        
+        # Status bar
+        self.status_var = tk.StringVar(value="Ready")
+        status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
+        status_bar.grid(row=7, column=0, columnspan=3, sticky="ew")
+        
+        # Initialize other variables
+        self.conversion_thread = None
+        self.conversion_running = False
+        self.message_queue = queue.Queue()
+        self.input_directories = []  # List to store multiple input directories
+        self.scan_thread = None
+        self.scan_stop = threading.Event()
+        self.scan_result = None  # Last finished Check Folders scan, reused by the next conversion
+        
+        # Set default directories
+        default_music_dir = os.path.join(os.path.expanduser("~"), "Music")
+        if os.path.exists(default_music_dir):
+            self.input_directories.append(default_music_dir)
+            self.input_dirs_listbox.insert(tk.END, default_music_dir)
+            self.output_dir.set(default_music_dir)
+          # Log welcome message
+        self.log("Welcome to Media Format Converter")
+        self.log(f"Using FFmpeg at: {get_ffmpeg_path() or 'Not found'}")
+        self.root.after(100, self.check_queue)
+
+    def update_format_options(self):
+        """Update format options based on selected media type"""
+        media_type = self.media_type.get()
+        
+        if media_type == "audio":
+            formats = AUDIO_FORMATS
+            # Set default audio formats
+            if self.source_format.get() not in formats:
+                self.source_format.set("mp3")
+            if self.target_format.get() not in formats:
+                self.target_format.set("wav")
+        else:  # video
+            formats = VIDEO_FORMATS
+            # Set default video formats (highlighting MPEG to MP4)
+            if self.source_format.get() not in formats:
+                self.source_format.set("mpeg")
+            if self.target_format.get() not in formats:
+                self.target_format.set("mp4")
+        
+        # Update combobox values
+        self.source_combo['values'] = formats
+        self.target_combo['values'] = formats
+
+    def log(self, message, level=LEVEL_INFO):
+        """Add a message to the log area"""
+        self.log_buffer.append(message, level)
+        self.show_log_lines([(level, message)])
+
+    def selected_log_view(self):
+        for view, label in LOG_VIEW_LABELS.items():
+            if self.log_view.get() == label:
+                return view
+        return VIEW_ALL
+
+    def show_log_lines(self, lines):
+        """Append new (level, text) lines to the log area in one insert, keeping it within the cap"""
+        view = self.selected_log_view()
+        if view == VIEW_CURRENT_JOBS:
+            return
+        texts = self.log_buffer.view_lines(view, lines)[-self.log_buffer.max_lines:]
+        if not texts:
+            return
+        
+        # Only follow the end of the log if the user has not scrolled up to read it
+        follow = self.log_text.yview()[1] >= 0.999
+        self.log_text.insert(tk.END, "\n".join(texts) + "\n")
+        excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - self.log_buffer.max_lines
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+        if follow:
+            self.log_text.see(tk.END)
+        self.update_log_dropped()
+
+    def render_log(self):
+        """Redraw the log area from the log buffer for the selected view"""
+        view = self.selected_log_view()
+        texts = self.log_buffer.view_lines(view)
+        if view == VIEW_CURRENT_JOBS and not texts:
+            texts = ["No conversions running."]
+        self.log_text.delete("1.0", tk.END)
+        if texts:
+            self.log_text.insert(tk.END, "\n".join(texts) + "\n")
+        self.log_text.see(tk.END)
+        self.update_log_dropped()
+
+    def update_log_lines(self):
+        """Apply a new log line cap from the spinbox"""
+        try:
+            max_lines = int(self.log_lines.get())
+        except ValueError:
+            self.log_lines.set(str(self.log_buffer.max_lines))
+            return
+        if max_lines != self.log_buffer.max_lines:
+            self.log_buffer.set_max_lines(max_lines)
+            self.render_log()
+
+    def update_log_dropped(self):
+        dropped = self.log_buffer.dropped
+        self.log_dropped_var.set(f"{dropped} older lines dropped" if dropped else "")
+
+    def add_input_directory(self):
+        """Add a new input directory to the list"""
+        directory = filedialog.askdirectory(
+            title="Select Input Directory",
+            initialdir=os.path.expanduser("~")
+        )
+        if directory and directory not in self.input_directories:
+            self.input_directories.append(directory)
+            self.input_dirs_listbox.insert(tk.END, directory)
+            self.log(f"Added input directory: {directory}")
+
+    def remove_input_directory(self):
+        """Remove the selected input directory from the list"""
+        selection = self.input_dirs_listbox.curselection()
+        if selection:
+            index = selection[0]
+            directory = self.input_directories[index]
+            self.input_directories.pop(index)
+            self.input_dirs_listbox.delete(index)
+            self.log(f"Removed input directory: {directory}")
+
+    def clear_input_directories(self):
+        """Clear all input directories"""
+        self.input_directories.clear()
+        self.input_dirs_listbox.delete(0, tk.END)
+        self.log("Cleared all input directories")
+
+    def browse_output(self):
+        """Open dialog to select output directory"""
+        directory = filedialog.askdirectory(
+            title="Select Output Directory",
+            initialdir=self.output_dir.get() or os.path.expanduser("~")
+        )
+        if directory:
+            self.output_dir.set(directory)
+
+    def start_conversion(self):
+        """Start the conversion process in a separate thread"""
+        # Validate inputs
+        if not self.input_directories:
+            messagebox.showerror("Error", "Please add at least one input directory.")
+            return
+            
+        output_dir_str = self.output_dir.get().strip()
+        source_format = self.source_format.get()
+        target_format = self.target_format.get()
+        
+        if not output_dir_str:
+            messagebox.showerror("Error", "Please select an output directory.")
+            return
+            
+        # Validate input directories exist
+        valid_dirs = []
+        for input_dir in self.input_directories:
+            if os.path.isdir(input_dir):
+                valid_dirs.append(input_dir)
+            else:
+                self.log(f"Warning: Input directory does not exist: {input_dir}", LEVEL_ERROR)
+        
+        if not valid_dirs:
+            messagebox.showerror("Error", "No valid input directories found.")
+            return
+        
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir_str, exist_ok=True)
+        
+        # Reuse the file list of a recent Check Folders scan instead of walking the folders again
+        if self.scan_thread is not None:
+            self.scan_stop.set()
+        scan = self.scan_result
+        if scan is None or not scan.matches(self.input_directories, source_format):
+            scan = None
+        
+        # Disable conversion button and enable stop button
+        self.convert_button.config(state="disabled")
+        self.stop_button.config(state="normal")
+        self.pause_button.config(state="normal" if CAN_PAUSE else "disabled", text="Pause")
+        self.status_var.set("Converting...")
+        self.progress_var.set(0)
+        self.conversion_running = True
+        self.paused = False
+        PROCESS_REGISTRY.reset()
+        
+        # Log start of conversion
+        self.log(f"Starting conversion from {source_format.upper()} to {target_format.upper()}")
+        self.log(f"Input directories: {len(valid_dirs)} folders")
+        for i, dir_path in enumerate(valid_dirs, 1):
+            self.log(f"  {i}. {dir_path}")
+        self.log(f"Output directory: {output_dir_str}")
+        
+        # Start conversion thread
+        thread_count = THREADS_AUTO if self.adaptive_threads.get() else self.thread_count.get()
+        force = not self.skip_unchanged.get()
+        schedule = SCHEDULE_LONGEST_FIRST if self.longest_first.get() else SCHEDULE_STREAM
+        remux = self.remux.get()
+        engine = ENGINE_ASYNC if self.async_engine.get() else ENGINE_THREADS
+        self.conversion_thread = threading.Thread(
+            target=self.conversion_worker,
+            args=(valid_dirs, output_dir_str, source_format, target_format, thread_count, force, schedule, remux, engine,
+                  scan, self.tier.get())
+        )
+        self.conversion_thread.daemon = True
+        self.conversion_thread.start()
+
+    def stop_conversion(self):
+        """Stop the conversion process"""
+        if self.conversion_running:
+            self.conversion_running = False
+            self.status_var.set("Stopping conversion...")
+            stopped = PROCESS_REGISTRY.cancel()
+            self.log(f"Stopping conversion: stopped {stopped} running FFmpeg processes and removing their partial outputs...")
+            self.pause_button.config(state="disabled", text="Pause")
+    
+    def toggle_pause(self):
+        """Pause or resume the running FFmpeg processes"""
+        if not self.conversion_running:
+            return
+        if self.paused:
+            PROCESS_REGISTRY.resume()
+            self.paused = False
+            self.pause_button.config(text="Pause")
+            self.status_var.set("Converting...")
+            self.log("Conversion resumed.")
+        elif PROCESS_REGISTRY.pause():
+            self.paused = True
+            self.pause_button.config(text="Resume")
+            self.status_var.set("Paused")
+            self.log("Conversion paused; FFmpeg processes are suspended until you resume.")
+
+    def check_queue(self):
+        """Process messages from the conversion thread
+        
+        Messages are handled in batches: the new log lines of a tick are inserted at once and
+        only the latest progress message is shown, however many arrived since the last tick.
+        """
+        new_lines = []
+        progress = None
+        scan_progress = None
+        jobs_changed = False
+        final_message = None
+        try:
+            for _ in range(MAX_MESSAGES_PER_TICK):
+                message = self.message_queue.get_nowait()
+                self.message_queue.task_done()
+                
+                if message[0] == "log":
+                    level = message[2] if len(message) > 2 else LEVEL_INFO
+                    self.log_buffer.append(message[1], level)
+                    new_lines.append((level, message[1]))
+                elif message[0] == "job_started":
+                    self.log_buffer.job_started(message[1], message[2])
+                    jobs_changed = True
+                elif message[0] == "job_finished":
+                    self.log_buffer.job_finished(message[1])
+                    jobs_changed = True
+                elif message[0] == "progress":
+                    progress = message
+                elif message[0] == "scan_progress":
+                    scan_progress = message
+                elif message[0] in ("complete", "error", "scan_finished"):
+                    # Show the log up to here before the dialog; later messages wait for the next tick
+                    final_message = message
+                    break
+        except queue.Empty:
+            pass
+        
+        if self.selected_log_view() == VIEW_CURRENT_JOBS:
+            if jobs_changed:
+                self.render_log()
+        elif new_lines:
+            self.show_log_lines(new_lines)
+        if progress:
+            self.show_progress(*progress[1:])
+        if scan_progress:
+            self.show_scan_progress(*scan_progress[1:])
+        
+        if final_message and final_message[0] == "complete":
+            self.conversion_complete(final_message[1], final_message[2])
+        elif final_message and final_message[0] == "scan_finished":
+            self.scan_finished(*final_message[1:])
+        elif final_message:
+            self.conversion_error(final_message[1])
+        
+        # Schedule next check
+        self.root.after(100, self.check_queue)
+
+    def show_progress(self, progress_value, total, scanning=False, media_progress=None):
+        """Update the progress bar and status line"""
+        if scanning:
+            # The total is still growing, so only show counts
+            self.status_var.set(f"Converting: {progress_value} files done, {total} found so far (scanning...)")
+        elif media_progress and media_progress["total_seconds"] > 0:
+            # Media time processed gives a much steadier bar and ETA than file counts
+            self.progress_var.set(min(100.0, media_progress["percent"]))
+            self.status_var.set(f"Converting: {progress_value}/{total} files, {describe_progress(media_progress)}")
+        elif total > 0:
+            self.progress_var.set((progress_value / total) * 100)
+            self.status_var.set(f"Converting: {progress_value}/{total} files ({progress_value/total:.1%})")
+
+    def conversion_worker(self, input_dirs, output_dir_str, source_format, target_format, max_workers, force=False,
+                          schedule=SCHEDULE_STREAM, remux=True, engine=ENGINE_THREADS, scan=None, tier=DEFAULT_TIER):
+        """Worker thread for conversion process (scan: a FolderScan whose file list is used instead of walking input_dirs)"""
+        try:
+            if scan is not None:
+                self.message_queue.put(("log", f"Using the {len(scan.files)} {source_format.upper()} files found by Check Folders."))
+            
+            def log(message):
+                self.message_queue.put(("log", message))
+            
+            def log_error(message):
+                self.message_queue.put(("log", message, LEVEL_ERROR))
+            
+            def report_progress(done_files, total_found, finished_discovery, media_progress_snapshot):
+                self.message_queue.put(("progress", done_files, total_found, not finished_discovery, media_progress_snapshot))
+            
+            def report_file(source_file_info, result, details):
+                file_name = source_file_info[0].name
+                if result == CONVERSION_SKIPPED:
+                    log(f"↷ Up to date, skipped: {file_name}")
+                elif result != CONVERSION_FAILED and details.get("cache_hit"):
+                    log(f"♻ From the conversion cache: {file_name}")
+                elif result != CONVERSION_FAILED and details.get("stream_copy"):
+                    log(f"⚡ Remuxed (stream copy of {', '.join(details['stream_copy'])}): {file_name}")
+                elif result != CONVERSION_FAILED:
+                    log(f"✓ Successfully converted: {file_name}")
+                elif PROCESS_REGISTRY.is_cancelled():
+                    log(f"⏹ Cancelled: {file_name}")
+                else:
+                    log_error(f"✗ Failed to convert: {file_name}")
+            
+            # Same driver as the command line, with a per-job trace kept in the cache directory
+            converted_files, total_files = convert_directory(
+                input_dirs,
+                output_dir_str,
+                source_format,
+                target_format,
+                max_workers,
+                force=force,
+                schedule=schedule,
+                remux=remux,
+                trace_path=default_trace_path("gui"),
+                engine=engine,
+                tier=tier,
+                files=scan.fresh_files() if scan is not None else None,
+                should_stop=lambda: not self.conversion_running,
+                log=log,
+                log_error=log_error,
+                on_progress=report_progress,
+                on_file=report_file,
+                on_job_started=lambda source_file_info: self.message_queue.put(
+                    ("job_started", source_file_info, str(source_file_info[0]))),
+                on_job_finished=lambda source_file_info: self.message_queue.put(("job_finished", source_file_info))
+            )
+            
+            if total_files and not self.conversion_running:
+                log("Conversion process was stopped by user.")
+            self.message_queue.put(("complete", converted_files, total_files))
+                
+        except Exception as e:
+            self.message_queue.put(("error", str(e)))
+
+    def conversion_complete(self, converted_count, total_files):
+        """Handle completion of conversion process"""
+        self.conversion_running = False
+        self.convert_button.config(state="normal")
+        self.stop_button.config(state="disabled")
+        self.pause_button.config(state="disabled", text="Pause")
+        
+        if converted_count > 0:
+            success_rate = (converted_count / total_files) * 100 if total_files > 0 else 0
+            self.status_var.set(f"Conversion completed: {converted_count}/{total_files} files ({success_rate:.1f}%)")
+            self.log(f"Conversion completed: {converted_count} out of {total_files} files converted successfully.")
+            
+            # Show completion message
+            if converted_count == total_files:
+                messagebox.showinfo("Conversion Complete", f"All {converted_count} files were converted successfully!")
+            else:
+                messagebox.showwarning("Conversion Complete", f"{converted_count} out of {total_files} files were converted successfully.")
+        else:
+            self.status_var.set("Conversion completed with no files converted.")
+            self.log("No files were converted.")
+            
+            if total_files > 0:
+                messagebox.showwarning("Conversion Failed", "No files were converted. Check the log for details.")
+
+    def conversion_error(self, error_message):
+        """Handle conversion error"""
+        self.conversion_running = False
+        self.convert_button.config(state="normal")
+        self.stop_button.config(state="disabled")
+        self.pause_button.config(state="disabled", text="Pause")
+        PROCESS_REGISTRY.resume()
+        self.status_var.set("Conversion error")
+        self.log(f"Error during conversion: {error_message}", LEVEL_ERROR)
+        messagebox.showerror("Conversion Error", f"An error occurred during conversion: {error_message}")
+
+    def check_folders(self):
+        """Count the files of the selected format in all input directories, in the background
+        
+        Pressing the button again while the scan runs cancels it.
+        """
+        if self.scan_thread is not None:
+            self.scan_stop.set()
+            self.status_var.set("Cancelling folder scan...")
+            return
+        
+        if not self.input_directories:
+            messagebox.showerror("Error", "Please add at least one input directory.")
+            return
+        
+        source_format = self.source_format.get()
+        scan = FolderScan(self.input_directories, source_format, include_durations=self.scan_durations.get())
+        
+        self.scan_stop = threading.Event()
+        self.check_button.config(text="Cancel Scan")
+        self.status_var.set(f"Scanning for {source_format.upper()} files...")
+        self.scan_thread = threading.Thread(target=self.scan_worker, args=(scan, self.scan_stop), daemon=True)
+        self.scan_thread.start()
+
+    def scan_worker(self, scan, stop_event):
+        """Worker thread for Check Folders"""
+        def get_durations(paths):
+            return {path: get_media_duration(path, info) for path, info in probe_media_files(paths).items()}
+        
+        try:
+            scan_folders(
+                scan,
+                should_stop=stop_event.is_set,
+                on_progress=lambda snapshot, folder: self.message_queue.put(("scan_progress", snapshot, folder)),
+                get_durations=get_durations
+            )
+            self.message_queue.put(("scan_finished", scan, None))
+        except Exception as e:
+            self.message_queue.put(("scan_finished", scan, str(e)))
+
+    def show_scan_progress(self, snapshot, folder):
+        """Show the running totals of the folder scan in the status bar"""
+        status = f"Scanning: {snapshot['files']} files ({self.format_size(snapshot['bytes'])})"
+        if snapshot["files_with_duration"]:
+            status += f", {format_duration(snapshot['duration_seconds'])} of media"
+        if folder:
+            status += f" - {folder_label(folder)}"
+        self.status_var.set(status + "...")
+
+    def scan_finished(self, scan, error=None):
+        """Report the results of a folder scan"""
+        self.scan_thread = None
+        self.check_button.config(text="Check Folders")
+        source_format = scan.source_format
+        total_files = len(scan.files)
+        total_size_str = self.format_size(scan.total_bytes)
+        
+        if error:
+            self.log(f"Error checking folders: {error}", LEVEL_ERROR)
+            messagebox.showerror("Error", f"An error occurred while scanning the folders: {error}")
+            self.status_var.set("Ready")
+            return
+        if not scan.complete:
+            self.log(f"Folder scan cancelled after {total_files} {source_format.upper()} files ({total_size_str}).")
+            self.status_var.set("Ready - folder scan cancelled")
+            return
+        
+        self.scan_result = scan
+        folder_summaries = []
+        for input_dir, folder in scan.folders.items():
+            if folder["found"]:
+                folder_summaries.append(f"{folder_label(input_dir)}: {folder['files']} files ({self.format_size(folder['bytes'])})")
+            else:
+                folder_summaries.append(f"{folder_label(input_dir)}: Directory not found")
+        
+        # Totals, plus what the media durations and the speed of earlier runs say about the work
+        details = []
+        duration = scan.estimated_duration()
+        if duration is not None:
+            estimated = " (estimated)" if scan.files_with_duration < total_files else ""
+            details.append(f"Total duration: {format_duration(duration)}{estimated}")
+        parallel_jobs = (os.cpu_count() or 4) if self.adaptive_threads.get() else self.thread_count.get()
+        conversion_seconds = estimate_conversion_seconds(
+            scan.total_bytes, measured_throughput(source_format, self.target_format.get(), tier=self.tier.get()), parallel_jobs)
+        if conversion_seconds is not None:
+            details.append(f"Estimated conversion time: {format_duration(conversion_seconds)} "
+                           f"with {parallel_jobs} threads (from earlier runs)")
+        
+        # Log the results
+        self.log(f"Scan Results for {source_format.upper()} files:")
+        for summary in folder_summaries:
+            self.log(f"  {summary}")
+        self.log(f"Total: {total_files} files ({total_size_str})")
+        for detail in details:
+            self.log(detail)
+        
+        # Create detailed message for dialog
+        dialog_message = f"Found {total_files} {source_format.upper()} files across {len(scan.input_dirs)} directories.\n"
+        dialog_message += f"Total size: {total_size_str}\n"
+        for detail in details:
+            dialog_message += f"{detail}\n"
+        dialog_message += "\nBreakdown by directory:\n"
+        for summary in folder_summaries:
+            dialog_message += f"• {summary}\n"
+        
+        if total_files > 0:
+            dialog_message += f"\nClick 'Convert' to process these files."
+        else:
+            dialog_message += f"\nPlease check that you've selected the correct source format and directories."
+        
+        # Update status
+        self.status_var.set(f"Ready - {total_files} {source_format.upper()} files found across {len(scan.input_dirs)} directories")
+        messagebox.showinfo("Folder Analysis", dialog_message)
+
+    def format_size(self, size_bytes):
+        """Format file size in bytes to a human-readable string"""
+        if size_bytes < 1024:
+            return f"{size_bytes} bytes"
+        elif size_bytes < 1024 * 1024:
+            return f"{size_bytes / 1024:.1f} KB"
+        elif size_bytes < 1024 * 1024 * 1024:
+            return f"{size_bytes / (1024 * 1024):.1f} MB"
+        else:
+            return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
@@ -0,0 +1,64 @@
+"""
+Bounded GUI log
+
+Keeps the last lines of the conversion log in a ring buffer, so a long batch cannot make the
+log (and the Tk text widget showing it) grow without bounds, and tracks the files that are
+being converted right now. The GUI renders what this model holds: all lines, only the errors,
+or the current jobs.
+"""
+
+import collections
+
+
+# Lines kept by default; older lines are dropped
+DEFAULT_LOG_LINES = 5000
+
+LEVEL_INFO = "info"
+LEVEL_ERROR = "error"
+
+VIEW_ALL = "all"
+VIEW_ERRORS = "errors"
+VIEW_CURRENT_JOBS = "current"
+
+
+class LogBuffer:
+    """Ring buffer of (level, text) log lines plus the set of running jobs"""
+
+    def __init__(self, max_lines=DEFAULT_LOG_LINES):
+        self.lines = collections.deque(maxlen=max(1, int(max_lines)))
+        self.dropped = 0
+        self.current_jobs = {}  # job key -> label
+
+    @property
+    def max_lines(self):
+        return self.lines.maxlen
+
+    def set_max_lines(self, max_lines):
+        """Change the cap, dropping the oldest lines if there are now too many"""
+        max_lines = max(1, int(max_lines))
+        self.dropped += max(0, len(self.lines) - max_lines)
+        self.lines = collections.deque(self.lines, maxlen=max_lines)
+
+    def append(self, text, level=LEVEL_INFO):
+        if len(self.lines) == self.lines.maxlen:
+            self.dropped += 1
+        self.lines.append((level, text))
+
+    def job_started(self, key, label):
+        self.current_jobs[key] = label
+
+    def job_finished(self, key):
+        self.current_jobs.pop(key, None)
+
+    def clear(self):
+        self.lines.clear()
+        self.dropped = 0
+
+    def view_lines(self, view, lines=None):
+        """Return the text of the lines shown in a view (of lines, or of the whole buffer)"""
+        if view == VIEW_CURRENT_JOBS:
+            return [f"Converting: {label}" for label in self.current_jobs.values()]
+        lines = self.lines if lines is None else lines
+        if view == VIEW_ERRORS:
+            return [text for level, text in lines if level == LEVEL_ERROR]
+        return [text for _, text in lines]
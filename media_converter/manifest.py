@@ -0,0 +1,123 @@
+"""
+Conversion manifest
+
+Records which source files have already been converted into an output tree, together with the
+FFmpeg settings that produced them, so repeated runs only re-encode files that actually changed.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+MANIFEST_FILENAME = ".conversion_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def source_signature(source_path):
+    """Return the (size, mtime_ns) pair used to detect changes in a source file"""
+    stat_result = os.stat(source_path)
+    return stat_result.st_size, stat_result.st_mtime_ns
+
+
+class ConversionManifest:
+    """Persistent record of converted files for one output directory"""
+
+    def __init__(self, output_dir, autosave_interval=30.0):
+        self.output_dir = os.path.abspath(str(output_dir))
+        self.path = os.path.join(self.output_dir, MANIFEST_FILENAME)
+        self.autosave_interval = autosave_interval
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # Serializes writes so an older snapshot never replaces a newer one
+        self.dirty = False
+        self.last_save = time.monotonic()
+        self.load()
+
+    def _key(self, output_path):
+        """Entries are keyed by the output path relative to the manifest directory"""
+        return os.path.relpath(os.path.abspath(str(output_path)), self.output_dir).replace(os.sep, "/")
+
+    def load(self):
+        """Load the manifest from disk, starting empty if it is missing or unreadable"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.entries = data.get("entries", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """Write the manifest atomically so an interrupted run never leaves a corrupt file"""
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                data = {"version": MANIFEST_VERSION, "entries": dict(self.entries)}
+                self.dirty = False
+                self.last_save = time.monotonic()
+
+            os.makedirs(self.output_dir, exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                print(f"Warning: Could not write conversion manifest {self.path}: {e}")
+                with self.lock:
+                    self.dirty = True
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def is_up_to_date(self, source_path, output_path, settings):
+        """Check whether output_path was produced from the current source with the same settings"""
+        with self.lock:
+            entry = self.entries.get(self._key(output_path))
+        if not entry or not os.path.isfile(output_path):
+            return False
+
+        try:
+            size, mtime_ns = source_signature(source_path)
+        except OSError:
+            return False
+
+        return (entry.get("source") == os.path.abspath(str(source_path))
+                and entry.get("size") == size
+                and entry.get("mtime_ns") == mtime_ns
+                and entry.get("settings") == list(settings))
+
+    def record(self, source_path, output_path, settings, signature=None):
+        """Remember that output_path is now up to date with source_path
+
+        Pass the signature taken before the conversion started so that a source modified while
+        it was being converted is picked up again on the next run.
+        """
+        try:
+            size, mtime_ns = signature or source_signature(source_path)
+        except OSError:
+            return
+
+        with self.lock:
+            self.entries[self._key(output_path)] = {
+                "source": os.path.abspath(str(source_path)),
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "settings": list(settings),
+            }
+            self.dirty = True
+            autosave = time.monotonic() - self.last_save >= self.autosave_interval
+
+        # Save periodically so progress survives an interrupted run
+        if autosave:
+            self.save()
+
+    def forget(self, output_path):
+        """Drop the entry for output_path (e.g. after a failed conversion)"""
+        with self.lock:
+            if self.entries.pop(self._key(output_path), None) is not None:
+                self.dirty = True
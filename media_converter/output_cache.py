@@ -0,0 +1,230 @@
+"""
+Conversion output cache
+
+A content-addressed store of finished conversions that several output trees, users or
+processes can share. Entries are keyed by a hash of the source file's content and of the exact
+FFmpeg arguments (with the input and output paths left out, and the FFmpeg version added), so
+the same material converted with the same settings is only encoded once. On a hit the output is
+materialized from the cache with a reflink or copy. Objects are never hardlinked to outputs:
+tagging or editing an output in place would otherwise change the cached object with it.
+
+Objects are plain files under objects/ and an SQLite index (WAL mode) tracks their size and
+last use, so concurrent processes can share the directory. The cache is capped in bytes and
+evicts the least recently used entries; hit/miss counters are kept per process and in total.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from media_converter.dedup import full_hash, link_or_copy
+
+
+CACHE_INDEX_FILENAME = "index.sqlite3"
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+# Placeholders for the paths in a command, which must not be part of the key
+INPUT_PLACEHOLDER = "<input>"
+OUTPUT_PLACEHOLDER = "<output{}>"
+
+
+def parse_size(value):
+    """Parse a size such as "500M", "20G" or a plain number of bytes"""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+    text = str(value).strip().upper().rstrip("B")
+    multiplier = 1
+    if text and text[-1] in units:
+        multiplier = units[text[-1]]
+        text = text[:-1]
+    size = int(float(text) * multiplier)
+    if size <= 0:
+        raise ValueError(f"size must be positive: {value!r}")
+    return size
+
+
+def command_fingerprint(cmd, source_path, temp_output_paths, ffmpeg_version=None, extra=None):
+    """Return the key material of an FFmpeg command without its machine-specific paths"""
+    outputs = {path: OUTPUT_PLACEHOLDER.format(index) for index, path in enumerate(temp_output_paths)}
+    arguments = []
+    for argument in cmd[1:]:
+        if argument == source_path:
+            arguments.append(INPUT_PLACEHOLDER)
+        else:
+            arguments.append(outputs.get(argument, argument))
+    return {"ffmpeg": ffmpeg_version, "args": arguments, "extra": extra}
+
+
+class ConversionCache:
+    """Size-capped, content-addressed cache of conversion outputs shared between processes"""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.objects_dir = os.path.join(self.directory, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self.connection = sqlite3.connect(os.path.join(self.directory, CACHE_INDEX_FILENAME), timeout=60,
+                                          check_same_thread=False)
+        with self.lock:
+            try:
+                self.connection.execute("PRAGMA journal_mode=WAL")
+                self.connection.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.DatabaseError:
+                pass
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            # Content hashes of source files, so unchanged sources are not re-read every run
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS source_hashes ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " hash TEXT NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            self.connection.commit()
+
+    def source_hash(self, source_path):
+        """Return the content hash of a source file (cached by path, size and mtime)"""
+        abs_path = os.path.abspath(str(source_path))
+        stat_result = os.stat(abs_path)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT hash FROM source_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (abs_path, stat_result.st_size, stat_result.st_mtime_ns)
+            ).fetchone()
+        if row:
+            return row[0]
+
+        digest = full_hash(abs_path)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO source_hashes (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)",
+                (abs_path, stat_result.st_size, stat_result.st_mtime_ns, digest)
+            )
+            self.connection.commit()
+        return digest
+
+    def make_key(self, source_path, fingerprint):
+        """Return the cache key for a source and a command fingerprint"""
+        material = json.dumps([self.source_hash(source_path), fingerprint], sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _object_path(self, key, index):
+        return os.path.join(self.objects_dir, key[:2], f"{key}-{index}")
+
+    def _count(self, name, amount=1):
+        """Add to a persistent counter (lock must be held)"""
+        self.connection.execute(
+            "INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?",
+            (name, amount, amount)
+        )
+
+    def fetch(self, key, target_paths):
+        """Materialize the cached outputs of key at target_paths; returns False on a miss"""
+        entry_keys = [f"{key}-{index}" for index in range(len(target_paths))]
+        with self.lock:
+            placeholders = ",".join("?" * len(entry_keys))
+            found = self.connection.execute(
+                f"SELECT COUNT(*) FROM entries WHERE key IN ({placeholders})", entry_keys
+            ).fetchone()[0]
+
+        hit = found == len(entry_keys)
+        if hit:
+            try:
+                for index, target_path in enumerate(target_paths):
+                    link_or_copy(self._object_path(key, index), target_path, hardlink=False)
+            except OSError:
+                # Evicted by another process in the meantime
+                hit = False
+
+        with self.lock:
+            if hit:
+                self.hits += 1
+                self._count("hits")
+                self.connection.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                            [(time.time(), entry_key) for entry_key in entry_keys])
+            else:
+                self.misses += 1
+                self._count("misses")
+            self.connection.commit()
+        return hit
+
+    def store(self, key, output_paths):
+        """Add finished outputs to the cache under key and evict old entries if over the cap"""
+        entries = []
+        for index, output_path in enumerate(output_paths):
+            object_path = self._object_path(key, index)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            link_or_copy(output_path, object_path, hardlink=False)
+            entries.append((f"{key}-{index}", os.path.getsize(object_path), time.time()))
+
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO entries (key, size, last_used) VALUES (?, ?, ?)", entries
+            )
+            self.stores += 1
+            self._count("stores")
+            self.connection.commit()
+            self._evict()
+
+    def _evict(self):
+        """Delete the least recently used entries down to 90% of the cap (lock must be held)"""
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for entry_key, size in self.connection.execute(
+                "SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if total <= target:
+                break
+            key, _, index = entry_key.rpartition("-")
+            try:
+                os.remove(self._object_path(key, index))
+            except OSError:
+                pass
+            self.connection.execute("DELETE FROM entries WHERE key = ?", (entry_key,))
+            total -= size
+            evicted += 1
+        self.evictions += evicted
+        self._count("evictions", evicted)
+        self.connection.commit()
+
+    def stats(self):
+        """Return this process's counters and the cache's totals"""
+        with self.lock:
+            entries, size = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            totals = dict(self.connection.execute("SELECT name, value FROM stats").fetchall())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
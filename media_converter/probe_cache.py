@@ -0,0 +1,192 @@
+"""
+Media information cache
+
+Stores ffprobe results in a single SQLite file keyed by path, size and modification time, so
+large libraries only have to be probed once. The cache is bounded and evicts the least recently
+used entries when it grows past its limit.
+"""
+
+import concurrent.futures
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from media_converter.cache_paths import user_cache_dir
+
+
+PROBE_CACHE_FILENAME = "media_info.sqlite3"
+DEFAULT_MAX_ENTRIES = 500000
+
+# SQLite limits the number of host parameters per statement
+LOOKUP_CHUNK_SIZE = 500
+
+
+class MediaInfoCache:
+    """SQLite-backed cache of ffprobe results"""
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path or os.path.join(user_cache_dir(), PROBE_CACHE_FILENAME)
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.inserts_since_prune = 0
+
+        self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self.lock:
+            # WAL lets several converter processes share the cache without blocking readers
+            try:
+                self.connection.execute("PRAGMA journal_mode=WAL")
+                self.connection.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.DatabaseError:
+                pass
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS media_info ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " info TEXT NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS media_info_last_used ON media_info (last_used)")
+            self.connection.commit()
+
+    @staticmethod
+    def _file_key(file_path):
+        """Return (absolute path, size, mtime_ns) for a file, or None if it cannot be read"""
+        abs_path = os.path.abspath(str(file_path))
+        try:
+            stat_result = os.stat(abs_path)
+        except OSError:
+            return None
+        return abs_path, stat_result.st_size, stat_result.st_mtime_ns
+
+    def lookup_many(self, file_paths):
+        """Return a dict of cached info for the given files, skipping missing or stale entries"""
+        keys = {}
+        for file_path in file_paths:
+            key = self._file_key(file_path)
+            if key:
+                keys[key[0]] = (file_path, key[1], key[2])
+
+        found = {}
+        abs_paths = list(keys)
+        now = time.time()
+        with self.lock:
+            for start in range(0, len(abs_paths), LOOKUP_CHUNK_SIZE):
+                chunk = abs_paths[start:start + LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.connection.execute(
+                    f"SELECT path, size, mtime_ns, info FROM media_info WHERE path IN ({placeholders})", chunk
+                ).fetchall()
+                for abs_path, size, mtime_ns, info in rows:
+                    file_path, current_size, current_mtime_ns = keys[abs_path]
+                    if size == current_size and mtime_ns == current_mtime_ns:
+                        found[file_path] = json.loads(info)
+
+            if found:
+                self.connection.executemany(
+                    "UPDATE media_info SET last_used = ? WHERE path = ?",
+                    [(now, os.path.abspath(str(file_path))) for file_path in found]
+                )
+                self.connection.commit()
+
+            self.hits += len(found)
+            self.misses += len(file_paths) - len(found)
+
+        return found
+
+    def lookup(self, file_path):
+        """Return cached info for a single file, or None"""
+        return self.lookup_many([file_path]).get(file_path)
+
+    def store_many(self, items):
+        """Store (file_path, info) pairs, then evict old entries if the cache is over its limit"""
+        rows = []
+        now = time.time()
+        for file_path, info in items:
+            key = self._file_key(file_path)
+            if key and info is not None:
+                rows.append((key[0], key[1], key[2], json.dumps(info, separators=(",", ":")), now))
+
+        if not rows:
+            return
+
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO media_info (path, size, mtime_ns, info, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self.connection.commit()
+            self.inserts_since_prune += len(rows)
+            if self.inserts_since_prune >= max(1, self.max_entries // 100):
+                self._prune()
+
+    def store(self, file_path, info):
+        """Store info for a single file"""
+        self.store_many([(file_path, info)])
+
+    def _prune(self):
+        """Evict the least recently used entries down to 90% of the limit (lock must be held)"""
+        self.inserts_since_prune = 0
+        count = self.connection.execute("SELECT COUNT(*) FROM media_info").fetchone()[0]
+        if count <= self.max_entries:
+            return
+
+        excess = count - int(self.max_entries * 0.9)
+        self.connection.execute(
+            "DELETE FROM media_info WHERE path IN (SELECT path FROM media_info ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        self.connection.commit()
+
+    def get(self, file_path, probe_func):
+        """Return info for a file, probing it with probe_func and caching the result on a miss"""
+        info = self.lookup(file_path)
+        if info is None:
+            info = probe_func(str(file_path))
+            if info is not None:
+                self.store(file_path, info)
+        return info
+
+    def get_many(self, file_paths, probe_func, max_workers=None):
+        """Return a dict of info for many files, probing missing entries with a bounded worker pool
+
+        Files that could not be probed are left out of the result.
+        """
+        file_paths = list(file_paths)
+        results = self.lookup_many(file_paths)
+        missing = [file_path for file_path in file_paths if file_path not in results]
+        if not missing:
+            return results
+
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 4) * 2)
+
+        probed = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(probe_func, str(file_path)): file_path for file_path in missing}
+            for future in concurrent.futures.as_completed(futures):
+                file_path = futures[future]
+                try:
+                    info = future.result()
+                except Exception:
+                    info = None
+                if info is not None:
+                    results[file_path] = info
+                    probed.append((file_path, info))
+
+                # Write in batches so an interrupted bulk probe keeps most of its work
+                if len(probed) >= 200:
+                    self.store_many(probed)
+                    probed = []
+
+        self.store_many(probed)
+        return results
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,188 @@
+"""
+Running-process registry
+
+Keeps track of the FFmpeg processes the converter has started, so they can be stopped right
+away instead of encoding to the end: cancelling terminates them and kills whatever is still
+alive after a grace period. Processes can also be paused and resumed (SIGSTOP/SIGCONT, not
+available on Windows), and a high-priority job can pre-empt lower-priority ones, which stay
+paused until it is done.
+
+Processes are grouped by an optional job key (any hashable value, e.g. a service job id);
+cancelling or pausing without a key applies to everything.
+"""
+
+import contextlib
+import signal
+import threading
+
+
+# Seconds a terminated process gets to exit before it is killed
+CANCEL_GRACE_SECONDS = 5.0
+
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+
+CAN_PAUSE = hasattr(signal, "SIGSTOP")
+
+
+class ProcessRegistry:
+    """Thread-safe registry of live child processes (subprocess.Popen or asyncio processes)"""
+
+    def __init__(self, grace_seconds=CANCEL_GRACE_SECONDS):
+        self.grace_seconds = grace_seconds
+        self.lock = threading.Lock()
+        self.processes = {}  # process -> {"job", "stopped"}
+        self.priorities = {}
+        self.cancelled_jobs = set()
+        self.paused_jobs = set()
+        self.cancelled_all = False
+        self.paused_all = False
+        self.preemptions = []  # priorities of the running pre-empting jobs
+
+    # Registration
+
+    def register(self, process, job=None):
+        """Track a newly started process; it is stopped at once if its job was already cancelled"""
+        with self.lock:
+            self.processes[process] = {"job": job, "stopped": False}
+            cancelled = self.cancelled_all or job in self.cancelled_jobs
+            if not cancelled:
+                self._apply(process)
+        if cancelled:
+            self._terminate([process])
+
+    def unregister(self, process):
+        with self.lock:
+            self.processes.pop(process, None)
+
+    def set_priority(self, job, priority):
+        """Set the priority of a job's processes (PRIORITY_NORMAL unless set)"""
+        with self.lock:
+            self.priorities[job] = priority
+            self._apply_all()
+
+    def forget(self, job):
+        """Drop what is remembered about a finished job"""
+        with self.lock:
+            self.priorities.pop(job, None)
+            self.cancelled_jobs.discard(job)
+            self.paused_jobs.discard(job)
+
+    # Cancelling
+
+    def is_cancelled(self, job=None):
+        """Whether everything, or the given job, has been cancelled"""
+        with self.lock:
+            return self.cancelled_all or (job is not None and job in self.cancelled_jobs)
+
+    def cancel(self, job=None):
+        """Stop the processes of a job (or all of them) and refuse to start new ones
+
+        Returns the number of processes signalled. They are terminated now and killed if they
+        are still running after the grace period; this call does not wait for either.
+        """
+        with self.lock:
+            if job is None:
+                self.cancelled_all = True
+            else:
+                self.cancelled_jobs.add(job)
+            targets = [process for process, entry in self.processes.items() if job is None or entry["job"] == job]
+        self._terminate(targets)
+        return len(targets)
+
+    def reset(self):
+        """Allow new processes again after cancel() or pause() of everything"""
+        with self.lock:
+            self.cancelled_all = False
+            self.cancelled_jobs.clear()
+            self.paused_all = False
+            self.paused_jobs.clear()
+            self._apply_all()
+
+    def _terminate(self, processes):
+        for process in processes:
+            _send(process, "terminate")
+            # A stopped process only acts on SIGTERM once it runs again
+            if CAN_PAUSE:
+                _send(process, "send_signal", signal.SIGCONT)
+
+        if processes:
+            timer = threading.Timer(self.grace_seconds, self._kill_survivors, args=(processes,))
+            timer.daemon = True
+            timer.start()
+
+    def _kill_survivors(self, processes):
+        for process in processes:
+            if process.returncode is None:
+                _send(process, "kill")
+
+    # Pausing and pre-emption
+
+    def pause(self, job=None):
+        """Pause the processes of a job (or all); returns False where pausing is not supported"""
+        if not CAN_PAUSE:
+            return False
+        with self.lock:
+            if job is None:
+                self.paused_all = True
+            else:
+                self.paused_jobs.add(job)
+            self._apply_all()
+        return True
+
+    def resume(self, job=None):
+        with self.lock:
+            if job is None:
+                self.paused_all = False
+            else:
+                self.paused_jobs.discard(job)
+            self._apply_all()
+
+    @contextlib.contextmanager
+    def preempt(self, priority):
+        """Keep processes of lower priority paused while the with block runs"""
+        with self.lock:
+            self.preemptions.append(priority)
+            self._apply_all()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.preemptions.remove(priority)
+                self._apply_all()
+
+    def _should_stop(self, entry):
+        if self.paused_all or entry["job"] in self.paused_jobs:
+            return True
+        priority = self.priorities.get(entry["job"], PRIORITY_NORMAL)
+        return any(preempting > priority for preempting in self.preemptions)
+
+    def _apply(self, process):
+        """Send SIGSTOP or SIGCONT if a process is not in the state it should be (lock held)"""
+        if not CAN_PAUSE:
+            return
+        entry = self.processes[process]
+        stop = self._should_stop(entry)
+        if stop != entry["stopped"]:
+            _send(process, "send_signal", signal.SIGSTOP if stop else signal.SIGCONT)
+            entry["stopped"] = stop
+
+    def _apply_all(self):
+        for process in self.processes:
+            self._apply(process)
+
+    def counts(self):
+        """Return (running, paused) process counts"""
+        with self.lock:
+            paused = sum(1 for entry in self.processes.values() if entry["stopped"])
+            return len(self.processes) - paused, paused
+
+
+def _send(process, method, *args):
+    """Signal a process, ignoring processes that have already exited"""
+    if process.returncode is not None:
+        return
+    try:
+        getattr(process, method)(*args)
+    except (OSError, ProcessLookupError):
+        pass
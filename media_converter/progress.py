@@ -0,0 +1,154 @@
+"""
+Conversion progress
+
+Parses FFmpeg's machine-readable `-progress` output and aggregates it over a batch, so progress
+can be reported in media seconds processed rather than finished files, with a real ETA, the
+encode speed of each running job (× realtime) and the aggregate throughput of the batch.
+"""
+
+import threading
+import time
+
+
+def parse_speed(value):
+    """Parse an FFmpeg speed value such as "1.53x"; returns None for "N/A" or garbage"""
+    try:
+        return float(value.strip().rstrip("x"))
+    except (AttributeError, ValueError):
+        return None
+
+
+class ProgressParser:
+    """Incremental parser for FFmpeg's `-progress` output
+
+    FFmpeg writes key=value lines and ends each block with "progress=continue" (or
+    "progress=end" for the last one); callback(seconds_done, speed) is called for every block.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.seconds_done = 0.0
+        self.speed = None
+
+    def feed(self, raw_line):
+        """Process one line of output (bytes)"""
+        key, _, value = raw_line.decode("utf-8", errors="replace").strip().partition("=")
+        if key in ("out_time_us", "out_time_ms"):
+            # Despite its name, out_time_ms is also in microseconds
+            try:
+                self.seconds_done = max(0.0, int(value) / 1000000.0)
+            except ValueError:
+                pass
+        elif key == "speed":
+            self.speed = parse_speed(value)
+        elif key == "progress":
+            self.callback(self.seconds_done, self.speed)
+
+
+def read_progress(stream, callback):
+    """Read a blocking FFmpeg `-progress` stream until EOF, calling callback(seconds_done, speed)"""
+    parser = ProgressParser(callback)
+    for raw_line in iter(stream.readline, b""):
+        parser.feed(raw_line)
+
+
+def format_duration(seconds):
+    """Format seconds as H:MM:SS"""
+    if seconds is None:
+        return "--:--:--"
+    seconds = int(max(0, seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class BatchProgress:
+    """Thread-safe media-time progress of a batch of conversions
+
+    Jobs are counted when discovered and their duration (from ffprobe) is added to the total
+    when they start. Until every job has been probed, the total is extrapolated from the average
+    duration of the jobs probed so far. Jobs of unknown duration are left out of the totals.
+    on_update, if given, is called (from the worker threads) at most every min_interval seconds
+    while jobs report progress.
+    """
+
+    def __init__(self, on_update=None, min_interval=0.5):
+        self.lock = threading.Lock()
+        self.on_update = on_update
+        self.min_interval = min_interval
+        self.last_update = 0.0
+        self.start_time = time.monotonic()
+        self.known_total = 0.0
+        self.probed_jobs = 0
+        self.unprobed_jobs = 0
+        self.completed_seconds = 0.0
+        self.active = {}  # job id -> [seconds done, total seconds, speed]
+
+    def job_discovered(self):
+        with self.lock:
+            self.unprobed_jobs += 1
+
+    def job_skipped(self):
+        """A discovered job needs no conversion (e.g. it is already up to date)"""
+        with self.lock:
+            self.unprobed_jobs = max(0, self.unprobed_jobs - 1)
+
+    def job_started(self, job_id, total_seconds):
+        with self.lock:
+            self.unprobed_jobs = max(0, self.unprobed_jobs - 1)
+            if total_seconds:
+                self.known_total += total_seconds
+                self.probed_jobs += 1
+            self.active[job_id] = [0.0, total_seconds, None]
+
+    def job_progress(self, job_id, seconds_done, speed):
+        with self.lock:
+            job = self.active.get(job_id)
+            if job is not None:
+                job[0] = min(seconds_done, job[1]) if job[1] else seconds_done
+                job[2] = speed
+            now = time.monotonic()
+            notify = now - self.last_update >= self.min_interval
+            if notify:
+                self.last_update = now
+        if notify and self.on_update:
+            self.on_update()
+
+    def job_finished(self, job_id):
+        with self.lock:
+            job = self.active.pop(job_id, None)
+            if job is not None and job[1]:
+                self.completed_seconds += job[1]
+
+    def snapshot(self):
+        """Return a dict with processed/total media seconds, percent, ETA, throughput and job speeds"""
+        with self.lock:
+            processed = self.completed_seconds + sum(job[0] for job in self.active.values() if job[1])
+            average = self.known_total / self.probed_jobs if self.probed_jobs else 0.0
+            total = self.known_total + self.unprobed_jobs * average
+            speeds = [job[2] for job in self.active.values() if job[2] is not None]
+
+        elapsed = time.monotonic() - self.start_time
+        throughput = processed / elapsed if elapsed > 0 else 0.0
+        eta = (total - processed) / throughput if throughput > 0 and total >= processed else None
+        return {
+            "processed_seconds": processed,
+            "total_seconds": total,
+            "percent": (processed / total * 100) if total else 0.0,
+            "eta_seconds": eta,
+            "throughput": throughput,
+            "job_speeds": speeds,
+            "elapsed_seconds": elapsed,
+        }
+
+
+def describe_progress(snapshot):
+    """Format a progress snapshot as a short status line"""
+    parts = [
+        f"{format_duration(snapshot['processed_seconds'])}/{format_duration(snapshot['total_seconds'])} media",
+        f"ETA {format_duration(snapshot['eta_seconds'])}",
+        f"{snapshot['throughput']:.1f}x total",
+    ]
+    speeds = snapshot["job_speeds"]
+    if speeds:
+        shown = " ".join(f"{speed:.1f}x" for speed in speeds[:4])
+        parts.append(f"jobs {shown}" + (f" +{len(speeds) - 4}" if len(speeds) > 4 else ""))
+    return ", ".join(parts)
@@ -0,0 +1,105 @@
+"""
+Stream-copy remuxing
+
+Decides which streams of a source file can be copied into the target container unchanged
+(`-c copy`) instead of being re-encoded. Rewrapping an H.264/AAC transport stream into MP4
+takes seconds, where re-encoding it takes minutes.
+"""
+
+import os
+
+
+PCM_CODECS = {"pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_u8"}
+
+# Codecs (as reported by ffprobe's codec_name) that each target container accepts as-is.
+# Audio-only targets list only the codec the format is normally expected to contain, so e.g.
+# FLAC is never copied into an .ogg file when the user asked for Ogg Vorbis.
+COPY_COMPATIBLE_CODECS = {
+    # Video containers
+    "mp4": {"video": {"h264", "hevc", "mpeg4", "av1"}, "audio": {"aac", "mp3", "ac3", "eac3", "alac"}},
+    "mov": {"video": {"h264", "hevc", "mpeg4", "prores", "mjpeg"}, "audio": {"aac", "mp3", "alac", "pcm_s16le", "pcm_s24le"}},
+    "mkv": {"video": {"h264", "hevc", "vp8", "vp9", "av1", "mpeg2video", "mpeg4"},
+            "audio": {"aac", "mp3", "ac3", "eac3", "opus", "vorbis", "flac", "dts", "truehd"}},
+    "webm": {"video": {"vp8", "vp9", "av1"}, "audio": {"opus", "vorbis"}},
+    "avi": {"video": {"mpeg4", "h264", "mjpeg"}, "audio": {"mp3", "ac3", "pcm_s16le"}},
+    "flv": {"video": {"h264", "flv1"}, "audio": {"aac", "mp3"}},
+    "ts": {"video": {"h264", "hevc", "mpeg2video"}, "audio": {"aac", "mp3", "mp2", "ac3", "eac3"}},
+    "mts": {"video": {"h264", "hevc", "mpeg2video"}, "audio": {"aac", "mp3", "mp2", "ac3", "eac3"}},
+    "m2ts": {"video": {"h264", "hevc", "mpeg2video"}, "audio": {"aac", "mp3", "mp2", "ac3", "eac3"}},
+    "mpeg": {"video": {"mpeg1video", "mpeg2video"}, "audio": {"mp2", "mp3", "ac3"}},
+    "mpg": {"video": {"mpeg1video", "mpeg2video"}, "audio": {"mp2", "mp3", "ac3"}},
+    "wmv": {"video": {"wmv1", "wmv2", "wmv3", "vc1"}, "audio": {"wmav1", "wmav2"}},
+    # Audio containers
+    "mp3": {"audio": {"mp3"}},
+    "m4a": {"audio": {"aac", "alac"}},
+    "aac": {"audio": {"aac"}},
+    "flac": {"audio": {"flac"}},
+    "ogg": {"audio": {"vorbis", "opus"}},
+    "wav": {"audio": PCM_CODECS},
+    "wma": {"audio": {"wmav1", "wmav2"}},
+}
+
+# Codecs a source container can hold, so sources that cannot possibly be copied are not probed.
+# Containers not listed here (MP4, MKV, MOV, TS, ...) can carry too many codecs to rule anything out.
+SOURCE_CONTAINER_CODECS = {
+    "mp3": {"audio": {"mp3"}},
+    "wav": {"audio": PCM_CODECS},
+    "flac": {"audio": {"flac"}},
+    "ogg": {"audio": {"vorbis", "opus", "flac"}},
+    "opus": {"audio": {"opus"}},
+    "m4a": {"audio": {"aac", "alac"}},
+    "aac": {"audio": {"aac"}},
+    "wma": {"audio": {"wmav1", "wmav2"}},
+    "webm": {"video": {"vp8", "vp9", "av1"}, "audio": {"opus", "vorbis"}},
+    "flv": {"video": {"h264", "flv1"}, "audio": {"aac", "mp3"}},
+    "wmv": {"video": {"wmv1", "wmv2", "wmv3", "vc1"}, "audio": {"wmav1", "wmav2"}},
+}
+
+
+def supports_stream_copy(target_format):
+    """Check whether stream copy is ever possible for a target format"""
+    return target_format.lower() in COPY_COMPATIBLE_CODECS
+
+
+def may_stream_copy(source_path, target_format, media_type):
+    """Check, from its extension alone, whether any stream of a source could be copied into target_format
+
+    Used to skip probing sources whose container cannot hold a codec the target accepts,
+    such as MP3 or WAV files converted to any other audio format.
+    """
+    compatible = COPY_COMPATIBLE_CODECS.get(target_format.lower())
+    if not compatible:
+        return False
+    carried = SOURCE_CONTAINER_CODECS.get(os.path.splitext(str(source_path))[1].lstrip(".").lower())
+    if carried is None:
+        return True
+    stream_types = ["video", "audio"] if media_type == "video" else ["audio"]
+    return any(carried.get(stream_type, set()) & compatible.get(stream_type, set()) for stream_type in stream_types)
+
+
+def plan_stream_copy(media_info, target_format, media_type):
+    """Return the set of stream types ("video", "audio") that can be copied into target_format
+
+    A stream type is copyable only if every stream of that type in the source uses a codec the
+    target accepts. Cover art (attached pictures) is ignored. For audio conversions only the
+    audio streams are considered. Returns an empty set when nothing can be copied.
+    """
+    compatible = COPY_COMPATIBLE_CODECS.get(target_format.lower())
+    if not compatible or not media_info:
+        return set()
+
+    stream_types = ["video", "audio"] if media_type == "video" else ["audio"]
+    codecs = {stream_type: [] for stream_type in stream_types}
+    for stream in media_info.get("streams", []):
+        stream_type = stream.get("codec_type")
+        if stream_type not in codecs:
+            continue
+        if stream.get("disposition", {}).get("attached_pic"):
+            continue
+        codecs[stream_type].append(stream.get("codec_name"))
+
+    copyable = set()
+    for stream_type, stream_codecs in codecs.items():
+        if stream_codecs and all(codec in compatible.get(stream_type, ()) for codec in stream_codecs):
+            copyable.add(stream_type)
+    return copyable
@@ -0,0 +1,114 @@
+"""
+Job scheduling
+
+Orders conversion jobs by estimated cost so the longest jobs start first (LPT scheduling).
+When jobs are started in arbitrary order, a long video that happens to come last runs alone
+while every other worker sits idle; starting it first keeps all workers busy until the end.
+"""
+
+import heapq
+
+
+# Reference frame size used to normalise video costs (1080p counts as 1.0)
+REFERENCE_PIXELS = 1920 * 1080
+
+
+def media_cost(media_info):
+    """Estimate the cost of converting a file from its ffprobe information
+
+    The cost is the duration in seconds, scaled by the frame size relative to 1080p for video.
+    Returns None if the duration is unknown.
+    """
+    if not media_info:
+        return None
+
+    duration = None
+    try:
+        duration = float(media_info["format"]["duration"])
+    except (KeyError, TypeError, ValueError):
+        for stream in media_info.get("streams", []):
+            try:
+                duration = max(duration or 0.0, float(stream["duration"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    if not duration or duration <= 0:
+        return None
+
+    # Video cost grows with the number of pixels per frame
+    scale = 1.0
+    for stream in media_info.get("streams", []):
+        if stream.get("codec_type") == "video" and stream.get("width") and stream.get("height"):
+            scale = max(scale, (stream["width"] * stream["height"]) / REFERENCE_PIXELS)
+
+    return duration * scale
+
+
+def estimate_costs(file_sizes, media_infos):
+    """Estimate a cost for every job
+
+    file_sizes maps each job key to its size in bytes and media_infos maps keys to ffprobe
+    information (missing keys allowed). Jobs without a usable duration fall back to their file
+    size, converted to cost units with the median cost-per-byte of the jobs that were probed.
+    """
+    costs = {}
+    ratios = []
+    for key, size in file_sizes.items():
+        cost = media_cost(media_infos.get(key))
+        if cost is not None:
+            costs[key] = cost
+            if size:
+                ratios.append(cost / size)
+
+    ratios.sort()
+    cost_per_byte = ratios[len(ratios) // 2] if ratios else 1.0
+    for key, size in file_sizes.items():
+        if key not in costs:
+            costs[key] = (size or 0) * cost_per_byte
+
+    return costs
+
+
+def simulate_makespan(costs, workers):
+    """Return the finish time of a greedy list schedule of costs on identical workers"""
+    workers = max(1, workers)
+    finish_times = [0.0] * min(workers, max(1, len(costs)))
+    heapq.heapify(finish_times)
+    for cost in costs:
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + cost)
+    return max(finish_times)
+
+
+def order_longest_first(jobs, costs):
+    """Return jobs sorted by decreasing cost (stable for equal costs)"""
+    return sorted(jobs, key=lambda job: -costs[job])
+
+
+def makespan_report(naive_costs, chosen_costs, workers):
+    """Compare the predicted makespan of the naive order against the chosen order
+
+    Returns a dict with both makespans, the lower bound and the relative improvement.
+    """
+    naive = simulate_makespan(naive_costs, workers)
+    chosen = simulate_makespan(chosen_costs, workers)
+    total = sum(chosen_costs)
+    lower_bound = max(total / max(1, workers), max(chosen_costs, default=0.0))
+    return {
+        "workers": workers,
+        "jobs": len(chosen_costs),
+        "naive_makespan": naive,
+        "chosen_makespan": chosen,
+        "lower_bound": lower_bound,
+        "improvement": (naive - chosen) / naive if naive else 0.0,
+    }
+
+
+def format_makespan_report(report):
+    """Format a makespan report as human-readable lines (costs are in media seconds at 1080p)"""
+    return [
+        f"Scheduling {report['jobs']} jobs longest-first on {report['workers']} workers:",
+        f"  Naive order makespan:   {report['naive_makespan']:.0f} cost units",
+        f"  Longest-first makespan: {report['chosen_makespan']:.0f} cost units "
+        f"({report['improvement']:.1%} shorter)",
+        f"  Lower bound:            {report['lower_bound']:.0f} cost units",
+    ]
@@ -0,0 +1,100 @@
+"""
+Segment-parallel encoding
+
+Encodes one long video on several cores at once: the video stream is split at keyframes into
+segments (stream copy, so the split is lossless), the segments are encoded concurrently, and
+the encoded segments are joined with the concat demuxer. The audio is encoded in a single pass
+from the original file during the final mux, so it stays continuous across segment boundaries.
+"""
+
+import concurrent.futures
+import os
+import shutil
+import tempfile
+
+
+# Segment length in seconds; segments end on the first keyframe after this point
+DEFAULT_SEGMENT_SECONDS = 120
+
+# Only files at least this long (seconds) are split by default
+DEFAULT_SEGMENT_THRESHOLD = 900
+
+
+def _concat_list_line(path):
+    """Return a concat demuxer 'file' line, escaping single quotes"""
+    return "file '" + path.replace("\\", "/").replace("'", "'\\''") + "'\n"
+
+
+def encode_segmented(run_ffmpeg, ffmpeg_path, source_path, output_path, video_options, audio_options,
+                     segment_seconds=DEFAULT_SEGMENT_SECONDS, workers=2, threads_per_segment=None):
+    """Encode source_path into output_path using concurrently encoded segments
+
+    run_ffmpeg(cmd) must run an FFmpeg command and return (returncode, error_text).
+    video_options/audio_options are the codec options for the target (audio_options may be
+    ["-c:a", "copy"]). Returns (success, error_text, segment_count).
+    """
+    base = [ffmpeg_path, "-hide_banner", "-loglevel", "error"]
+    work_dir = tempfile.mkdtemp(prefix=".segments-", dir=os.path.dirname(os.path.abspath(output_path)))
+
+    try:
+        # 1. Split the first video stream at keyframes without re-encoding
+        split_pattern = os.path.join(work_dir, "source_%05d.mkv")
+        returncode, error = run_ffmpeg(base + [
+            "-i", source_path,
+            "-map", "0:v:0", "-an", "-sn", "-dn",
+            "-c", "copy",
+            "-f", "segment",
+            "-segment_time", str(segment_seconds),
+            "-segment_format", "matroska",
+            "-reset_timestamps", "1",
+            split_pattern,
+        ])
+        if returncode != 0:
+            return False, f"splitting failed: {error}", 0
+
+        source_segments = sorted(
+            os.path.join(work_dir, name) for name in os.listdir(work_dir) if name.startswith("source_")
+        )
+        if not source_segments:
+            return False, "splitting produced no segments", 0
+
+        # 2. Encode the segments concurrently
+        def encode_segment(segment_path):
+            encoded_path = segment_path.replace("source_", "encoded_")
+            cmd = base + ["-i", segment_path, "-map", "0:v:0"] + list(video_options)
+            if threads_per_segment:
+                cmd.extend(["-threads", str(threads_per_segment)])
+            cmd.extend(["-an", "-y", encoded_path])
+            returncode, error = run_ffmpeg(cmd)
+            # The source segment is no longer needed, free the disk space early
+            try:
+                os.remove(segment_path)
+            except OSError:
+                pass
+            return encoded_path, returncode, error
+
+        encoded_segments = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for encoded_path, returncode, error in executor.map(encode_segment, source_segments):
+                if returncode != 0:
+                    return False, f"encoding {os.path.basename(encoded_path)} failed: {error}", len(source_segments)
+                encoded_segments.append(encoded_path)
+
+        # 3. Join the encoded video losslessly and encode the audio once from the original
+        concat_list = os.path.join(work_dir, "segments.txt")
+        with open(concat_list, "w", encoding="utf-8") as f:
+            for encoded_path in encoded_segments:
+                f.write(_concat_list_line(encoded_path))
+
+        returncode, error = run_ffmpeg(base + [
+            "-f", "concat", "-safe", "0", "-i", concat_list,
+            "-i", source_path,
+            "-map", "0:v:0", "-map", "1:a:0?",
+            "-c:v", "copy",
+        ] + list(audio_options) + ["-y", output_path])
+        if returncode != 0:
+            return False, f"joining segments failed: {error}", len(encoded_segments)
+
+        return True, "", len(encoded_segments)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
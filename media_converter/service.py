@@ -0,0 +1,621 @@
+"""
+Conversion service
+
+Runs the converter as a long-lived local service so other programs can request conversions
+over HTTP instead of each starting its own CLI run. Jobs are kept in an SQLite queue on disk,
+so they survive restarts (jobs that were running when the service stopped are queued again),
+and are executed by one worker pool sized for the machine.
+
+API (JSON in and out, localhost by default):
+
+    POST   /jobs              submit one job, a list of jobs ({"jobs": [...]}) or a folder batch
+    GET    /jobs              list jobs, optionally ?state=queued&batch=3&limit=100
+    GET    /jobs/<id>         status of a job, with its progress while it runs
+    DELETE /jobs/<id>         cancel a job (also POST /jobs/<id>/cancel); running FFmpeg is stopped
+    GET    /status            queue counts and pool size
+
+A job is {"source_path", "output_path", "target_format"} with optional "source_format",
+"remux", "force", "tier" (fast, balanced or archival) and "priority". Jobs with a priority
+above 0 run first, on a worker of their own if the pool is busy, and pause lower-priority
+FFmpeg processes until they are done. A folder batch is {"input_dirs", "output_dir",
+"source_format", "target_format"} and uses the same output layout and manifests as the CLI.
+
+Any web page the user visits can send requests to localhost, so POST bodies must be sent as
+`Content-Type: application/json` (which browsers cannot send cross-site without a CORS
+preflight the service never answers), requests with an Origin other than the service itself
+are refused, and with a token every request must carry `Authorization: Bearer <token>`.
+"""
+
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from audio_format_converter import (
+    AUDIO_FORMATS,
+    PROCESS_REGISTRY,
+    THREADS_AUTO,
+    VIDEO_FORMATS,
+    convert_media_file,
+    get_media_duration,
+    get_media_type,
+    get_output_file_path,
+    get_output_format_dir,
+    record_conversion_results,
+    remove_file_quietly,
+    setup_concurrency,
+    stale_conversion_targets,
+)
+from media_converter.cache_paths import user_cache_dir
+from media_converter.discovery import iter_source_files
+from media_converter.manifest import ConversionManifest, source_signature
+from media_converter.processes import PRIORITY_NORMAL
+from media_converter.tiers import DEFAULT_TIER, PERFORMANCE_TIERS
+
+
+JOB_QUEUE_FILENAME = "jobs.sqlite3"
+DEFAULT_SERVICE_PORT = 47301
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_SKIPPED = "skipped"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+JOB_STATES = [JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_SKIPPED, JOB_FAILED, JOB_CANCELLED]
+
+JOB_COLUMNS = ["id", "batch_id", "state", "source_path", "output_path", "source_format", "target_format",
+               "media_type", "manifest_dir", "force", "remux", "cancel_requested", "created", "started",
+               "finished", "error", "details", "priority", "tier"]
+
+DEFAULT_LIST_LIMIT = 1000
+
+LOOPBACK_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+class ServiceError(Exception):
+    """A request the service cannot accept; carries the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class JobQueue:
+    """Durable SQLite queue of conversion jobs"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(user_cache_dir(), JOB_QUEUE_FILENAME)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self.lock:
+            try:
+                self.connection.execute("PRAGMA journal_mode=WAL")
+                # Submitted jobs must survive a power cut, not just a crash
+                self.connection.execute("PRAGMA synchronous=FULL")
+            except sqlite3.DatabaseError:
+                pass
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " batch_id INTEGER,"
+                " state TEXT NOT NULL,"
+                " source_path TEXT NOT NULL,"
+                " output_path TEXT NOT NULL,"
+                " source_format TEXT,"
+                " target_format TEXT NOT NULL,"
+                " media_type TEXT NOT NULL,"
+                " manifest_dir TEXT,"
+                " force INTEGER NOT NULL DEFAULT 0,"
+                " remux INTEGER NOT NULL DEFAULT 1,"
+                " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+                " created REAL NOT NULL,"
+                " started REAL,"
+                " finished REAL,"
+                " error TEXT,"
+                " details TEXT)"
+            )
+            # Queues created before priorities and tiers existed lack their columns
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(jobs)")]
+            if "priority" not in columns:
+                self.connection.execute("ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+            if "tier" not in columns:
+                self.connection.execute(f"ALTER TABLE jobs ADD COLUMN tier TEXT NOT NULL DEFAULT '{DEFAULT_TIER}'")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id)")
+            self.connection.commit()
+
+    @staticmethod
+    def _row(row):
+        job = dict(zip(JOB_COLUMNS, row))
+        job["force"] = bool(job["force"])
+        job["remux"] = bool(job["remux"])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        job["details"] = json.loads(job["details"]) if job["details"] else None
+        return job
+
+    def requeue_interrupted(self):
+        """Queue the jobs that were running when the service last stopped; returns their number"""
+        with self.lock:
+            cursor = self.connection.execute("UPDATE jobs SET state = ?, started = NULL WHERE state = ?",
+                                             (JOB_QUEUED, JOB_RUNNING))
+            self.connection.commit()
+            return cursor.rowcount
+
+    def add(self, jobs):
+        """Add a list of job dicts as one batch; returns (batch id, job ids)"""
+        now = time.time()
+        ids = []
+        with self.lock:
+            for job in jobs:
+                cursor = self.connection.execute(
+                    "INSERT INTO jobs (state, source_path, output_path, source_format, target_format, media_type,"
+                    " manifest_dir, force, remux, created, priority, tier) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (JOB_QUEUED, job["source_path"], job["output_path"], job.get("source_format"),
+                     job["target_format"], job["media_type"], job.get("manifest_dir"), int(job.get("force", False)),
+                     int(job.get("remux", True)), now, job.get("priority", PRIORITY_NORMAL), job.get("tier", DEFAULT_TIER))
+                )
+                ids.append(cursor.lastrowid)
+            # A batch is named after its first job
+            batch_id = ids[0] if ids else None
+            if ids:
+                self.connection.execute("UPDATE jobs SET batch_id = ? WHERE id BETWEEN ? AND ?",
+                                        (batch_id, ids[0], ids[-1]))
+            self.connection.commit()
+        return batch_id, ids
+
+    def claim(self, min_priority=None):
+        """Mark the next queued job as running and return it (None if there is none)
+
+        Jobs are taken by priority, then in submission order; with min_priority only jobs of
+        at least that priority are considered.
+        """
+        condition, parameters = "state = ?", [JOB_QUEUED]
+        if min_priority is not None:
+            condition += " AND priority >= ?"
+            parameters.append(min_priority)
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE {condition} ORDER BY priority DESC, id LIMIT 1",
+                parameters
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE jobs SET state = ?, started = ? WHERE id = ?",
+                                    (JOB_RUNNING, time.time(), row[0]))
+            self.connection.commit()
+        job = self._row(row)
+        job["state"] = JOB_RUNNING
+        return job
+
+    def finish(self, job_id, state, error=None, details=None):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE jobs SET state = ?, finished = ?, error = ?, details = ? WHERE id = ?",
+                (state, time.time(), error, json.dumps(details, default=str) if details else None, job_id)
+            )
+            self.connection.commit()
+
+    def release(self, job_id):
+        """Put a running job back in the queue (e.g. when the service shuts down)"""
+        with self.lock:
+            self.connection.execute("UPDATE jobs SET state = ?, started = NULL WHERE id = ?", (JOB_QUEUED, job_id))
+            self.connection.commit()
+
+    def cancel(self, job_id):
+        """Cancel a job; returns its new state, or None if it does not exist
+
+        Queued jobs are cancelled at once; running jobs are flagged, and the worker marks them
+        cancelled once their FFmpeg processes have been stopped.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            state = row[0]
+            if state == JOB_QUEUED:
+                self.connection.execute("UPDATE jobs SET state = ?, finished = ? WHERE id = ?",
+                                        (JOB_CANCELLED, time.time(), job_id))
+                state = JOB_CANCELLED
+            elif state == JOB_RUNNING:
+                self.connection.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            self.connection.commit()
+            return state
+
+    def is_cancel_requested(self, job_id):
+        with self.lock:
+            row = self.connection.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.connection.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?",
+                                          (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def list(self, state=None, batch_id=None, limit=DEFAULT_LIST_LIMIT):
+        conditions, parameters = [], []
+        if state:
+            conditions.append("state = ?")
+            parameters.append(state)
+        if batch_id is not None:
+            conditions.append("batch_id = ?")
+            parameters.append(batch_id)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs{where} ORDER BY id LIMIT ?", parameters + [limit]
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def counts(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = dict.fromkeys(JOB_STATES, 0)
+        counts.update(rows)
+        return counts
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class ConversionService:
+    """A job queue, the worker pool that executes it and the HTTP API in front of both"""
+
+    def __init__(self, queue, max_workers=None, token=None):
+        self.queue = queue
+        self.token = token
+        # Without -t the pool is planned like -t auto, so jobs times FFmpeg threads fit the cores
+        self.max_workers, self.ffmpeg_threads, self.concurrency = setup_concurrency(max_workers or THREADS_AUTO, 'video')
+        self.wakeup = threading.Condition()
+        self.stopping = threading.Event()
+        self.progress = {}  # job id -> {"seconds_done", "duration", "speed"} while running
+        self.progress_lock = threading.Lock()
+        self.manifests = {}
+        self.manifests_lock = threading.Lock()
+        self.workers = []
+
+    def manifest_for(self, manifest_dir):
+        with self.manifests_lock:
+            if manifest_dir not in self.manifests:
+                self.manifests[manifest_dir] = ConversionManifest(manifest_dir)
+            return self.manifests[manifest_dir]
+
+    def save_manifests(self):
+        with self.manifests_lock:
+            manifests = list(self.manifests.values())
+        for manifest in manifests:
+            manifest.save()
+
+    # Submitting jobs
+
+    def expand_submission(self, request):
+        """Turn a submitted JSON object into a list of job dicts"""
+        if not isinstance(request, dict):
+            raise ServiceError("expected a JSON object")
+        if "jobs" in request:
+            jobs = []
+            for job_request in request["jobs"]:
+                jobs.extend(self.expand_submission(job_request))
+            return jobs
+
+        target_formats = request.get("target_format")
+        if isinstance(target_formats, str):
+            target_formats = [target_formats]
+        if not target_formats:
+            raise ServiceError("target_format is required")
+        for fmt in target_formats:
+            if fmt.lower() not in AUDIO_FORMATS + VIDEO_FORMATS:
+                raise ServiceError(f"unsupported target format: {fmt}")
+
+        remux = bool(request.get("remux", True))
+        force = bool(request.get("force", False))
+        try:
+            priority = int(request.get("priority", PRIORITY_NORMAL))
+        except (TypeError, ValueError):
+            raise ServiceError("priority must be an integer")
+        tier = request.get("tier", DEFAULT_TIER)
+        if tier not in PERFORMANCE_TIERS:
+            raise ServiceError(f"tier must be one of {', '.join(PERFORMANCE_TIERS)}")
+
+        if "input_dirs" in request:
+            source_format = request.get("source_format")
+            output_dir = request.get("output_dir")
+            if not source_format or not output_dir:
+                raise ServiceError("folder batches need source_format and output_dir")
+            input_dirs = request["input_dirs"]
+            if isinstance(input_dirs, str):
+                input_dirs = [input_dirs]
+            for input_dir in input_dirs:
+                if not os.path.isdir(input_dir):
+                    raise ServiceError(f"input directory does not exist: {input_dir}")
+
+            # One job per file and format, recorded in the format folder's manifest like the CLI
+            jobs = []
+            output_format_dirs = {fmt: get_output_format_dir(output_dir, fmt) for fmt in target_formats}
+            for source_file_path, input_root_path in iter_source_files(input_dirs, source_format):
+                for fmt in target_formats:
+                    jobs.append({
+                        "source_path": str(source_file_path),
+                        "output_path": str(get_output_file_path(source_file_path, input_root_path,
+                                                                output_format_dirs[fmt], fmt)),
+                        "source_format": source_format,
+                        "target_format": fmt,
+                        "media_type": get_media_type(source_format, fmt),
+                        "manifest_dir": str(output_format_dirs[fmt]),
+                        "force": force,
+                        "remux": remux,
+                        "priority": priority,
+                        "tier": tier,
+                    })
+            return jobs
+
+        source_path = request.get("source_path")
+        output_path = request.get("output_path")
+        if not source_path or not output_path:
+            raise ServiceError("source_path and output_path are required")
+        if len(target_formats) != 1:
+            raise ServiceError("a single job has exactly one target_format")
+        if not os.path.isfile(source_path):
+            raise ServiceError(f"source file does not exist: {source_path}")
+        source_format = request.get("source_format") or os.path.splitext(source_path)[1].lstrip(".").lower() or None
+        return [{
+            "source_path": os.path.abspath(source_path),
+            "output_path": os.path.abspath(output_path),
+            "source_format": source_format,
+            "target_format": target_formats[0],
+            "media_type": get_media_type(source_format, target_formats[0]),
+            "force": force,
+            "remux": remux,
+            "priority": priority,
+            "tier": tier,
+        }]
+
+    def submit(self, request):
+        jobs = self.expand_submission(request)
+        batch_id, job_ids = self.queue.add(jobs)
+        with self.wakeup:
+            self.wakeup.notify_all()
+        return {"batch_id": batch_id, "jobs": job_ids}
+
+    def job_status(self, job):
+        with self.progress_lock:
+            progress = self.progress.get(job["id"])
+        if progress:
+            job["progress"] = dict(progress)
+            if progress["duration"]:
+                job["progress"]["percent"] = min(100.0, 100.0 * progress["seconds_done"] / progress["duration"])
+        return job
+
+    # Running jobs
+
+    def cancel(self, job_id):
+        """Cancel a job, stopping its FFmpeg processes if it is running"""
+        state = self.queue.cancel(job_id)
+        if state == JOB_RUNNING:
+            PROCESS_REGISTRY.cancel(job_id)
+        return state
+
+    def run_job(self, job):
+        """Convert one claimed job and record its outcome"""
+        PROCESS_REGISTRY.set_priority(job["id"], job["priority"])
+        try:
+            if job["priority"] > PRIORITY_NORMAL:
+                # Lower-priority FFmpeg processes stay paused until this job is done
+                with PROCESS_REGISTRY.preempt(job["priority"]):
+                    self._run_job(job, use_controller=False)
+            else:
+                self._run_job(job)
+        finally:
+            PROCESS_REGISTRY.forget(job["id"])
+
+    def _run_job(self, job, use_controller=True):
+        source_path, output_path = job["source_path"], job["output_path"]
+        details = {}
+        manifest = self.manifest_for(job["manifest_dir"]) if job["manifest_dir"] else None
+
+        stale_targets = None
+        if manifest is not None:
+            stale_targets = stale_conversion_targets(source_path, output_path, job["source_format"],
+                                                     job["target_format"], job["media_type"], manifest,
+                                                     job["force"], remux=job["remux"])
+            if not stale_targets:
+                self.queue.finish(job["id"], JOB_SKIPPED)
+                return
+        try:
+            signature = source_signature(source_path)
+        except OSError:
+            signature = None
+
+        with self.progress_lock:
+            self.progress[job["id"]] = {"seconds_done": 0.0, "duration": get_media_duration(source_path), "speed": None}
+
+        def on_progress(seconds_done, speed):
+            with self.progress_lock:
+                self.progress[job["id"]].update(seconds_done=seconds_done, speed=speed)
+
+        controller = self.concurrency if use_controller else None
+        if controller is not None:
+            controller.acquire()
+        try:
+            success = convert_media_file(source_path, output_path, job["source_format"], job["target_format"],
+                                         job["media_type"], threads=self.ffmpeg_threads, remux=job["remux"],
+                                         details=details, progress_callback=on_progress, job=job["id"],
+                                         tier=job["tier"])
+        finally:
+            if controller is not None:
+                controller.release()
+            with self.progress_lock:
+                self.progress.pop(job["id"], None)
+
+        if PROCESS_REGISTRY.is_cancelled():
+            # The service is shutting down; run the job again next time
+            self.queue.release(job["id"])
+            return
+        if self.queue.is_cancel_requested(job["id"]):
+            if success:
+                remove_file_quietly(output_path)
+            if stale_targets:
+                record_conversion_results(stale_targets, source_path, None, False)
+            self.queue.finish(job["id"], JOB_CANCELLED, details=details)
+            return
+        if stale_targets:
+            record_conversion_results(stale_targets, source_path, signature, success)
+        self.queue.finish(job["id"], JOB_DONE if success else JOB_FAILED,
+                          None if success else "conversion failed", details)
+
+    def worker_loop(self, min_priority=None):
+        while not self.stopping.is_set():
+            job = self.queue.claim(min_priority)
+            if job is None:
+                with self.wakeup:
+                    self.wakeup.wait(1.0)
+                continue
+            try:
+                self.run_job(job)
+            except Exception as e:
+                print(f"❌ Job {job['id']} failed: {e}")
+                self.queue.finish(job["id"], JOB_FAILED, str(e))
+
+    def start_workers(self):
+        for _ in range(self.max_workers):
+            worker = threading.Thread(target=self.worker_loop, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+        # High-priority jobs never wait for a busy pool; they pre-empt what is running instead
+        priority_worker = threading.Thread(target=self.worker_loop, args=(PRIORITY_NORMAL + 1,), daemon=True)
+        priority_worker.start()
+        self.workers.append(priority_worker)
+
+    def stop_workers(self):
+        """Stop the pool once the running jobs have returned (after Ctrl+C they are cancelled and requeued)"""
+        self.stopping.set()
+        with self.wakeup:
+            self.wakeup.notify_all()
+        for worker in self.workers:
+            worker.join()
+        self.save_manifests()
+
+    # HTTP API
+
+    def make_handler(self):
+        service = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            server_version = "MediaFormatConverter"
+
+            def log_message(self, format, *args):
+                pass
+
+            def reply(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def check_request(self, method):
+                """Refuse cross-site requests from browsers and, with a token, unauthenticated ones"""
+                origin = self.headers.get("Origin")
+                if origin is not None:
+                    # Only pages served from this service's own loopback address; this also
+                    # rejects DNS-rebound pages, whose Origin keeps the attacker's host name
+                    try:
+                        parsed = urlparse(origin)
+                        same_origin = (parsed.scheme == "http" and parsed.hostname in LOOPBACK_HOSTS
+                                       and parsed.port == self.server.server_address[1])
+                    except ValueError:
+                        same_origin = False
+                    if not same_origin:
+                        raise ServiceError(f"cross-origin requests are not allowed (Origin: {origin})", 403)
+                if service.token is not None:
+                    expected = f"Bearer {service.token}".encode("utf-8")
+                    if not hmac.compare_digest(self.headers.get("Authorization", "").encode("utf-8"), expected):
+                        raise ServiceError("missing or invalid token", 401)
+                if method == "POST":
+                    content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                    if content_type != "application/json":
+                        raise ServiceError("POST requests must be sent as Content-Type: application/json", 415)
+
+            def route(self, method):
+                url = urlparse(self.path)
+                parts = [part for part in url.path.split("/") if part]
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                try:
+                    self.check_request(method)
+                    if parts == ["status"] and method == "GET":
+                        return self.reply(200, {"counts": service.queue.counts(), "workers": service.max_workers})
+                    if parts == ["jobs"] and method == "GET":
+                        batch_id = int(query["batch"]) if "batch" in query else None
+                        jobs = service.queue.list(query.get("state"), batch_id,
+                                                  int(query.get("limit", DEFAULT_LIST_LIMIT)))
+                        return self.reply(200, {"jobs": [service.job_status(job) for job in jobs]})
+                    if parts == ["jobs"] and method == "POST":
+                        length = int(self.headers.get("Content-Length") or 0)
+                        try:
+                            request = json.loads(self.rfile.read(length) or b"null")
+                        except ValueError as e:
+                            raise ServiceError(f"invalid JSON: {e}")
+                        return self.reply(201, service.submit(request))
+                    if len(parts) >= 2 and parts[0] == "jobs" and parts[1].isdigit():
+                        job_id = int(parts[1])
+                        if len(parts) == 2 and method == "GET":
+                            job = service.queue.get(job_id)
+                            if job is None:
+                                raise ServiceError(f"no job {job_id}", 404)
+                            return self.reply(200, service.job_status(job))
+                        if (len(parts) == 2 and method == "DELETE") or (parts[2:] == ["cancel"] and method == "POST"):
+                            state = service.cancel(job_id)
+                            if state is None:
+                                raise ServiceError(f"no job {job_id}", 404)
+                            return self.reply(200, {"id": job_id, "state": state})
+                    raise ServiceError(f"no route for {method} {url.path}", 404)
+                except ServiceError as e:
+                    self.reply(e.status, {"error": str(e)})
+                except ValueError as e:
+                    self.reply(400, {"error": str(e)})
+
+            def do_GET(self):
+                self.route("GET")
+
+            def do_POST(self):
+                self.route("POST")
+
+            def do_DELETE(self):
+                self.route("DELETE")
+
+        return RequestHandler
+
+    def serve(self, address):
+        """Serve the API at address and run jobs until Ctrl+C"""
+        requeued = self.queue.requeue_interrupted()
+        if requeued:
+            print(f"Queued {requeued} jobs again that were interrupted when the service last stopped.")
+        counts = self.queue.counts()
+        server = ThreadingHTTPServer(address, self.make_handler())
+        server.daemon_threads = True
+        self.start_workers()
+        print(f"Conversion service on http://{address[0]}:{address[1]}/ with {self.max_workers} workers "
+              f"({counts[JOB_QUEUED]} jobs queued); press Ctrl+C to stop.")
+        if self.token is None:
+            print("No --token given: any local program can submit and cancel jobs.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopping the service; waiting for running jobs...")
+        finally:
+            server.server_close()
+            self.stop_workers()
+            self.queue.close()
+
+
+def run_service(address, max_workers=None, queue_path=None, token=None):
+    """Run the conversion service at address (host, port) until interrupted"""
+    ConversionService(JobQueue(queue_path), max_workers, token).serve(address)
@@ -0,0 +1,242 @@
+"""
+Local scratch staging
+
+For inputs and outputs on network storage (NFS/SMB), where many encoders reading and writing
+at once cause random I/O and stalls. Upcoming inputs are copied to a local scratch directory
+ahead of time by a prefetch thread, FFmpeg reads and writes only local files, and finished
+outputs are copied back by a separate I/O thread. All transfers are whole files with large
+sequential reads and writes, and both run while the encoders work, so the encoders never wait
+on the network and the link stays busy.
+
+The scratch space used by staged inputs and outputs waiting to be copied back is bounded by a
+byte budget; the prefetch waits when it is used up. A single file larger than the budget is
+still staged, on its own.
+"""
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+
+# Scratch space staged files may use by default
+DEFAULT_STAGING_BUDGET = 4 * 1024 ** 3
+
+# Buffer of the sequential copies
+COPY_BUFFER_SIZE = 16 * 1024 * 1024
+
+# Staged jobs waiting to be taken by the pool
+PREFETCH_QUEUE_SIZE = 64
+
+_DONE = object()
+
+
+def copy_sequential(source_path, target_path):
+    """Copy a file with large sequential reads and writes; the target is replaced atomically"""
+    directory, file_name = os.path.split(os.path.abspath(target_path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{file_name}.{os.getpid()}.{threading.get_ident()}.staging")
+    try:
+        with open(source_path, "rb") as source, open(temp_path, "wb") as target:
+            shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+        shutil.copystat(source_path, temp_path)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class StagingArea:
+    """Prefetches inputs into a scratch directory and copies outputs back in the background"""
+
+    def __init__(self, scratch_dir=None, budget_bytes=None):
+        if scratch_dir:
+            os.makedirs(scratch_dir, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="media-converter-staging-", dir=scratch_dir)
+        self.budget_bytes = budget_bytes or DEFAULT_STAGING_BUDGET
+        self.used_bytes = 0
+        self.condition = threading.Condition()
+        self.counter = 0
+        self.inputs = {}  # source path -> {"path", "size", "ready" Event, "error"}
+        self.stats = {"prefetched_bytes": 0, "copied_back_bytes": 0, "input_wait_seconds": 0.0,
+                      "prefetch_seconds": 0.0, "copy_back_seconds": 0.0, "copy_back_failures": 0}
+
+        self.copy_back_queue = queue.Queue()
+        self.copy_back_thread = threading.Thread(target=self._copy_back_loop, name="staging-copy-back", daemon=True)
+        self.copy_back_thread.start()
+
+    def _local_path(self, kind, file_name):
+        with self.condition:
+            self.counter += 1
+            number = self.counter
+        return os.path.join(self.directory, kind, str(number), file_name)
+
+    def _reserve(self, size, should_stop=None):
+        """Wait until size bytes fit in the budget (anything fits when nothing is staged)"""
+        with self.condition:
+            while self.used_bytes > 0 and self.used_bytes + size > self.budget_bytes:
+                if should_stop and should_stop():
+                    return False
+                self.condition.wait(0.5)
+            self.used_bytes += size
+            return True
+
+    def _release(self, size):
+        with self.condition:
+            self.used_bytes = max(0, self.used_bytes - size)
+            self.condition.notify_all()
+
+    # Prefetch stage
+
+    def prefetch(self, jobs, path_of=lambda job: job[0], skip=None, should_stop=None):
+        """Yield jobs in order once their input has been copied to scratch
+
+        A background thread copies ahead of the consumer as far as the budget allows. Jobs for
+        which skip(job) is True (for example up-to-date files) are passed through uncopied.
+        """
+        staged = queue.Queue(PREFETCH_QUEUE_SIZE)
+
+        def run():
+            try:
+                for job in jobs:
+                    if should_stop and should_stop():
+                        break
+                    if not (skip and skip(job)):
+                        self._stage(str(path_of(job)), should_stop)
+                    staged.put(job)
+                staged.put(_DONE)
+            except BaseException as e:
+                staged.put(e)
+
+        threading.Thread(target=run, name="staging-prefetch", daemon=True).start()
+        while True:
+            # Time spent here is time the pool wanted another job that was not staged yet
+            waited = time.monotonic()
+            job = staged.get()
+            with self.condition:
+                self.stats["input_wait_seconds"] += time.monotonic() - waited
+            if job is _DONE:
+                return
+            if isinstance(job, BaseException):
+                raise job
+            yield job
+
+    def _stage(self, source_path, should_stop=None):
+        try:
+            size = os.path.getsize(source_path)
+        except OSError:
+            return
+        if not self._reserve(size, should_stop):
+            return
+        entry = {"path": self._local_path("in", os.path.basename(source_path)), "size": size,
+                 "ready": threading.Event(), "error": None}
+        with self.condition:
+            self.inputs[source_path] = entry
+        started = time.monotonic()
+        try:
+            copy_sequential(source_path, entry["path"])
+            with self.condition:
+                self.stats["prefetched_bytes"] += size
+                self.stats["prefetch_seconds"] += time.monotonic() - started
+        except OSError as e:
+            entry["error"] = e
+        finally:
+            entry["ready"].set()
+
+    def input_path(self, source_path):
+        """Return the local copy of a source (the source itself if it was not staged)"""
+        with self.condition:
+            entry = self.inputs.get(str(source_path))
+        if entry is None:
+            return str(source_path)
+        entry["ready"].wait()
+        return str(source_path) if entry["error"] else entry["path"]
+
+    def release_input(self, source_path):
+        """Delete the local copy of a source once it has been encoded"""
+        with self.condition:
+            entry = self.inputs.pop(str(source_path), None)
+        if entry is None:
+            return
+        entry["ready"].wait()
+        try:
+            os.remove(entry["path"])
+        except OSError:
+            pass
+        self._release(entry["size"])
+
+    # Copy-back stage
+
+    def output_path(self, final_path):
+        """Return the scratch path FFmpeg should write an output to"""
+        return self._local_path("out", os.path.basename(str(final_path)))
+
+    def copy_back(self, outputs, on_done=None):
+        """Queue (local path, final path) outputs to be copied back; on_done(success) runs afterwards"""
+        size = 0
+        for local_path, _ in outputs:
+            try:
+                size += os.path.getsize(local_path)
+            except OSError:
+                pass
+        with self.condition:
+            # Outputs count against the budget until they are copied back
+            self.used_bytes += size
+        self.copy_back_queue.put((outputs, size, on_done))
+
+    def _copy_back_loop(self):
+        while True:
+            item = self.copy_back_queue.get()
+            if item is _DONE:
+                self.copy_back_queue.task_done()
+                return
+            outputs, size, on_done = item
+            started = time.monotonic()
+            success = True
+            for local_path, final_path in outputs:
+                try:
+                    copy_sequential(local_path, final_path)
+                except OSError as e:
+                    success = False
+                    print(f"\n❌ Could not copy {os.path.basename(str(final_path))} back from the staging area: {e}")
+            for local_path, _ in outputs:
+                try:
+                    os.remove(local_path)
+                except OSError:
+                    pass
+            with self.condition:
+                self.stats["copy_back_seconds"] += time.monotonic() - started
+                if success:
+                    self.stats["copied_back_bytes"] += size
+                else:
+                    self.stats["copy_back_failures"] += 1
+            self._release(size)
+            try:
+                if on_done:
+                    on_done(success)
+            except Exception as e:
+                print(f"\n❌ Error after copying back {os.path.basename(str(outputs[0][1]))}: {e}")
+            finally:
+                self.copy_back_queue.task_done()
+
+    def close(self):
+        """Finish copying back, then remove the scratch directory; returns the stats"""
+        self.copy_back_queue.put(_DONE)
+        self.copy_back_thread.join()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        with self.condition:
+            return dict(self.stats)
+
+
+def format_staging_stats(stats):
+    """Return a one-line summary of a staging run"""
+    mb = 1024 ** 2
+    return (f"Staging: prefetched {stats['prefetched_bytes'] / mb:.1f} MB in {stats['prefetch_seconds']:.1f}s, "
+            f"copied back {stats['copied_back_bytes'] / mb:.1f} MB in {stats['copy_back_seconds']:.1f}s; "
+            f"the pool waited {stats['input_wait_seconds']:.1f}s for prefetched inputs"
+            + (f"; {stats['copy_back_failures']} outputs failed to copy back" if stats["copy_back_failures"] else ""))
@@ -0,0 +1,183 @@
+"""
+Performance tiers
+
+Named speed/quality trade-offs for the encoders the converter uses. A tier only changes how
+hard the encoder works (x264 presets, libvpx's -deadline/-cpu-used and row multithreading,
+FLAC/LAME/Opus compression effort), not the codecs or containers, so its options are merged
+into the normal codec options of every target format.
+
+With a deadline, DeadlineTierSelector picks a tier for each job: the slowest (best) tier whose
+predicted throughput still finishes the remaining work in time, predicted from the speed of
+the jobs already converted (and of earlier runs).
+"""
+
+import re
+import threading
+import time
+
+
+TIER_FAST = "fast"
+TIER_BALANCED = "balanced"
+TIER_ARCHIVAL = "archival"
+
+# Fastest first
+PERFORMANCE_TIERS = [TIER_FAST, TIER_BALANCED, TIER_ARCHIVAL]
+DEFAULT_TIER = TIER_BALANCED
+
+# Encoder options of each tier; options already in the codec options are overridden, the rest appended
+TIER_OPTIONS = {
+    "libx264": {
+        TIER_FAST: {"-preset": "veryfast"},
+        TIER_BALANCED: {"-preset": "medium"},
+        TIER_ARCHIVAL: {"-preset": "slow", "-crf": "20"},
+    },
+    # libvpx's default (-deadline good -cpu-used 0, single-threaded rows) is extremely slow
+    "libvpx-vp9": {
+        TIER_FAST: {"-deadline": "realtime", "-cpu-used": "8", "-row-mt": "1"},
+        TIER_BALANCED: {"-deadline": "good", "-cpu-used": "4", "-row-mt": "1"},
+        TIER_ARCHIVAL: {"-deadline": "good", "-cpu-used": "1", "-row-mt": "1"},
+    },
+    "libmp3lame": {
+        TIER_FAST: {"-compression_level:a": "7"},
+        TIER_ARCHIVAL: {"-compression_level:a": "0"},
+    },
+    "flac": {
+        TIER_FAST: {"-compression_level:a": "0"},
+        TIER_ARCHIVAL: {"-compression_level:a": "8"},
+    },
+    "libopus": {
+        TIER_FAST: {"-compression_level:a": "5"},
+    },
+}
+
+# Encoder names FFmpeg resolves to another encoder
+ENCODER_ALIASES = {"mp3": "libmp3lame", "opus": "libopus"}
+
+# Rough speed of each tier relative to balanced, used until a tier has been measured
+RELATIVE_SPEED = {
+    TIER_FAST: 3.0,
+    TIER_BALANCED: 1.0,
+    TIER_ARCHIVAL: 0.4,
+}
+
+# Most recent jobs of a tier whose speed is used for predictions
+RECENT_SAMPLES = 20
+
+DEADLINE_PART = re.compile(r"(\d+(?:\.\d+)?)([hms]?)")
+
+
+def apply_tier(options, tier):
+    """Return FFmpeg codec options with the settings of a tier merged in for their encoders"""
+    if tier is None:
+        return list(options)
+    if tier not in PERFORMANCE_TIERS:
+        raise ValueError(f"unknown performance tier: {tier}")
+
+    merged = list(options)
+    for index in range(len(options) - 1):
+        if options[index] not in ("-c:v", "-c:a"):
+            continue
+        encoder = ENCODER_ALIASES.get(options[index + 1], options[index + 1])
+        for flag, value in TIER_OPTIONS.get(encoder, {}).get(tier, {}).items():
+            if flag in merged:
+                merged[merged.index(flag) + 1] = value
+            else:
+                merged.extend([flag, value])
+    return merged
+
+
+def parse_deadline(value, now=None):
+    """Return the deadline for a --deadline value as a time.time() timestamp
+
+    Accepts a clock time ("18:30", today or else tomorrow) or a duration from now ("90m",
+    "1h30m", "45s", or plain seconds). Raises ValueError for anything else.
+    """
+    now = time.time() if now is None else now
+    value = value.strip().lower()
+
+    clock = re.fullmatch(r"(\d{1,2}):(\d{2})", value)
+    if clock:
+        hours, minutes = int(clock.group(1)), int(clock.group(2))
+        if hours > 23 or minutes > 59:
+            raise ValueError(f"invalid time of day: {value}")
+        local = time.localtime(now)
+        deadline = time.mktime((local.tm_year, local.tm_mon, local.tm_mday, hours, minutes, 0, 0, 0, -1))
+        return deadline if deadline > now else deadline + 24 * 3600
+
+    if not value or DEADLINE_PART.sub("", value):
+        raise ValueError(f"invalid deadline: {value}")
+    seconds = 0.0
+    for number, unit in DEADLINE_PART.findall(value):
+        seconds += float(number) * {"h": 3600, "m": 60}.get(unit, 1)
+    return now + seconds
+
+
+class DeadlineTierSelector:
+    """Chooses the tier of each job so a batch finishes by a deadline at the best quality possible
+
+    Speeds are input bytes per second of FFmpeg time for one job, as measured while the batch's
+    jobs run alongside each other. measured_speeds optionally maps tiers to speeds from earlier
+    runs; the jobs of this batch take over as soon as they finish.
+    """
+
+    def __init__(self, deadline, total_bytes, parallel_jobs, measured_speeds=None):
+        self.deadline = deadline
+        self.remaining_bytes = total_bytes  # input bytes of the jobs that have not started yet
+        self.parallel_jobs = max(1, parallel_jobs)
+        self.history = {tier: speed for tier, speed in (measured_speeds or {}).items() if speed}
+        self.samples = {tier: [] for tier in PERFORMANCE_TIERS}
+        self.counts = {tier: 0 for tier in PERFORMANCE_TIERS}
+        self.lock = threading.Lock()
+
+    def _speed(self, tier):
+        """Measured (or, scaled from another tier, estimated) speed of a tier; None if nothing is known (lock held)"""
+        # Only deadline runs get here; statistics is too slow to import for every CLI start
+        import statistics
+
+        if self.samples[tier]:
+            return statistics.median(self.samples[tier][-RECENT_SAMPLES:])
+        if tier in self.history:
+            return self.history[tier]
+        for other in PERFORMANCE_TIERS:
+            known = statistics.median(self.samples[other][-RECENT_SAMPLES:]) if self.samples[other] else self.history.get(other)
+            if known:
+                return known * RELATIVE_SPEED[tier] / RELATIVE_SPEED[other]
+        return None
+
+    def predicted_seconds(self, tier):
+        """Predicted wall time of the jobs not started yet if they all ran at tier (None if unknown)"""
+        with self.lock:
+            speed = self._speed(tier)
+            return self.remaining_bytes / (speed * self.parallel_jobs) if speed else None
+
+    def start_job(self, input_bytes):
+        """Return the tier for a job that starts now"""
+        with self.lock:
+            time_left = self.deadline - time.time()
+            tier = None
+            if any(self._speed(candidate) for candidate in PERFORMANCE_TIERS):
+                # Slowest tier first; the fastest one if none of them makes it
+                for candidate in reversed(PERFORMANCE_TIERS):
+                    if self.remaining_bytes / (self._speed(candidate) * self.parallel_jobs) <= time_left:
+                        tier = candidate
+                        break
+                tier = tier or PERFORMANCE_TIERS[0]
+            else:
+                # Nothing measured yet; the first jobs measure the default tier
+                tier = DEFAULT_TIER
+            self.remaining_bytes = max(0, self.remaining_bytes - input_bytes)
+            self.counts[tier] += 1
+            return tier
+
+    def job_finished(self, tier, input_bytes, details):
+        """Record the speed of a finished job (jobs that were copied or taken from the cache are not measured)"""
+        ffmpeg_seconds = details.get("ffmpeg_seconds", 0.0)
+        if ffmpeg_seconds <= 0 or not input_bytes or details.get("stream_copy") or details.get("cache_hit"):
+            return
+        with self.lock:
+            self.samples[tier].append(input_bytes / ffmpeg_seconds)
+
+    def describe(self):
+        """Return a summary of the tiers used, e.g. "balanced 12, fast 3" """
+        with self.lock:
+            return ", ".join(f"{tier} {count}" for tier, count in self.counts.items() if count)
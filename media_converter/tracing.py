@@ -0,0 +1,253 @@
+"""
+Job tracing
+
+Records a structured trace of every conversion job in a batch - when it was queued, started
+and finished, how long it waited, and the CPU time, peak memory and bytes of the FFmpeg
+processes it ran - as JSON lines, and summarizes the run with percentiles. This shows whether
+a slow batch spent its time in the directory walk, waiting in the pool, in FFmpeg or around it.
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+from media_converter.cache_paths import user_cache_dir
+from media_converter.tiers import DEFAULT_TIER
+
+
+# Traces kept in the cache directory by default_trace_path()
+TRACE_HISTORY = 20
+
+# Per-job values summarized at the end of a run: (trace key, label, unit)
+SUMMARY_FIELDS = [
+    ("queue_wait_s", "Queue wait", "s"),
+    ("slot_wait_s", "Slot wait", "s"),
+    ("wall_s", "Wall time", "s"),
+    ("ffmpeg_s", "FFmpeg time", "s"),
+    ("overhead_s", "Overhead", "s"),
+    ("cpu_user_s", "CPU user", "s"),
+    ("cpu_sys_s", "CPU sys", "s"),
+    ("max_rss_bytes", "Max RSS", "bytes"),
+    ("input_bytes", "Input size", "bytes"),
+    ("output_bytes", "Output size", "bytes"),
+]
+
+
+def add_process_usage(usage, wall_seconds, rusage):
+    """Add one finished FFmpeg process to a usage dict (rusage may be None where unsupported)
+
+    CPU and wall times are summed over processes; max_rss keeps the largest process.
+    """
+    usage["ffmpeg_runs"] = usage.get("ffmpeg_runs", 0) + 1
+    usage["ffmpeg_seconds"] = usage.get("ffmpeg_seconds", 0.0) + wall_seconds
+    if rusage is None:
+        return
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+    max_rss = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+    usage["cpu_user"] = usage.get("cpu_user", 0.0) + rusage.ru_utime
+    usage["cpu_sys"] = usage.get("cpu_sys", 0.0) + rusage.ru_stime
+    usage["max_rss"] = max(usage.get("max_rss", 0), max_rss)
+
+
+def default_trace_path(prefix="run"):
+    """Return a new trace path in the user cache directory, removing all but the newest traces"""
+    trace_dir = os.path.join(user_cache_dir(), "traces")
+    os.makedirs(trace_dir, exist_ok=True)
+    old_traces = sorted(name for name in os.listdir(trace_dir) if name.endswith(".jsonl"))
+    for name in old_traces[:max(0, len(old_traces) - TRACE_HISTORY + 1)]:
+        try:
+            os.remove(os.path.join(trace_dir, name))
+        except OSError:
+            pass
+    return os.path.join(trace_dir, f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+
+
+def measured_throughput(source_format, target_format, trace_dir=None, tier=None):
+    """Median input bytes per second of FFmpeg time for earlier jobs converting between two formats
+
+    Reads the traces kept by default_trace_path() (or those in trace_dir). With a tier, only
+    jobs encoded at that performance tier count (jobs traced before tiers existed count as the
+    default tier). Returns None when no earlier run converted files between these formats.
+    """
+    trace_dir = trace_dir or os.path.join(user_cache_dir(), "traces")
+    try:
+        names = sorted(name for name in os.listdir(trace_dir) if name.endswith(".jsonl"))
+    except OSError:
+        return None
+
+    rates = []
+    for name in names[-TRACE_HISTORY:]:
+        try:
+            with open(os.path.join(trace_dir, name), encoding="utf-8") as trace_file:
+                run = json.loads(trace_file.readline() or "{}")
+                if run.get("source_format") != source_format or target_format not in run.get("target_formats", []):
+                    continue
+                for line in trace_file:
+                    record = json.loads(line)
+                    if (record.get("event") == "job" and record.get("result") == "converted"
+                            and record.get("ffmpeg_s", 0) > 0 and record.get("input_bytes", 0) > 0
+                            and not record.get("stream_copy")
+                            and (tier is None or record.get("tier", DEFAULT_TIER) == tier)):
+                        rates.append(record["input_bytes"] / record["ffmpeg_s"])
+        except (OSError, ValueError):
+            continue
+
+    rates.sort()
+    return percentile(rates, 0.50)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class JobTracer:
+    """Thread-safe per-job trace of a batch, written as JSON lines
+
+    Times in the trace are seconds since the tracer was created. The first line describes the
+    run, every job adds an "event": "job" line when it ends, and close() appends the summary.
+    path may be None to only collect the summary.
+    """
+
+    def __init__(self, path=None, **run_info):
+        self.lock = threading.Lock()
+        self.start_time = time.monotonic()
+        self.walk_finished = None
+        self.enqueued = {}
+        self.jobs = []
+        self.file = None
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self.file = open(path, "w", encoding="utf-8")
+            self._write(dict(event="run", started_at=time.time(), **run_info))
+
+    def now(self):
+        return time.monotonic() - self.start_time
+
+    def _write(self, record):
+        if self.file is not None:
+            self.file.write(json.dumps(record, sort_keys=True) + "\n")
+            self.file.flush()
+
+    def job_enqueued(self, key):
+        """Note that a job was handed to the pool"""
+        with self.lock:
+            self.enqueued[key] = self.now()
+
+    def discovery_finished(self):
+        with self.lock:
+            self.walk_finished = self.now()
+
+    def job_started(self, key):
+        """Return the record for a job that starts running now"""
+        start = self.now()
+        with self.lock:
+            enqueue = self.enqueued.pop(key, start)
+        return {"enqueue_s": enqueue, "start_s": start, "queue_wait_s": start - enqueue}
+
+    def job_finished(self, record, source_path, output_paths, result, details=None):
+        """Complete a job record with its outcome and the resource usage collected in details"""
+        details = details or {}
+        end = self.now()
+        wall = end - record["start_s"]
+        ffmpeg_seconds = details.get("ffmpeg_seconds", 0.0)
+        record.update({
+            "event": "job",
+            "source": str(source_path),
+            "outputs": [str(path) for path in output_paths],
+            "result": result,
+            "end_s": end,
+            "wall_s": wall,
+            "slot_wait_s": details.get("slot_wait", 0.0),
+            "ffmpeg_runs": details.get("ffmpeg_runs", 0),
+            "ffmpeg_s": ffmpeg_seconds,
+            "overhead_s": max(0.0, wall - ffmpeg_seconds - details.get("slot_wait", 0.0)),
+            "cpu_user_s": details.get("cpu_user"),
+            "cpu_sys_s": details.get("cpu_sys"),
+            "max_rss_bytes": details.get("max_rss"),
+            "input_bytes": file_size(source_path),
+            "output_bytes": sum(file_size(path) for path in output_paths),
+        })
+        for key in ("stream_copy", "segments", "tier"):
+            if details.get(key):
+                record[key] = details[key]
+        with self.lock:
+            self.jobs.append(record)
+            self._write(record)
+
+    def summary(self):
+        """Return run totals and p50/p90/p99/max of every per-job value"""
+        with self.lock:
+            jobs = list(self.jobs)
+            walk_finished = self.walk_finished
+        summary = {
+            "event": "summary",
+            "jobs": len(jobs),
+            "run_s": self.now(),
+            "walk_s": walk_finished,
+            "results": {},
+            "fields": {},
+        }
+        for job in jobs:
+            summary["results"][job["result"]] = summary["results"].get(job["result"], 0) + 1
+        for key, _, _ in SUMMARY_FIELDS:
+            values = sorted(job[key] for job in jobs if job.get(key) is not None)
+            if not values:
+                continue
+            summary["fields"][key] = {
+                "p50": percentile(values, 0.50),
+                "p90": percentile(values, 0.90),
+                "p99": percentile(values, 0.99),
+                "max": values[-1],
+                "total": sum(values),
+            }
+        return summary
+
+    def close(self):
+        """Write the summary line and close the trace file; returns the summary"""
+        summary = self.summary()
+        with self.lock:
+            if self.file is not None:
+                self._write(summary)
+                self.file.close()
+                self.file = None
+        return summary
+
+
+def format_value(value, unit):
+    if unit == "bytes":
+        for suffix in ("B", "KB", "MB", "GB"):
+            if abs(value) < 1024 or suffix == "GB":
+                return f"{value:.0f} {suffix}" if suffix == "B" else f"{value:.1f} {suffix}"
+            value /= 1024.0
+    return f"{value:.2f}s"
+
+
+def format_trace_summary(summary):
+    """Format a tracer summary as report lines"""
+    lines = [f"Trace summary: {summary['jobs']} jobs in {summary['run_s']:.1f}s"]
+    if summary["walk_s"] is not None:
+        lines.append(f"  Directory walk finished after {summary['walk_s']:.2f}s")
+    for key, label, unit in SUMMARY_FIELDS:
+        stats = summary["fields"].get(key)
+        if not stats:
+            continue
+        lines.append(
+            f"  {label:<12} p50 {format_value(stats['p50'], unit):>10}  p90 {format_value(stats['p90'], unit):>10}"
+            f"  p99 {format_value(stats['p99'], unit):>10}  max {format_value(stats['max'], unit):>10}"
+        )
+    return lines
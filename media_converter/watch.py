@@ -0,0 +1,343 @@
+"""
+Watch-folder mode
+
+Keeps running and converts files as they arrive in the input folders, instead of rescanning
+whole trees from cron. Changes are reported by inotify on Linux and found by periodic polling
+elsewhere (or when inotify is unavailable). A file is only converted once its size and
+modification time have stopped changing for a while, so files still being copied or recorded
+are left alone. Conversions run on one thread pool that lives as long as the watch, and the
+output manifests make sure only new or changed files are converted.
+"""
+
+import concurrent.futures
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+
+from audio_format_converter import (
+    CONVERSION_CONVERTED,
+    CONVERSION_FAILED,
+    convert_media_file_incremental,
+    get_media_type,
+    get_output_file_path,
+    get_output_format_dir,
+    setup_concurrency,
+)
+from media_converter.discovery import iter_source_files
+from media_converter.manifest import ConversionManifest
+from media_converter.segmented import DEFAULT_SEGMENT_SECONDS
+from media_converter.tiers import DEFAULT_TIER
+
+
+# Seconds a file's size and mtime must stay the same before it is converted
+DEFAULT_SETTLE_SECONDS = 2.0
+
+# Seconds between scans when polling
+DEFAULT_POLL_INTERVAL = 5.0
+
+# inotify event bits (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Reports files created or changed under a set of directory trees using inotify"""
+
+    def __init__(self, roots):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}  # watch descriptor -> directory
+        for root in roots:
+            self.add_tree(root)
+
+    def add_tree(self, directory):
+        """Watch a directory and everything below it; returns the files already in it"""
+        files = []
+        for current_dir, subdirs, file_names in os.walk(directory):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(current_dir), WATCH_MASK)
+            if wd < 0:
+                # Most likely fs.inotify.max_user_watches is exhausted
+                raise OSError(ctypes.get_errno(), f"cannot watch {current_dir}")
+            self.directories[wd] = current_dir
+            files.extend(os.path.join(current_dir, file_name) for file_name in file_names)
+        return files
+
+    def remove_tree(self, directory):
+        """Stop watching a directory and everything below it (it was moved away or renamed)"""
+        prefix = directory + os.sep
+        for wd, watched_dir in list(self.directories.items()):
+            if watched_dir == directory or watched_dir.startswith(prefix):
+                del self.directories[wd]
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    def changes(self, timeout):
+        """Wait up to timeout seconds; returns (changed file paths, whether a full rescan is needed)"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return [], False
+
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return [], False
+
+        changed = []
+        rescan = False
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b"\0"))
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                rescan = True
+                continue
+            if mask & IN_IGNORED:
+                self.directories.pop(wd, None)
+                continue
+            directory = self.directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & IN_MOVED_FROM:
+                    # The old watches would keep reporting under the old path; a move within
+                    # the tree also sends IN_MOVED_TO, which watches the folder at its new path
+                    self.remove_tree(path)
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files can land in a new folder before its watch exists, so list them now
+                    try:
+                        changed.extend(self.add_tree(path))
+                    except OSError:
+                        rescan = True
+            elif not mask & IN_MOVED_FROM:
+                changed.append(path)
+        return changed, rescan
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Finds created or changed files by comparing size and mtime between periodic scans"""
+
+    def __init__(self, roots, source_format, interval=DEFAULT_POLL_INTERVAL):
+        self.roots = roots
+        self.source_format = source_format
+        self.interval = interval
+        self.snapshot = {}
+        self.last_scan = None
+
+    def changes(self, timeout):
+        if self.last_scan is not None:
+            time.sleep(max(0.0, min(timeout, self.last_scan + self.interval - time.monotonic())))
+            if time.monotonic() < self.last_scan + self.interval:
+                return [], False
+
+        self.last_scan = time.monotonic()
+        snapshot = {}
+        changed = []
+        for source_file_path, _ in iter_source_files(self.roots, self.source_format):
+            try:
+                stat_result = source_file_path.stat()
+            except OSError:
+                continue
+            path = str(source_file_path)
+            snapshot[path] = (stat_result.st_size, stat_result.st_mtime_ns)
+            if self.snapshot.get(path) != snapshot[path]:
+                changed.append(path)
+        self.snapshot = snapshot
+        return changed, False
+
+    def close(self):
+        pass
+
+
+class SettleTracker:
+    """Holds changed files back until their size and mtime have been stable for settle_seconds"""
+
+    def __init__(self, settle_seconds=DEFAULT_SETTLE_SECONDS):
+        self.settle_seconds = settle_seconds
+        self.pending = {}  # path -> ((size, mtime_ns), time of the last change)
+
+    def touch(self, path):
+        self.pending.setdefault(path, (None, time.monotonic()))
+
+    def ready(self):
+        """Return the pending files that have settled, and forget them"""
+        now = time.monotonic()
+        settled = []
+        for path, (signature, changed_at) in list(self.pending.items()):
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            current = (stat_result.st_size, stat_result.st_mtime_ns)
+            if current != signature:
+                self.pending[path] = (current, now)
+            elif now - changed_at >= self.settle_seconds:
+                del self.pending[path]
+                settled.append(path)
+        return settled
+
+    def next_check(self):
+        """Seconds until a pending file may have settled (None when nothing is pending)"""
+        if not self.pending:
+            return None
+        return max(0.1, min(self.settle_seconds / 2, 1.0))
+
+
+def make_watcher(roots, source_format, poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True):
+    """Return an InotifyWatcher when possible, else a PollingWatcher"""
+    if use_inotify:
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); polling every {poll_interval:g}s instead")
+    return PollingWatcher(roots, source_format, poll_interval)
+
+
+def watch_directories(input_dirs, output_dir, source_format, target_format, max_workers=None, force=False,
+                      remux=True, segment_threshold=None, segment_seconds=DEFAULT_SEGMENT_SECONDS, tier=DEFAULT_TIER,
+                      settle_seconds=DEFAULT_SETTLE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL,
+                      use_inotify=True, stop_event=None):
+    """Convert new and changed files in input_dirs until stop_event is set or Ctrl+C is pressed
+
+    Uses the same output layout, manifests and options as convert_directory. Files already in
+    the folders are checked once at start-up. Returns (converted, failed).
+    """
+    target_formats = [target_format] if isinstance(target_format, str) else list(target_format)
+    primary_format = target_formats[0]
+    media_type = get_media_type(source_format, primary_format)
+    if isinstance(input_dirs, (str, Path)):
+        input_dirs = [input_dirs]
+    roots = [os.path.abspath(str(input_dir)) for input_dir in input_dirs if os.path.isdir(str(input_dir))]
+    if not roots:
+        print("None of the input directories exist; nothing to watch.")
+        return 0, 0
+
+    output_format_dirs = {fmt: get_output_format_dir(output_dir, fmt) for fmt in target_formats}
+    manifests = {fmt: ConversionManifest(output_format_dirs[fmt]) for fmt in target_formats}
+    output_root = os.path.abspath(str(output_dir)) + os.sep
+    suffix = os.path.normcase(f".{source_format}")
+    stop_event = stop_event or threading.Event()
+
+    max_workers, ffmpeg_threads, concurrency = setup_concurrency(max_workers, media_type)
+    counts = {CONVERSION_CONVERTED: 0, CONVERSION_FAILED: 0}
+    counts_lock = threading.Lock()
+    in_flight = set()
+    queued = set()  # submitted conversions that have not finished
+
+    def input_root_of(path):
+        for root in roots:
+            if path.startswith(root + os.sep):
+                return root
+        return None
+
+    def convert_task(path, input_root):
+        source_file_path = Path(path)
+        output_file_paths = {
+            fmt: get_output_file_path(source_file_path, Path(input_root), output_format_dirs[fmt], fmt)
+            for fmt in target_formats
+        }
+        try:
+            result = convert_media_file_incremental(
+                source_file_path, output_file_paths[primary_format], source_format, primary_format, media_type,
+                manifests[primary_format], force=force, concurrency=concurrency,
+                extra_targets=[(fmt, output_file_paths[fmt], manifests[fmt]) for fmt in target_formats[1:]],
+                threads=ffmpeg_threads, remux=remux, segment_threshold=segment_threshold,
+                segment_seconds=segment_seconds, tier=tier, concurrent_jobs=max_workers
+            )
+        finally:
+            with counts_lock:
+                in_flight.discard(path)
+        if result in counts:
+            with counts_lock:
+                counts[result] += 1
+        if result == CONVERSION_CONVERTED:
+            print(f"✅ Converted: {path}")
+
+    def conversion_done(future, path):
+        with counts_lock:
+            queued.discard(future)
+            if future.cancelled():
+                # Never started, so convert_task did not release the file
+                in_flight.discard(path)
+
+    watcher = make_watcher(roots, source_format, poll_interval, use_inotify)
+    settle = SettleTracker(settle_seconds)
+    mode = "inotify" if isinstance(watcher, InotifyWatcher) else "polling"
+    print(f"Watching {len(roots)} folders for {source_format.upper()} files ({mode}); press Ctrl+C to stop.")
+
+    # Files that arrived while we were not watching; the manifests skip those already converted
+    for source_file_path, _ in iter_source_files(roots, source_format):
+        settle.touch(str(source_file_path))
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                while not stop_event.is_set():
+                    timeout = settle.next_check()
+                    changed, rescan = watcher.changes(1.0 if timeout is None else timeout)
+                    if rescan:
+                        changed = [str(source_file_path) for source_file_path, _ in iter_source_files(roots, source_format)]
+                    for path in changed:
+                        if os.path.normcase(path).endswith(suffix) and not path.startswith(output_root):
+                            settle.touch(path)
+
+                    for path in settle.ready():
+                        input_root = input_root_of(path)
+                        with counts_lock:
+                            busy = path in in_flight
+                            if not busy and input_root:
+                                in_flight.add(path)
+                        if busy:
+                            # Changed again while converting; look at it once the conversion is done
+                            settle.touch(path)
+                        elif input_root:
+                            future = executor.submit(convert_task, path, input_root)
+                            with counts_lock:
+                                queued.add(future)
+                            future.add_done_callback(lambda future, path=path: conversion_done(future, path))
+            except KeyboardInterrupt:
+                print("\nStopping the watch; waiting for running conversions...")
+                # Drop the queued backlog (like shutdown(cancel_futures=True), which needs Python 3.9)
+                with counts_lock:
+                    waiting = list(queued)
+                for future in waiting:
+                    future.cancel()
+                executor.shutdown(wait=True)
+    finally:
+        watcher.close()
+        for manifest in manifests.values():
+            manifest.save()
+
+    print(f"Watch stopped: {counts[CONVERSION_CONVERTED]} files converted, {counts[CONVERSION_FAILED]} failed.")
+    return counts[CONVERSION_CONVERTED], counts[CONVERSION_FAILED]